@@ -0,0 +1,30 @@
+"""Track analyses reused from near-duplicate documents
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('analyses', sa.Column('reused_from_analysis_id', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'fk_analyses_reused_from_analysis_id',
+        'analyses', 'analyses',
+        ['reused_from_analysis_id'], ['id'],
+        ondelete='SET NULL'  # Deleting the source document must not fail on analyses reusing it
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('fk_analyses_reused_from_analysis_id', 'analyses', type_='foreignkey')
+    op.drop_column('analyses', 'reused_from_analysis_id')
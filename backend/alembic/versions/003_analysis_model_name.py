@@ -0,0 +1,23 @@
+"""Record the Gemini model used for each analysis
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('analyses', sa.Column('model_name', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('analyses', 'model_name')
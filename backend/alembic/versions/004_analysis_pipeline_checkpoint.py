@@ -0,0 +1,25 @@
+"""Checkpoint the analysis pipeline stage and raw model output
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('analyses', sa.Column('pipeline_stage', sa.String(), nullable=True))
+    op.add_column('analyses', sa.Column('raw_model_output', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('analyses', 'raw_model_output')
+    op.drop_column('analyses', 'pipeline_stage')
@@ -0,0 +1,40 @@
+"""Composite indexes for the per-user list and lookup queries
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns); kept in sync with __table_args__ of the models
+INDEXES = [
+    # list_documents: WHERE user_id ORDER BY created_at DESC, id DESC (id breaks ties)
+    ('ix_documents_user_id_created_at', 'documents', ['user_id', 'created_at', 'id']),
+    # list_analyses: WHERE user_id ORDER BY created_at DESC
+    ('ix_analyses_user_id_created_at', 'analyses', ['user_id', 'created_at', 'id']),
+    # list_analyses by document, in-flight and near-duplicate lookups, FK deletes
+    ('ix_analyses_document_id_user_id_created_at', 'analyses', ['document_id', 'user_id', 'created_at']),
+    # Recommendations of an analysis by confidence, FK deletes, persist's replace
+    ('ix_career_recommendations_analysis_id_confidence', 'career_recommendations', ['analysis_id', 'confidence_score']),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY keeps the tables writable while the indexes build;
+    # it cannot run inside the migration transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
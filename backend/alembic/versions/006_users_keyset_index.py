@@ -0,0 +1,29 @@
+"""Index for keyset pagination of the user list
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # users.list_users: ORDER BY created_at DESC, id DESC with a (created_at, id) cursor;
+    # the per-user lists are served by the indexes of revision 005
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_users_created_at_id', 'users', ['created_at', 'id'],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_created_at_id', table_name='users', postgresql_concurrently=True, if_exists=True)
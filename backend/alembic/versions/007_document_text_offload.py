@@ -0,0 +1,24 @@
+"""Pointer to extracted document text stored in S3
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Set instead of raw_text when the text exceeds DOCUMENT_TEXT_OFFLOAD_BYTES
+    op.add_column('documents', sa.Column('raw_text_s3_key', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('documents', 'raw_text_s3_key')
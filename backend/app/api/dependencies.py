@@ -1,53 +1,77 @@
-from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
+from typing import AsyncGenerator, Optional
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from jose import JWTError, jwt
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import settings
-from app.core.database import SessionLocal
-from app.core.security import verify_token
+from app.core.database import AsyncSessionLocal
+from app.core.security import ANALYSIS_EVENTS_SCOPE, verify_token
 from app.models.user import User
+from app.services.auth_cache import auth_cache
 from app.schemas.auth import TokenData
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
 
-def get_db() -> Generator:
-    """Get database session."""
-    db = SessionLocal()
-    try:
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    """Get async database session (Celery tasks use the sync SessionLocal)."""
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
 async def get_current_user(
-    db: Session = Depends(get_db),
     token: str = Depends(oauth2_scheme)
 ) -> User:
-    """Get current authenticated user."""
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+    """Get current authenticated user.
     
+    The user is detached; load it into the request session before changing it.
+    """
+    return await _authenticate(token)
+
+
+async def get_analysis_events_user(
+    analysis_id: int,
+    token: str = Query(..., description="Stream token from POST /analysis/{analysis_id}/events/token")
+) -> User:
+    """Get the user of a stream token issued for this analysis (EventSource cannot set headers)."""
     payload = verify_token(token)
-    if payload is None:
-        raise credentials_exception
-    
-    user_id_str = payload.get("sub")
-    if user_id_str is None:
-        raise credentials_exception
-    
+    if (
+        payload is None
+        or payload.get("scope") != ANALYSIS_EVENTS_SCOPE
+        or payload.get("analysis_id") != analysis_id
+    ):
+        raise _credentials_exception()
     try:
-        user_id = int(user_id_str)
+        user_id = int(payload.get("sub"))
     except (ValueError, TypeError):
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.id == user_id).first()
+        raise _credentials_exception() from None
+    return await _load_user(user_id)
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+async def _authenticate(token: str) -> User:
+    user_id = auth_cache.token_user_id(token)
+    if user_id is None:
+        raise _credentials_exception()
+    return await _load_user(user_id)
+
+
+async def _load_user(user_id: int) -> User:
+    # A session is opened only on a cache miss
+    user = await auth_cache.get_user(user_id)
     if user is None:
-        raise credentials_exception
+        async with AsyncSessionLocal() as db:
+            user = (await db.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
+        if user is None:
+            raise _credentials_exception()
+        await auth_cache.set_user(user)
     
     if not user.is_active:
         raise HTTPException(
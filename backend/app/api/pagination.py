@@ -0,0 +1,64 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Optional, Sequence
+from fastapi import HTTPException, Query, Response, status
+from sqlalchemy import Select, tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Query parameters shared by the list endpoints
+CursorParam = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header of the previous page")
+SkipParam = Query(0, ge=0, deprecated=True, description="Offset paging; slow on deep pages, use cursor")
+
+
+def encode_cursor(*values: Any) -> str:
+    """Opaque cursor holding the sort key of the last row of a page."""
+
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, types: Sequence[type]) -> tuple:
+    """Sort key of a cursor; raises 400 if it was not produced by encode_cursor."""
+
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(payload, list) or len(payload) != len(types):
+            raise ValueError("Cursor length does not match the sort key")
+        return tuple(
+            datetime.fromisoformat(value) if value_type is datetime else value_type(value)
+            for value, value_type in zip(payload, types)
+        )
+    except (ValueError, TypeError, binascii.Error):
+        # Malformed client input; the decoding error is noise in the traceback
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        ) from None
+
+
+def keyset_paginate(query: Select, sort_key: Sequence, cursor: Optional[str], skip: int, limit: int) -> Select:
+    """Order a query newest/highest first by sort_key and select the page after cursor.
+
+    sort_key ends with a unique column (the id) so the order is total. The
+    row comparison (a, b) < (x, y) is served by an index on the same columns,
+    so every page costs the same. Without a cursor, skip still works as a
+    deprecated offset.
+    """
+
+    query = query.order_by(*(column.desc() for column in sort_key))
+    if cursor:
+        values = decode_cursor(cursor, [column.type.python_type for column in sort_key])
+        query = query.where(tuple_(*sort_key) < tuple_(*values))
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+
+def set_next_cursor(response: Response, rows: Sequence, sort_key: Sequence, limit: int):
+    """Set the cursor of the next page, unless this page was the last one."""
+
+    if rows and len(rows) >= limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*(getattr(rows[-1], column.key) for column in sort_key))
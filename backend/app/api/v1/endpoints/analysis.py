@@ -1,20 +1,39 @@
-from fastapi import APIRouter, HTTPException, Depends, status
-from sqlalchemy.orm import Session
+import json
+import time
+from fastapi import APIRouter, HTTPException, Depends, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
 from typing import List, Optional
 from datetime import datetime
 from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.redis import get_async_redis
+from app.core.security import create_analysis_events_token
+from app.services.analysis_events import TERMINAL_STATUSES, publish_status_async, status_channel, status_event
+from app.services.analysis_persistence import persist_analysis_result
+from app.services.document_text import document_text_store
 from app.services.gemini_service import gemini_service
-from app.models.document import Document
+from app.services.model_router import model_router
+from app.models.base import loaded_attributes
+from app.models.document import Document, DocumentStatus
 from app.models.analysis import Analysis, AnalysisStatus
 from app.models.career_recommendation import CareerRecommendation, CareerType
 from app.schemas.analysis import (
     AnalysisCreate,
     AnalysisResponse,
+    AnalysisEventsTokenResponse,
     AnalysisListResponse,
-    CareerPathResponse
+    CareerRecommendationSummary,
+    DocumentInfo,
+    CareerPathResponse,
+    BulkReanalysisJobResponse
 )
-from app.api.dependencies import get_db, get_current_user
+from app.api.dependencies import get_db, get_current_user, get_analysis_events_user, get_current_active_superuser
+from app.api.pagination import CursorParam, SkipParam, keyset_paginate, set_next_cursor
 from app.models.user import User
+from app.workers.celery_app import PRIORITY_BACKFILL, PRIORITY_INTERACTIVE
 from app.workers.tasks import process_analysis_task
 import logging
 
@@ -26,15 +45,21 @@ router = APIRouter()
 async def create_analysis(
     analysis_data: AnalysisCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new career analysis for a document."""
     
-    # Verify document exists and belongs to user
-    document = db.query(Document).filter(
-        Document.id == analysis_data.document_id,
-        Document.user_id == current_user.id
-    ).first()
+    # Verify document exists and belongs to user, without loading its text
+    document = (await db.execute(
+        select(
+            Document.id,
+            Document.status,
+            (Document.raw_text.isnot(None) | Document.raw_text_s3_key.isnot(None)).label("has_text")
+        ).where(
+            Document.id == analysis_data.document_id,
+            Document.user_id == current_user.id
+        )
+    )).one_or_none()
     
     if not document:
         raise HTTPException(
@@ -42,7 +67,27 @@ async def create_analysis(
             detail="Document not found"
         )
     
-    if not document.raw_text:
+    # Repeated requests (e.g. double clicks, or the analysis queued by upload)
+    # attach to the analysis already in flight for this document, also while
+    # its text is still being extracted
+    in_flight = (await db.execute(
+        select(Analysis).where(
+            Analysis.document_id == document.id,
+            Analysis.user_id == current_user.id,
+            Analysis.status.in_([AnalysisStatus.PENDING, AnalysisStatus.PROCESSING])
+        ).order_by(Analysis.created_at.desc()).limit(1)
+    )).scalar_one_or_none()
+    
+    # career_paths is deferred and unset until the analysis completes
+    if in_flight:
+        return AnalysisResponse(**loaded_attributes(in_flight, AnalysisResponse.model_fields))
+    
+    if not document.has_text:
+        if document.status in (DocumentStatus.UPLOADED, DocumentStatus.PROCESSING):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Document text is still being extracted"
+            )
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Document has no extracted text"
@@ -56,28 +101,64 @@ async def create_analysis(
     )
     
     db.add(db_analysis)
-    db.commit()
-    db.refresh(db_analysis)
+    await db.commit()
+    await db.refresh(db_analysis)
     
     # Queue Celery task for analysis
     from app.workers.tasks import process_analysis_task
-    process_analysis_task.delay(db_analysis.id)
+    process_analysis_task.apply_async((db_analysis.id,), priority=PRIORITY_INTERACTIVE)
+    
+    return AnalysisResponse(**loaded_attributes(db_analysis, AnalysisResponse.model_fields))
+
+
+@router.post("/bulk-reanalysis", response_model=BulkReanalysisJobResponse)
+async def start_bulk_reanalysis(
+    current_user: User = Depends(get_current_active_superuser)
+):
+    """Re-analyze every stored document with the current model and prompt (superuser only)."""
+    
+    from app.workers.bulk_reanalysis import create_job, get_job_async
+    from app.workers.tasks import bulk_reanalysis_task
+    
+    job_id = await create_job()
+    bulk_reanalysis_task.apply_async((job_id,), priority=PRIORITY_BACKFILL)
+    
+    return BulkReanalysisJobResponse(**await get_job_async(job_id))
+
+
+@router.get("/bulk-reanalysis/{job_id}", response_model=BulkReanalysisJobResponse)
+async def get_bulk_reanalysis(
+    job_id: str,
+    current_user: User = Depends(get_current_active_superuser)
+):
+    """Get progress of a bulk re-analysis job (superuser only)."""
+    
+    from app.workers.bulk_reanalysis import get_job_async
+    
+    job = await get_job_async(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Bulk re-analysis job not found"
+        )
     
-    return AnalysisResponse.from_orm(db_analysis)
+    return BulkReanalysisJobResponse(**job)
 
 
 @router.get("/{analysis_id}", response_model=AnalysisResponse)
 async def get_analysis(
     analysis_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get analysis details."""
     
-    analysis = db.query(Analysis).filter(
-        Analysis.id == analysis_id,
-        Analysis.user_id == current_user.id
-    ).first()
+    analysis = (await db.execute(
+        select(Analysis).options(undefer(Analysis.career_paths)).where(
+            Analysis.id == analysis_id,
+            Analysis.user_id == current_user.id
+        )
+    )).scalar_one_or_none()
     
     if not analysis:
         raise HTTPException(
@@ -88,77 +169,184 @@ async def get_analysis(
     return AnalysisResponse.from_orm(analysis)
 
 
+@router.post("/{analysis_id}/events/token", response_model=AnalysisEventsTokenResponse)
+async def issue_analysis_events_token(
+    analysis_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Issue a short-lived token for the status stream of an analysis.
+    
+    EventSource cannot send the Authorization header; this token goes in its
+    query string instead of the access token.
+    """
+    
+    exists = (await db.execute(
+        select(Analysis.id).where(
+            Analysis.id == analysis_id,
+            Analysis.user_id == current_user.id
+        )
+    )).first()
+    
+    if not exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Analysis not found"
+        )
+    
+    return AnalysisEventsTokenResponse(
+        token=create_analysis_events_token(current_user.id, analysis_id),
+        expires_in=settings.ANALYSIS_EVENTS_TOKEN_TTL_SECONDS
+    )
+
+
+@router.get("/{analysis_id}/events")
+async def stream_analysis_events(
+    analysis_id: int,
+    current_user: User = Depends(get_analysis_events_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Stream status changes of an analysis as server-sent events.
+    
+    Authenticated with a token from POST /{analysis_id}/events/token, needed
+    again for every reconnect. The first event is the current status; the
+    stream ends after a terminal status or ANALYSIS_EVENTS_MAX_SECONDS.
+    """
+    
+    exists = (await db.execute(
+        select(Analysis.id).where(
+            Analysis.id == analysis_id,
+            Analysis.user_id == current_user.id
+        )
+    )).first()
+    
+    # Do not hold a pooled connection for the lifetime of the stream
+    await db.close()
+    
+    if not exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Analysis not found"
+        )
+    
+    async def read_status() -> dict:
+        async with AsyncSessionLocal() as session:
+            row = (await session.execute(
+                select(Analysis.status, Analysis.error_message).where(Analysis.id == analysis_id)
+            )).one()
+            return status_event(analysis_id, row.status, row.error_message)
+    
+    async def event_stream():
+        pubsub = get_async_redis().pubsub()
+        await pubsub.subscribe(status_channel(analysis_id))
+        try:
+            # Read the current status only after subscribing, so no transition is missed
+            event = await read_status()
+            yield f"event: status\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+            
+            deadline = time.monotonic() + settings.ANALYSIS_EVENTS_MAX_SECONDS
+            while event["status"] not in TERMINAL_STATUSES and time.monotonic() < deadline:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=settings.ANALYSIS_EVENTS_KEEPALIVE_SECONDS
+                )
+                if message is None:
+                    yield ": keepalive\n\n"
+                    continue
+                event = json.loads(message["data"])
+                yield f"event: status\ndata: {message['data']}\n\n"
+        finally:
+            await pubsub.unsubscribe()
+            await pubsub.aclose()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/", response_model=List[AnalysisListResponse])
 async def list_analyses(
-    skip: int = 0,
+    response: Response,
+    cursor: Optional[str] = CursorParam,
+    skip: int = SkipParam,
     limit: int = 20,
     document_id: Optional[int] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """List user's analyses."""
+    """List user's analyses, newest first (next page in X-Next-Cursor).
     
-    from sqlalchemy.orm import joinedload
+    Two column-projected queries: the page of analyses with their document,
+    then the recommendation summaries of the completed ones.
+    """
     
-    query = db.query(Analysis).filter(Analysis.user_id == current_user.id)
+    query = select(
+        Analysis.id,
+        Analysis.document_id,
+        Analysis.status,
+        Analysis.created_at,
+        Analysis.processing_time,
+        Document.filename,
+        Document.document_type
+    ).outerjoin(Document, Document.id == Analysis.document_id).where(Analysis.user_id == current_user.id)
     
     if document_id:
-        query = query.filter(Analysis.document_id == document_id)
-    
-    # Join with document and career_recommendations
-    analyses = query.options(
-        joinedload(Analysis.document),
-        joinedload(Analysis.career_recommendations)
-    ).order_by(Analysis.created_at.desc()).offset(skip).limit(limit).all()
-    
-    # Convert to response format with document info
-    result = []
-    for analysis in analyses:
-        analysis_dict = {
-            "id": analysis.id,
-            "document_id": analysis.document_id,
-            "status": analysis.status,
-            "created_at": analysis.created_at,
-            "processing_time": analysis.processing_time
-        }
-        
-        # Add document info if available
-        if analysis.document:
-            analysis_dict["document"] = {
-                "filename": analysis.document.filename,
-                "document_type": analysis.document.document_type
-            }
-        
-        # Add career recommendations if completed
-        if analysis.status == AnalysisStatus.COMPLETED and analysis.career_recommendations:
-            analysis_dict["career_recommendations"] = [
-                {
-                    "career_type": rec.career_type.value,
-                    "title": rec.title,
-                    "skill_match_percentage": rec.skill_match_percentage,
-                    "salary_range_min": rec.salary_range_min,
-                    "salary_range_max": rec.salary_range_max
-                }
-                for rec in analysis.career_recommendations
-            ]
-        
-        result.append(AnalysisListResponse(**analysis_dict))
+        query = query.where(Analysis.document_id == document_id)
+    
+    sort_key = (Analysis.created_at, Analysis.id)
+    rows = (await db.execute(keyset_paginate(query, sort_key, cursor, skip, limit))).all()
+    set_next_cursor(response, rows, sort_key, limit)
+    
+    completed_ids = [row.id for row in rows if row.status == AnalysisStatus.COMPLETED]
+    recommendations = {}
+    if completed_ids:
+        summaries = await db.execute(
+            select(
+                CareerRecommendation.analysis_id,
+                CareerRecommendation.career_type,
+                CareerRecommendation.title,
+                CareerRecommendation.skill_match_percentage,
+                CareerRecommendation.salary_range_min,
+                CareerRecommendation.salary_range_max
+            ).where(
+                CareerRecommendation.analysis_id.in_(completed_ids)
+            ).order_by(CareerRecommendation.analysis_id, CareerRecommendation.id)
+        )
+        for summary in summaries:
+            recommendations.setdefault(summary.analysis_id, []).append(
+                CareerRecommendationSummary.model_validate(summary)
+            )
     
-    return result
+    return [
+        AnalysisListResponse(
+            id=row.id,
+            document_id=row.document_id,
+            status=row.status,
+            created_at=row.created_at,
+            processing_time=row.processing_time,
+            document=DocumentInfo.model_validate(row) if row.filename is not None else None,
+            career_recommendations=recommendations.get(row.id)
+        )
+        for row in rows
+    ]
 
 
 @router.post("/{analysis_id}/process")
 async def process_analysis_now(
     analysis_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Process analysis immediately (for testing)."""
     
-    analysis = db.query(Analysis).filter(
-        Analysis.id == analysis_id,
-        Analysis.user_id == current_user.id
-    ).first()
+    analysis = (await db.execute(
+        select(Analysis).where(
+            Analysis.id == analysis_id,
+            Analysis.user_id == current_user.id
+        )
+    )).scalar_one_or_none()
     
     if not analysis:
         raise HTTPException(
@@ -173,55 +361,49 @@ async def process_analysis_now(
         )
     
     try:
-        # Update status
-        analysis.status = AnalysisStatus.PROCESSING
-        db.commit()
-        
         start_time = datetime.utcnow()
         
         # Get document
-        document = db.query(Document).filter(Document.id == analysis.document_id).first()
+        document = (await db.execute(
+            select(Document).options(undefer(Document.raw_text)).where(Document.id == analysis.document_id)
+        )).scalar_one()
+        raw_text = await document_text_store.load(document)
+        
+        choice = await model_router.choose_async(len(raw_text), document.document_type.value)
+        analysis.status = AnalysisStatus.PROCESSING
+        analysis.model_name = choice.model_name
+        await db.commit()
+        await publish_status_async(analysis_id, AnalysisStatus.PROCESSING)
         
         # Call Gemini API
         result = await gemini_service.analyze_resume(
-            document.raw_text,
-            document.document_type.value
+            raw_text,
+            document.document_type.value,
+            choice.model_name
         )
         
-        # Update analysis with results
-        analysis.status = AnalysisStatus.COMPLETED
-        analysis.processing_time = (datetime.utcnow() - start_time).total_seconds()
-        analysis.gemini_response = result["data"]
-        analysis.career_paths = result["data"].get("career_paths", [])
-        analysis.skill_gaps = result["data"].get("skill_gaps", [])
-        
-        # Create career recommendations
-        for path in result["data"].get("career_paths", []):
-            recommendation = CareerRecommendation(
-                analysis_id=analysis.id,
-                career_type=CareerType(path["type"]),
-                title=path["title"],
-                description=path["description"],
-                required_skills=path.get("required_skills", []),
-                skill_match_percentage=path.get("skill_match_percentage", 0),
-                skill_gaps=path.get("skill_gaps", []),
-                salary_range_min=path.get("salary_range", {}).get("min"),
-                salary_range_max=path.get("salary_range", {}).get("max"),
-                market_demand=path.get("market_demand"),
-                confidence_score=path.get("confidence_score", 0.5),
-                next_steps=path.get("next_steps", [])
-            )
-            db.add(recommendation)
-        
-        db.commit()
+        # Result and recommendations in one transaction
+        processing_time = (datetime.utcnow() - start_time).total_seconds()
+        analysis.model_name = result["model_name"]
+        await db.run_sync(
+            lambda session: persist_analysis_result(session, analysis_id, result["data"], processing_time)
+        )
+        await db.commit()
+        await publish_status_async(analysis_id, AnalysisStatus.COMPLETED)
         
-        return {"message": "Analysis completed successfully", "analysis_id": analysis.id}
+        return {"message": "Analysis completed successfully", "analysis_id": analysis_id}
         
     except Exception as e:
         logger.error(f"Analysis processing failed: {str(e)}")
-        analysis.status = AnalysisStatus.FAILED
-        analysis.error_message = str(e)
-        db.commit()
+        # Rollback expires loaded objects, which cannot be refreshed lazily here
+        await db.rollback()
+        await db.execute(
+            update(Analysis)
+            .where(Analysis.id == analysis_id)
+            .values(status=AnalysisStatus.FAILED, error_message=str(e))
+        )
+        await db.commit()
+        await publish_status_async(analysis_id, AnalysisStatus.FAILED, str(e))
         
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -234,15 +416,17 @@ async def get_career_paths(
     analysis_id: int,
     career_type: Optional[CareerType] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get career path recommendations from analysis."""
     
     # Verify analysis belongs to user
-    analysis = db.query(Analysis).filter(
-        Analysis.id == analysis_id,
-        Analysis.user_id == current_user.id
-    ).first()
+    analysis = (await db.execute(
+        select(Analysis).where(
+            Analysis.id == analysis_id,
+            Analysis.user_id == current_user.id
+        )
+    )).scalar_one_or_none()
     
     if not analysis:
         raise HTTPException(
@@ -250,13 +434,13 @@ async def get_career_paths(
             detail="Analysis not found"
         )
     
-    query = db.query(CareerRecommendation).filter(
+    query = select(CareerRecommendation).where(
         CareerRecommendation.analysis_id == analysis_id
     )
     
     if career_type:
-        query = query.filter(CareerRecommendation.career_type == career_type)
+        query = query.where(CareerRecommendation.career_type == career_type)
     
-    recommendations = query.all()
+    recommendations = (await db.execute(query)).scalars().all()
     
     return [CareerPathResponse.from_orm(rec) for rec in recommendations]
\ No newline at end of file
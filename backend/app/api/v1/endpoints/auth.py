@@ -1,7 +1,8 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.api.dependencies import get_db
 from app.core.config import settings
 from app.core.security import create_access_token, verify_password, get_password_hash
@@ -14,13 +15,13 @@ router = APIRouter()
 
 @router.post("/login", response_model=Token)
 async def login(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     form_data: OAuth2PasswordRequestForm = Depends()
 ):
     """OAuth2 compatible login endpoint."""
     
     # Find user by email
-    user = db.query(User).filter(User.email == form_data.username).first()
+    user = (await db.execute(select(User).where(User.email == form_data.username))).scalar_one_or_none()
     
     if not user or not verify_password(form_data.password, user.hashed_password):
         raise HTTPException(
@@ -48,12 +49,12 @@ async def login(
 @router.post("/register", response_model=UserResponse)
 async def register(
     user_data: UserCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Register a new user."""
     
     # Check if user already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    existing_user = (await db.execute(select(User).where(User.email == user_data.email))).scalar_one_or_none()
     
     if existing_user:
         raise HTTPException(
@@ -71,7 +72,7 @@ async def register(
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     return UserResponse.from_orm(db_user)
\ No newline at end of file
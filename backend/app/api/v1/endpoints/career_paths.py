@@ -1,35 +1,120 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.api.dependencies import get_db, get_current_user
+from app.api.pagination import CursorParam, SkipParam, keyset_paginate, set_next_cursor
 from app.models.user import User
+from app.models.analysis import Analysis
 from app.models.career_recommendation import CareerRecommendation, CareerType
-from app.schemas.analysis import CareerPathResponse
+from app.schemas.analysis import CareerPathResponse, CareerPathDetailResponse
+from app.services.career_catalog import career_catalog
+import logging
 
+logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
 @router.get("/", response_model=List[CareerPathResponse])
 async def list_all_career_paths(
+    response: Response,
     career_type: Optional[CareerType] = None,
-    skip: int = 0,
+    cursor: Optional[str] = CursorParam,
+    skip: int = SkipParam,
     limit: int = 20,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """List all career paths for the current user across all analyses."""
+    """List all career paths for the current user across all analyses, most confident first.
     
-    query = db.query(CareerRecommendation).join(
+    The next page is in the X-Next-Cursor header.
+    """
+    
+    # A plain join filter (not .has(), which adds a correlated EXISTS) lets
+    # the planner drive the join from the user's analyses index
+    query = select(CareerRecommendation).join(
         CareerRecommendation.analysis
-    ).filter(
-        CareerRecommendation.analysis.has(user_id=current_user.id)
+    ).where(
+        Analysis.user_id == current_user.id
     )
     
     if career_type:
-        query = query.filter(CareerRecommendation.career_type == career_type)
+        query = query.where(CareerRecommendation.career_type == career_type)
+    
+    sort_key = (CareerRecommendation.confidence_score, CareerRecommendation.id)
+    recommendations = (await db.execute(
+        keyset_paginate(query, sort_key, cursor, skip, limit)
+    )).scalars().all()
+    
+    set_next_cursor(response, recommendations, sort_key, limit)
+    return [CareerPathResponse.from_orm(rec) for rec in recommendations]
+
+
+@router.get("/{recommendation_id}/details", response_model=CareerPathDetailResponse)
+async def get_career_path_details(
+    recommendation_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get detailed information for a career path, served from the shared catalog."""
     
-    recommendations = query.order_by(
-        CareerRecommendation.confidence_score.desc()
-    ).offset(skip).limit(limit).all()
+    recommendation = (await db.execute(
+        select(CareerRecommendation).join(
+            CareerRecommendation.analysis
+        ).where(
+            CareerRecommendation.id == recommendation_id,
+            Analysis.user_id == current_user.id
+        )
+    )).scalar_one_or_none()
     
-    return [CareerPathResponse.from_orm(rec) for rec in recommendations]
\ No newline at end of file
+    if not recommendation:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Career path not found"
+        )
+    
+    # Return the connection to the pool while the catalog may call Gemini
+    await db.commit()
+    
+    try:
+        detail = await career_catalog.get_or_generate(
+            recommendation.career_type,
+            recommendation.title,
+            recommendation.required_skills or [],
+            recommendation.skill_match_percentage
+        )
+    except Exception as e:
+        logger.error(f"Career path detail generation failed: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to generate career path details: {str(e)}"
+        ) from e
+    
+    path = detail.get("detailed_path", detail)
+    
+    try:
+        preparation_time = int(path.get("estimated_preparation_time"))
+    except (TypeError, ValueError):
+        preparation_time = None
+    
+    # Fill the recommendation's learning-path fields the first time details are viewed
+    if recommendation.pros is None:
+        recommendation.pros = path.get("pros", [])
+        recommendation.cons = path.get("cons", [])
+        recommendation.recommended_courses = path.get("recommended_courses", [])
+        recommendation.estimated_preparation_time = preparation_time
+        await db.commit()
+    
+    return CareerPathDetailResponse(
+        id=recommendation.id,
+        career_type=recommendation.career_type,
+        title=path.get("title") or recommendation.title,
+        description=path.get("description"),
+        pros=path.get("pros", []),
+        cons=path.get("cons", []),
+        required_skills=path.get("required_skills", []),
+        recommended_courses=path.get("recommended_courses", []),
+        estimated_preparation_time=preparation_time,
+        success_stories=path.get("success_stories", []),
+        market_trends=path.get("market_trends")
+    )
@@ -1,17 +1,23 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Response, UploadFile, File, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
+from typing import List, Optional
 import aiofiles
 import os
+import uuid
 from app.core.config import settings
-from app.services.document_processor import document_processor
 from app.services.s3_service import s3_service
-from app.models.document import Document, DocumentStatus
+from app.services.document_text import document_text_store
+from app.services.near_duplicate import near_duplicate_index
+from app.models.base import loaded_attributes
+from app.models.document import Document, DocumentStatus, DocumentType
 from app.models.analysis import Analysis, AnalysisStatus
 from app.schemas.document import DocumentCreate, DocumentResponse, DocumentList
 from app.api.dependencies import get_db, get_current_user
+from app.api.pagination import CursorParam, SkipParam, keyset_paginate, set_next_cursor
 from app.models.user import User
-from app.workers.tasks import process_analysis_task
+from app.workers.celery_app import PRIORITY_INTERACTIVE
 import logging
 
 logger = logging.getLogger(__name__)
@@ -22,7 +28,7 @@ router = APIRouter()
 async def upload_document(
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Upload a resume or CV document."""
     
@@ -47,23 +53,12 @@ async def upload_document(
         )
     
     try:
-        # Extract text from document
-        logger.info(f"Processing {file.filename} ({file_size} bytes, type: {file_extension})")
-        text = await document_processor.extract_text(contents, file_extension)
+        logger.info(f"Uploading {file.filename} ({file_size} bytes, type: {file_extension})")
         
-        if not text or len(text.strip()) == 0:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="ドキュメントからテキストを抽出できませんでした。PDFが空か、スキャンされた画像の可能性があります。"
-            )
-        
-        logger.info(f"Successfully extracted {len(text)} characters from {file.filename}")
-        
-        # Detect document type
-        doc_type = document_processor.detect_document_type(text, file.filename)
-        
-        # Upload to S3
-        s3_key = f"documents/{current_user.id}/{file.filename}"
+        # Upload to S3; text extraction and OCR run on their own worker queues
+        # and read it back later, so every upload gets its own object even
+        # when the user uploads the same file name again
+        s3_key = f"documents/{current_user.id}/{uuid.uuid4().hex}/{file.filename}"
         await s3_service.upload_file(contents, s3_key, file.content_type)
         
         # Create database record
@@ -71,24 +66,16 @@ async def upload_document(
             user_id=current_user.id,
             filename=file.filename,
             file_type=file_extension,
-            document_type=doc_type,
+            document_type=DocumentType.OTHER,
             file_size=file_size,
             s3_key=s3_key,
-            status=DocumentStatus.PROCESSED,
-            raw_text=text
+            status=DocumentStatus.UPLOADED
         )
         
-        # Parse structured data based on document type
-        if doc_type == "resume":
-            db_document.structured_data = document_processor.parse_japanese_resume(text)
-        elif doc_type == "cv":
-            db_document.structured_data = document_processor.parse_japanese_cv(text)
-        
         db.add(db_document)
-        db.commit()
-        db.refresh(db_document)
+        await db.flush()
         
-        # Create analysis record automatically
+        # Create analysis record automatically, in the same transaction
         db_analysis = Analysis(
             user_id=current_user.id,
             document_id=db_document.id,
@@ -96,19 +83,22 @@ async def upload_document(
         )
         
         db.add(db_analysis)
-        db.commit()
-        db.refresh(db_analysis)
-        
-        # Queue Celery task for analysis
-        from app.workers.tasks import process_analysis_task
-        process_analysis_task.delay(db_analysis.id)
+        await db.commit()
         
-        # Return document response with analysis_id
-        response = DocumentResponse.from_orm(db_document)
-        response_dict = response.dict()
-        response_dict['analysis_id'] = db_analysis.id
+        # Extraction queues the analysis once the text is available; uploads
+        # jump ahead of backfill work on every queue
+        from app.workers.tasks import extract_document_task
+        extract_document_task.apply_async(
+            (db_document.id, db_analysis.id, PRIORITY_INTERACTIVE),
+            priority=PRIORITY_INTERACTIVE
+        )
         
-        return response_dict
+        # Return document response with analysis_id; attributes the insert
+        # did not set are left out rather than loaded from the database
+        return DocumentResponse(
+            **loaded_attributes(db_document, DocumentResponse.model_fields),
+            analysis_id=db_analysis.id
+        )
         
     except Exception as e:
         logger.error(f"Document upload failed: {str(e)}")
@@ -120,32 +110,45 @@ async def upload_document(
 
 @router.get("/", response_model=List[DocumentList])
 async def list_documents(
-    skip: int = 0,
+    response: Response,
+    cursor: Optional[str] = CursorParam,
+    skip: int = SkipParam,
     limit: int = 20,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """List user's uploaded documents."""
+    """List user's uploaded documents, newest first (next page in X-Next-Cursor)."""
     
-    documents = db.query(Document).filter(
-        Document.user_id == current_user.id
-    ).offset(skip).limit(limit).all()
+    sort_key = (Document.created_at, Document.id)
+    documents = (await db.execute(
+        keyset_paginate(
+            select(Document).where(Document.user_id == current_user.id),
+            sort_key, cursor, skip, limit
+        )
+    )).scalars().all()
     
+    set_next_cursor(response, documents, sort_key, limit)
     return [DocumentList.from_orm(doc) for doc in documents]
 
 
 @router.get("/{document_id}", response_model=DocumentResponse)
 async def get_document(
     document_id: int,
+    include_text: bool = False,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get document details."""
+    """Get document details; the extracted text only with include_text=true."""
     
-    document = db.query(Document).filter(
-        Document.id == document_id,
-        Document.user_id == current_user.id
-    ).first()
+    query = select(Document)
+    if include_text:
+        query = query.options(undefer(Document.raw_text))
+    document = (await db.execute(
+        query.where(
+            Document.id == document_id,
+            Document.user_id == current_user.id
+        )
+    )).scalar_one_or_none()
     
     if not document:
         raise HTTPException(
@@ -153,21 +156,26 @@ async def get_document(
             detail="Document not found"
         )
     
-    return DocumentResponse.from_orm(document)
+    response = DocumentResponse(**loaded_attributes(document, DocumentResponse.model_fields))
+    if include_text:
+        response.raw_text = await document_text_store.load(document)
+    return response
 
 
 @router.delete("/{document_id}")
 async def delete_document(
     document_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete a document."""
     
-    document = db.query(Document).filter(
-        Document.id == document_id,
-        Document.user_id == current_user.id
-    ).first()
+    document = (await db.execute(
+        select(Document).where(
+            Document.id == document_id,
+            Document.user_id == current_user.id
+        )
+    )).scalar_one_or_none()
     
     if not document:
         raise HTTPException(
@@ -181,8 +189,11 @@ async def delete_document(
     except Exception as e:
         logger.error(f"Failed to delete S3 file: {str(e)}")
     
+    await document_text_store.delete(document)
+    await near_duplicate_index.remove(document.id, document.user_id)
+    
     # Delete from database
-    db.delete(document)
-    db.commit()
+    await db.delete(document)
+    await db.commit()
     
     return {"message": "Document deleted successfully"}
\ No newline at end of file
@@ -1,7 +1,9 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.api.dependencies import get_db, get_current_user, get_current_active_superuser
+from app.api.pagination import CursorParam, SkipParam, keyset_paginate, set_next_cursor
 from app.core.security import get_password_hash
 from app.models.user import User
 from app.schemas.user import UserResponse, UserUpdate
@@ -21,43 +23,58 @@ async def read_current_user(
 async def update_current_user(
     user_update: UserUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update current user information."""
     
+    # current_user is a detached (possibly cached) copy; change the stored row.
+    # Committing invalidates the cached user (see services/auth_cache.py).
+    user = await db.get(User, current_user.id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
     # Update fields if provided
     if user_update.email is not None:
         # Check if email is already taken
-        existing_user = db.query(User).filter(
-            User.email == user_update.email,
-            User.id != current_user.id
-        ).first()
+        existing_user = (await db.execute(
+            select(User).where(
+                User.email == user_update.email,
+                User.id != user.id
+            )
+        )).scalar_one_or_none()
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already registered"
             )
-        current_user.email = user_update.email
+        user.email = user_update.email
     
     if user_update.full_name is not None:
-        current_user.full_name = user_update.full_name
+        user.full_name = user_update.full_name
     
     if user_update.password is not None:
-        current_user.hashed_password = get_password_hash(user_update.password)
+        user.hashed_password = get_password_hash(user_update.password)
     
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    await db.refresh(user)
     
-    return UserResponse.model_validate(current_user)
+    return UserResponse.model_validate(user)
 
 
 @router.get("/", response_model=List[UserResponse])
 async def list_users(
-    skip: int = 0,
+    response: Response,
+    cursor: Optional[str] = CursorParam,
+    skip: int = SkipParam,
     limit: int = 100,
     current_user: User = Depends(get_current_active_superuser),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """List all users (superuser only)."""
-    users = db.query(User).offset(skip).limit(limit).all()
+    """List all users, newest first (superuser only; next page in X-Next-Cursor)."""
+    sort_key = (User.created_at, User.id)
+    users = (await db.execute(keyset_paginate(select(User), sort_key, cursor, skip, limit))).scalars().all()
+    set_next_cursor(response, users, sort_key, limit)
     return [UserResponse.model_validate(user) for user in users]
\ No newline at end of file
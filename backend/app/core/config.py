@@ -9,6 +9,7 @@ class Settings(BaseSettings):
     APP_NAME: str = "AI Career Discovery Assistant"
     APP_VERSION: str = "0.1.0"
     DEBUG: bool = True
+    API_METRICS_PORT: int = 9100  # Internal Prometheus endpoint of the API; 0 disables it
     API_V1_STR: str = "/api/v1"
     
     # Security
@@ -19,6 +20,9 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str
+    DB_POOL_SIZE: int = 5  # Per process; raise for the gevent analysis worker
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
     
     # Redis
     REDIS_URL: str
@@ -39,6 +43,53 @@ class Settings(BaseSettings):
     # Google Gemini API
     GEMINI_API_KEY: str
     GEMINI_MODEL: str = "gemini-pro"
+    GEMINI_ANALYSIS_MODE: str = "single"  # single or fanout (one call per career type)
+    GEMINI_CHUNKED_THRESHOLD_CHARS: int = 40000  # Longer documents use map-reduce analysis
+    GEMINI_CHUNK_SIZE_CHARS: int = 15000
+    GEMINI_CHUNK_PARALLELISM: int = 4
+    GEMINI_FAST_MODEL: Optional[str] = "gemini-1.5-flash"  # Fast tier for model routing
+    GEMINI_OCR_MODEL: str = "gemini-1.5-flash"
+    GEMINI_API_KEYS: Optional[List[str]] = None  # Extra keys for the pool
+    
+    @field_validator("GEMINI_API_KEYS", mode='before')
+    @classmethod
+    def assemble_gemini_api_keys(cls, v: Union[str, List[str], None]) -> Optional[List[str]]:
+        if v is None or v == "":
+            return None
+        if isinstance(v, str):
+            # Parse comma-separated string
+            return [key.strip() for key in v.split(",") if key.strip()]
+        return v
+    
+    # Gemini rate limiting (shared across API and Celery processes via Redis)
+    GEMINI_RATE_LIMIT_ENABLED: bool = True
+    GEMINI_REQUESTS_PER_MINUTE: int = 60  # Per API key
+    GEMINI_TOKENS_PER_MINUTE: int = 1_000_000  # Per API key
+    GEMINI_ESTIMATED_OUTPUT_TOKENS: int = 2048
+    GEMINI_RATE_LIMIT_MAX_WAIT_SECONDS: int = 120
+    
+    # Gemini tail latency: hedged requests and circuit breaker
+    GEMINI_REQUEST_TIMEOUT_SECONDS: int = 120
+    GEMINI_HEDGING_ENABLED: bool = False
+    GEMINI_HEDGE_PERCENTILE: float = 0.95  # Send the hedge after this latency percentile
+    GEMINI_HEDGE_MIN_SAMPLES: int = 20  # Latency samples needed before hedging starts
+    GEMINI_FALLBACK_MODEL: Optional[str] = None  # Used while the primary circuit is open
+    GEMINI_CIRCUIT_FAILURE_RATE: float = 0.5
+    GEMINI_CIRCUIT_MIN_CALLS: int = 10
+    GEMINI_CIRCUIT_WINDOW_SECONDS: int = 60
+    GEMINI_CIRCUIT_OPEN_SECONDS: int = 30
+    
+    # Context caching of the static analysis instructions. Needs explicit model
+    # versions (e.g. gemini-1.5-flash-002) and a prefix above the model's minimum
+    # cacheable size; otherwise the full prompt is sent.
+    GEMINI_CONTEXT_CACHE_ENABLED: bool = False
+    GEMINI_CONTEXT_CACHE_TTL_SECONDS: int = 60 * 60
+    GEMINI_CONTEXT_CACHE_REFRESH_SECONDS: int = 5 * 60  # Extend the TTL within this margin of expiry
+    GEMINI_CONTEXT_CACHE_RETRY_SECONDS: int = 15 * 60  # Wait before retrying a failed cache creation
+    
+    # Local Google API simulator (Gemini + Cloud Vision) for load and latency testing,
+    # e.g. "http://localhost:8090". Unset to use the real Google APIs.
+    GOOGLE_API_SIMULATOR_URL: Optional[str] = None
     
     # AWS S3 / MinIO
     AWS_ACCESS_KEY_ID: str = "minioadmin"
@@ -47,6 +98,10 @@ class Settings(BaseSettings):
     S3_BUCKET_NAME: str = "career-assistant"
     S3_ENDPOINT_URL: Optional[str] = "http://minio:9000"  # For MinIO in development
     
+    # Extracted texts larger than this are stored in S3 instead of
+    # documents.raw_text; 0 keeps every text in the database
+    DOCUMENT_TEXT_OFFLOAD_BYTES: int = 0
+    
     # File Upload
     MAX_UPLOAD_SIZE_MB: int = 10
     ALLOWED_EXTENSIONS: Optional[List[str]] = None
@@ -61,9 +116,66 @@ class Settings(BaseSettings):
             return [ext.strip() for ext in v.split(",") if ext.strip()]
         return v
     
+    # Near-duplicate resume detection (MinHash/LSH over character shingles)
+    NEAR_DUP_ENABLED: bool = True
+    NEAR_DUP_THRESHOLD: float = 0.9  # Estimated Jaccard similarity needed to reuse an analysis
+    NEAR_DUP_SHINGLE_SIZE: int = 5
+    NEAR_DUP_NUM_PERM: int = 128
+    NEAR_DUP_BANDS: int = 32
+    NEAR_DUP_MAX_AGE_DAYS: int = 30  # Only reuse analyses at most this old
+    
+    # Single-flight analyses of identical document content
+    ANALYSIS_SINGLE_FLIGHT_ENABLED: bool = True
+    ANALYSIS_SINGLE_FLIGHT_LOCK_SECONDS: int = 12 * 60  # Leader lock, the analyze queue's soft time limit
+    ANALYSIS_SINGLE_FLIGHT_WAIT_SECONDS: int = 10 * 60  # Followers generate themselves after this
+    # Leader output is kept only for followers that were waiting (they poll every second)
+    ANALYSIS_SINGLE_FLIGHT_RESULT_TTL_SECONDS: int = 10
+    
+    # Analysis status stream (server-sent events)
+    ANALYSIS_EVENTS_KEEPALIVE_SECONDS: int = 15
+    ANALYSIS_EVENTS_MAX_SECONDS: int = 15 * 60  # Clients reconnect after this
+    ANALYSIS_EVENTS_TOKEN_TTL_SECONDS: int = 60  # Stream tokens only need to outlive the connect
+    
+    # Career catalog (shared cache of detailed career paths)
+    CAREER_CATALOG_TTL_SECONDS: int = 7 * 24 * 60 * 60
+    CAREER_CATALOG_LOCK_SECONDS: int = 120  # Single-flight generation lock
+    CAREER_CATALOG_PREFETCH_ENABLED: bool = False
+    CAREER_CATALOG_PREFETCH_TOP_N: int = 20
+    CAREER_CATALOG_PREFETCH_INTERVAL_SECONDS: int = 6 * 60 * 60
+    
     # Celery
     CELERY_BROKER_URL: str
     CELERY_RESULT_BACKEND: str
+    CELERY_ANALYSIS_QUEUE: str = "analyze"  # Consumed by the gevent (I/O-bound) worker
+    CELERY_METRICS_PORT: int = 9808  # Prometheus endpoint of each worker; 0 disables it
+    CELERY_WORKER_MAX_MEMORY_MB: int = 512  # Prefork child is replaced after a task leaves it above this RSS
+    CELERY_WORKER_MAX_TASKS_PER_CHILD: int = 0  # Optional count-based backstop; 0 disables it
+    
+    # Model tiering: route analyses between GEMINI_FAST_MODEL and GEMINI_MODEL
+    MODEL_ROUTING_ENABLED: bool = False
+    MODEL_ROUTING_FAST_MAX_CHARS: int = 6000
+    MODEL_ROUTING_FAST_DOCUMENT_TYPES: Optional[List[str]] = ["skill_sheet", "resume"]
+    MODEL_ROUTING_QUEUE: str = "analyze"  # Broker queue holding analysis tasks
+    MODEL_ROUTING_QUEUE_DEPTH_THRESHOLD: int = 50
+    MODEL_ROUTING_MAX_ERROR_RATE: float = 0.2
+    MODEL_ROUTING_MAX_MEDIAN_SECONDS: float = 60.0
+    
+    @field_validator("MODEL_ROUTING_FAST_DOCUMENT_TYPES", mode='before')
+    @classmethod
+    def assemble_fast_document_types(cls, v: Union[str, List[str], None]) -> Optional[List[str]]:
+        if v is None or v == "":
+            return None
+        if isinstance(v, str):
+            # Parse comma-separated string
+            return [doc_type.strip() for doc_type in v.split(",") if doc_type.strip()]
+        return v
+    
+    # Bulk re-analysis
+    BULK_REANALYSIS_DOCS_PER_MINUTE: int = 30
+    BULK_REANALYSIS_TIME_BUDGET_SECONDS: int = 20 * 60  # Per task, below the soft time limit
+    BULK_PACK_MAX_DOCS: int = 5  # Documents packed into one model request
+    BULK_PACK_MAX_CHARS: int = 12000  # Total characters packed into one model request
+    BULK_PACK_MAX_DOC_CHARS: int = 4000  # Longer documents are analyzed on their own
     
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: int = 60
@@ -71,6 +183,16 @@ class Settings(BaseSettings):
     # Session
     SESSION_LIFETIME_HOURS: int = 24
     
+    # Authentication cache of verified tokens and active users. A changed user
+    # is invalidated in this process and in Redis; other processes keep their
+    # local copy for at most AUTH_CACHE_LOCAL_TTL_SECONDS with Redis enabled,
+    # AUTH_CACHE_TTL_SECONDS without.
+    AUTH_CACHE_ENABLED: bool = True
+    AUTH_CACHE_TTL_SECONDS: int = 30
+    AUTH_CACHE_MAX_ENTRIES: int = 10000  # Per process, for tokens and users each
+    AUTH_CACHE_REDIS_ENABLED: bool = False
+    AUTH_CACHE_LOCAL_TTL_SECONDS: int = 5
+    
     # Logging
     LOG_LEVEL: str = "INFO"
     
@@ -1,18 +1,67 @@
+import time
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from app.core.config import settings
+from app.core.metrics import DB_POOL_CHECKOUT_WAIT
 
-# Create engine
+
+class _CheckoutTimingMixin:
+    """Records how long callers wait for a connection from the pool."""
+
+    def _do_get(self):
+        start = time.monotonic()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(time.monotonic() - start)
+
+
+class InstrumentedQueuePool(_CheckoutTimingMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_CheckoutTimingMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def async_database_url(url: str):
+    """DATABASE_URL with the asyncpg driver (psycopg2 stays for Celery and Alembic)."""
+    
+    parsed = make_url(url)
+    if parsed.drivername in ("postgresql", "postgresql+psycopg2"):
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+    return parsed
+
+
+# Create engine (Celery tasks, Alembic and scripts)
 engine = create_engine(
     settings.DATABASE_URL,
+    poolclass=InstrumentedQueuePool,
     pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT
 )
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Non-blocking engine for the API; one pool per uvicorn/gunicorn worker process
+async_engine = create_async_engine(
+    async_database_url(settings.DATABASE_URL),
+    poolclass=InstrumentedAsyncQueuePool,
+    pool_pre_ping=True,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT
+)
+
+# Objects stay readable after commit: lazy refreshes are not possible in async code
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # Import Base from models
-from app.models.base import Base
\ No newline at end of file
+from app.models.base import Base
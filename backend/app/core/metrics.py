@@ -0,0 +1,185 @@
+import os
+import time
+from contextlib import contextmanager
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, multiprocess
+from prometheus_client.core import GaugeMetricFamily
+from redis.exceptions import RedisError
+
+# Uvicorn/gunicorn and prefork Celery run several processes per container.
+# With PROMETHEUS_MULTIPROC_DIR set, each process writes its samples to that
+# directory and the exposing process aggregates them on every scrape.
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+CALL_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+TASK_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200, 1800)
+
+# Resilience
+CIRCUIT_BREAKER_STATE = Gauge(
+    "circuit_breaker_state",
+    "Circuit breaker state (0=closed, 1=half_open, 2=open)",
+    ["name"],
+    multiprocess_mode="livemax",
+)
+CIRCUIT_BREAKER_REJECTIONS = Counter(
+    "circuit_breaker_rejections_total",
+    "Calls rejected by an open circuit breaker",
+    ["name"],
+)
+GEMINI_HEDGED_REQUESTS = Counter(
+    "gemini_hedged_requests_total",
+    "Gemini requests that sent a hedge after the latency threshold",
+    ["model"],
+)
+GEMINI_HEDGE_WINS = Counter(
+    "gemini_hedge_wins_total",
+    "Hedged Gemini requests answered first by the hedge",
+    ["model"],
+)
+GEMINI_FALLBACK_REQUESTS = Counter(
+    "gemini_fallback_requests_total",
+    "Gemini requests sent to the fallback model because the primary circuit was open",
+    ["model"],
+)
+GEMINI_CONTEXT_CACHE_EVENTS = Counter(
+    "gemini_context_cache_events_total",
+    "Context cache lookups and lifecycle events (hit, created, create_failed, invalidated, fallback)",
+    ["model", "event"],
+)
+GEMINI_CONTEXT_CACHE_TOKENS_SAVED = Counter(
+    "gemini_context_cache_tokens_saved_total",
+    "Prompt tokens served from a context cache instead of being sent with the request",
+    ["model"],
+)
+
+# HTTP
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time until the response starts, per route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+AUTH_CACHE_LOOKUPS = Counter(
+    "auth_cache_lookups_total",
+    "Authentication cache lookups by cache (token, user) and where they were served (local, redis, miss)",
+    ["cache", "result"],
+)
+
+# Celery
+CELERY_TASK_DURATION = Histogram(
+    "celery_task_duration_seconds",
+    "Task run time on a worker, by final state",
+    ["task", "state"],
+    buckets=TASK_BUCKETS,
+)
+CELERY_TASK_QUEUE_WAIT = Histogram(
+    "celery_task_queue_wait_seconds",
+    "Time between publishing a task and a worker starting it",
+    ["task"],
+    buckets=TASK_BUCKETS,
+)
+CELERY_WORKER_RSS = Gauge(
+    "celery_worker_rss_bytes",
+    "Resident memory of a worker process after its last task",
+    multiprocess_mode="liveall",
+)
+CELERY_TASK_RSS_GROWTH = Histogram(
+    "celery_task_rss_growth_bytes",
+    "Growth of the worker process's resident memory across one task",
+    ["task"],
+    buckets=(0, 2 ** 20, 4 * 2 ** 20, 16 * 2 ** 20, 64 * 2 ** 20, 256 * 2 ** 20),
+)
+
+# External calls (Gemini, Cloud Vision, S3)
+EXTERNAL_CALL_DURATION = Histogram(
+    "external_call_duration_seconds",
+    "Latency of calls to external services",
+    ["service", "operation"],
+    buckets=CALL_BUCKETS,
+)
+EXTERNAL_CALL_ERRORS = Counter(
+    "external_call_errors_total",
+    "Failed calls to external services, by exception type",
+    ["service", "operation", "error"],
+)
+
+# Database
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the SQLAlchemy pool",
+    buckets=LATENCY_BUCKETS,
+)
+
+
+@contextmanager
+def observe_call(service: str, operation: str):
+    """Time an external call and count it as an error if it raises."""
+
+    start = time.monotonic()
+    try:
+        yield
+    except Exception as e:
+        EXTERNAL_CALL_ERRORS.labels(service=service, operation=operation, error=type(e).__name__).inc()
+        raise
+    finally:
+        EXTERNAL_CALL_DURATION.labels(service=service, operation=operation).observe(time.monotonic() - start)
+
+
+class QueueDepthCollector:
+    """Reads Celery broker queue lengths from Redis at scrape time.
+
+    Registered only by the process that serves /metrics, so the depth is
+    reported once per scrape target rather than once per worker process.
+    """
+
+    def describe(self):
+        # Lets the registry check names without querying Redis at registration
+        return [GaugeMetricFamily("celery_queue_depth", "Messages waiting in a Celery broker queue")]
+
+    def collect(self):
+        from app.core.redis import broker_queue_keys, get_redis
+        from app.workers.celery_app import QUEUE_TIME_LIMITS
+
+        depth = GaugeMetricFamily("celery_queue_depth", "Messages waiting in a Celery broker queue", labels=["queue"])
+        try:
+            pipe = get_redis().pipeline()
+            for queue in QUEUE_TIME_LIMITS:
+                for key in broker_queue_keys(queue):
+                    pipe.llen(key)
+            lengths = iter(pipe.execute())
+        except RedisError:
+            # Leave the series absent rather than reporting an empty queue
+            return
+        for queue in QUEUE_TIME_LIMITS:
+            depth.add_metric([queue], sum(next(lengths) for _ in broker_queue_keys(queue)))
+        yield depth
+
+
+class _DefaultRegistryCollector:
+    """Re-exports the process-global registry inside another registry."""
+
+    def collect(self):
+        return REGISTRY.collect()
+
+
+def metrics_registry(include_queue_depth: bool = False) -> CollectorRegistry:
+    """Registry to expose: per-process samples aggregated in multiprocess mode."""
+
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    elif include_queue_depth:
+        registry = CollectorRegistry()
+        registry.register(_DefaultRegistryCollector())
+    else:
+        return REGISTRY
+    if include_queue_depth:
+        registry.register(QueueDepthCollector())
+    return registry
+
+
+def mark_process_dead(pid: int):
+    """Drop the live gauges of an exited process in multiprocess mode."""
+
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(pid)
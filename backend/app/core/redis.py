@@ -0,0 +1,37 @@
+from typing import Optional
+import redis
+from redis import asyncio as aioredis
+from app.core.config import settings
+
+# Deletes the lock only if it is still held by this caller
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def broker_queue_keys(queue: str) -> list:
+    """Redis lists holding a Celery queue's messages, one per priority step."""
+    return [queue] + [f"{queue}:{priority}" for priority in range(1, 10)]
+
+
+_redis_client: Optional[redis.Redis] = None
+_async_redis_client: Optional[aioredis.Redis] = None
+
+
+def get_redis() -> redis.Redis:
+    """Get the shared Redis client (created lazily)."""
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _redis_client
+
+
+def get_async_redis() -> aioredis.Redis:
+    """Get the shared asyncio Redis client (created lazily)."""
+    global _async_redis_client
+    if _async_redis_client is None:
+        _async_redis_client = aioredis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _async_redis_client
@@ -6,6 +6,9 @@ from app.core.config import settings
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Scope of tokens that only open the status stream of one analysis
+ANALYSIS_EVENTS_SCOPE = "analysis_events"
+
 
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token."""
@@ -20,6 +23,19 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
     return encoded_jwt
 
 
+def create_analysis_events_token(user_id: int, analysis_id: int) -> str:
+    """Create a short-lived token for the status stream of one analysis.
+    
+    EventSource cannot set headers, so the token goes in the query string,
+    and from there into access logs; unlike the access token it is useless
+    for anything else and expires in seconds.
+    """
+    return create_access_token(
+        {"sub": str(user_id), "analysis_id": analysis_id, "scope": ANALYSIS_EVENTS_SCOPE},
+        expires_delta=timedelta(seconds=settings.ANALYSIS_EVENTS_TOKEN_TTL_SECONDS)
+    )
+
+
 def verify_token(token: str) -> Optional[Dict[str, Any]]:
     """Verify JWT token and return payload."""
     try:
@@ -1,8 +1,13 @@
+import time
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from prometheus_client import start_http_server
 from app.core.config import settings
+from app.core.database import async_engine
+from app.core.metrics import HTTP_REQUEST_DURATION, MULTIPROCESS, metrics_registry
 from app.api.v1.api import api_router
+from app.api.pagination import NEXT_CURSOR_HEADER
 
 
 @asynccontextmanager
@@ -10,9 +15,13 @@ async def lifespan(app: FastAPI):
     # Startup
     print("Starting up AI Career Discovery Assistant API...")
     # Initialize connections, etc.
+    if settings.API_METRICS_PORT and not MULTIPROCESS:
+        # Single-process server (uvicorn); gunicorn serves them from its master
+        start_http_server(settings.API_METRICS_PORT, registry=metrics_registry(include_queue_depth=True))
     yield
     # Shutdown
     print("Shutting down...")
+    await async_engine.dispose()
     # Close connections, cleanup
 
 
@@ -31,12 +40,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
 
+@app.middleware("http")
+async def record_request_duration(request: Request, call_next):
+    """Observe request latency per route template (not per raw path, to bound cardinality)."""
+    
+    start = time.monotonic()
+    response = await call_next(request)
+    # Streaming responses (SSE) return here once headers are ready
+    route = request.scope.get("route")
+    if route is not None:
+        HTTP_REQUEST_DURATION.labels(
+            method=request.method,
+            route=route.path,
+            status=response.status_code,
+        ).observe(time.monotonic() - start)
+    return response
+
+
 @app.get("/")
 async def root():
     return {
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, Text, JSON, Enum, Float
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Integer, ForeignKey, Text, JSON, Enum, Float, Index
+from sqlalchemy.orm import deferred, relationship
 import enum
 from app.models.base import Base, TimestampMixin
 
@@ -11,8 +11,22 @@ class AnalysisStatus(str, enum.Enum):
     FAILED = "failed"
 
 
+class PipelineStage(str, enum.Enum):
+    """Last checkpointed stage of process_analysis_task, for resuming retries.
+
+    fetch and parse are cheap and deterministic, so they are recomputed.
+    """
+    GENERATE = "generate"  # raw_model_output is saved
+    PERSIST = "persist"  # Result and recommendations are stored
+
+
 class Analysis(Base, TimestampMixin):
     __tablename__ = "analyses"
+    __table_args__ = (
+        # Hot per-user and per-document lookups; see alembic 005
+        Index("ix_analyses_user_id_created_at", "user_id", "created_at", "id"),
+        Index("ix_analyses_document_id_user_id_created_at", "document_id", "user_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -22,15 +36,20 @@ class Analysis(Base, TimestampMixin):
     status = Column(Enum(AnalysisStatus), default=AnalysisStatus.PENDING)
     error_message = Column(Text, nullable=True)
     processing_time = Column(Float, nullable=True)  # in seconds
+    reused_from_analysis_id = Column(Integer, ForeignKey("analyses.id", ondelete="SET NULL"), nullable=True)  # Near-duplicate reuse
+    pipeline_stage = Column(String, nullable=True)  # Last completed PipelineStage
     
     # Analysis results
-    career_paths = Column(JSON, nullable=True)  # List of recommended career paths
+    career_paths = deferred(Column(JSON, nullable=True))  # List of recommended career paths
     skill_gaps = Column(JSON, nullable=True)  # Identified skill gaps
     market_insights = Column(JSON, nullable=True)  # Market data and trends
     
     # Gemini API specific
-    gemini_prompt = Column(Text, nullable=True)  # Prompt sent to Gemini
-    gemini_response = Column(JSON, nullable=True)  # Raw response from Gemini
+    model_name = Column(String, nullable=True)  # Model chosen by the router
+    # Large model I/O is deferred: loaded on first access (sync) or with undefer()
+    gemini_prompt = deferred(Column(Text, nullable=True))  # Prompt sent to Gemini
+    gemini_response = deferred(Column(JSON, nullable=True))  # Raw response from Gemini
+    raw_model_output = deferred(Column(Text, nullable=True))  # Unparsed model text, saved before parsing
     
     # Scores and metrics
     confidence_scores = Column(JSON, nullable=True)  # Confidence for each recommendation
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, DateTime
+from sqlalchemy import Column, DateTime, inspect
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
@@ -9,4 +9,19 @@ class TimestampMixin:
     """Mixin that adds timestamp fields to models."""
     
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
\ No newline at end of file
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
+def loaded_attributes(instance, names) -> dict:
+    """Loaded attributes of a mapped instance among names.
+    
+    Deferred, expired and never-set columns are skipped, so async code can
+    build a response without triggering a lazy load.
+    """
+    
+    state = inspect(instance)
+    return {
+        name: getattr(instance, name)
+        for name in names
+        if name in state.mapper.column_attrs and name not in state.unloaded
+    }
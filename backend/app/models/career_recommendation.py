@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, Text, JSON, Enum, Float
+from sqlalchemy import Column, String, Integer, ForeignKey, Text, JSON, Enum, Float, Index
 from sqlalchemy.orm import relationship
 import enum
 from app.models.base import Base, TimestampMixin
@@ -12,6 +12,10 @@ class CareerType(str, enum.Enum):
 
 class CareerRecommendation(Base, TimestampMixin):
     __tablename__ = "career_recommendations"
+    __table_args__ = (
+        # Recommendations of an analysis by confidence; see alembic 005
+        Index("ix_career_recommendations_analysis_id_confidence", "analysis_id", "confidence_score"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     analysis_id = Column(Integer, ForeignKey("analyses.id"), nullable=False)
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, Text, JSON, Enum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Integer, ForeignKey, Text, JSON, Enum, Index
+from sqlalchemy.orm import deferred, relationship
 import enum
 from app.models.base import Base, TimestampMixin
 
@@ -20,6 +20,10 @@ class DocumentStatus(str, enum.Enum):
 
 class Document(Base, TimestampMixin):
     __tablename__ = "documents"
+    __table_args__ = (
+        # Hot per-user listing; see alembic 005
+        Index("ix_documents_user_id_created_at", "user_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -35,8 +39,10 @@ class Document(Base, TimestampMixin):
     status = Column(Enum(DocumentStatus), default=DocumentStatus.UPLOADED)
     error_message = Column(Text, nullable=True)
     
-    # Extracted content
-    raw_text = Column(Text, nullable=True)
+    # Extracted content; raw_text is loaded only when asked for (undefer) and
+    # very large texts live in S3 instead (see services/document_text.py)
+    raw_text = deferred(Column(Text, nullable=True))
+    raw_text_s3_key = Column(String, nullable=True)
     structured_data = Column(JSON, nullable=True)  # Parsed resume/CV data
     extracted_skills = Column(JSON, nullable=True)  # List of skills
     
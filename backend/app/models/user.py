@@ -1,10 +1,14 @@
-from sqlalchemy import Column, String, Boolean, Integer
+from sqlalchemy import Column, String, Boolean, Integer, Index
 from sqlalchemy.orm import relationship
 from app.models.base import Base, TimestampMixin
 
 
 class User(Base, TimestampMixin):
     __tablename__ = "users"
+    __table_args__ = (
+        # Keyset pagination of the user list; see alembic 006
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True, nullable=False)
@@ -17,6 +17,8 @@ class AnalysisResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
     processing_time: Optional[float] = None
+    reused_from_analysis_id: Optional[int] = None
+    model_name: Optional[str] = None
     career_paths: Optional[List[Dict[str, Any]]] = None
     skill_gaps: Optional[List[str]] = None
     market_insights: Optional[Dict[str, Any]] = None
@@ -25,6 +27,7 @@ class AnalysisResponse(BaseModel):
     
     class Config:
         from_attributes = True
+        protected_namespaces = ()
 
 
 class DocumentInfo(BaseModel):
@@ -35,6 +38,17 @@ class DocumentInfo(BaseModel):
         from_attributes = True
 
 
+class CareerRecommendationSummary(BaseModel):
+    career_type: CareerType
+    title: str
+    skill_match_percentage: float
+    salary_range_min: Optional[int] = None
+    salary_range_max: Optional[int] = None
+    
+    class Config:
+        from_attributes = True
+
+
 class AnalysisListResponse(BaseModel):
     id: int
     document_id: int
@@ -42,7 +56,7 @@ class AnalysisListResponse(BaseModel):
     created_at: datetime
     processing_time: Optional[float] = None
     document: Optional[DocumentInfo] = None
-    career_recommendations: Optional[List[Dict[str, Any]]] = None
+    career_recommendations: Optional[List[CareerRecommendationSummary]] = None
     
     class Config:
         from_attributes = True
@@ -67,4 +81,33 @@ class CareerPathResponse(BaseModel):
     confidence_score: float
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class CareerPathDetailResponse(BaseModel):
+    id: int
+    career_type: CareerType
+    title: str
+    description: Optional[str] = None
+    pros: List[str] = []
+    cons: List[str] = []
+    required_skills: List[str] = []
+    recommended_courses: List[Dict[str, Any]] = []
+    estimated_preparation_time: Optional[int] = None
+    success_stories: List[str] = []
+    market_trends: Optional[str] = None
+
+
+class AnalysisEventsTokenResponse(BaseModel):
+    token: str
+    expires_in: int
+
+
+class BulkReanalysisJobResponse(BaseModel):
+    job_id: str
+    status: str
+    last_document_id: int
+    processed: int
+    failed: int
+    model: Optional[str] = None
+    created_at: Optional[str] = None
@@ -0,0 +1,46 @@
+import json
+import logging
+from typing import Any, Dict, Optional
+from redis.exceptions import RedisError
+from app.core.redis import get_async_redis, get_redis
+from app.models.analysis import AnalysisStatus
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = {AnalysisStatus.COMPLETED.value, AnalysisStatus.FAILED.value}
+
+
+def status_channel(analysis_id: int) -> str:
+    """Redis pub/sub channel carrying status transitions of one analysis."""
+    return f"analysis:{analysis_id}:status"
+
+
+def status_event(analysis_id: int, status: AnalysisStatus, error_message: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        "analysis_id": analysis_id,
+        "status": AnalysisStatus(status).value,
+        "error_message": error_message,
+    }
+
+
+def _status_message(analysis_id: int, status: AnalysisStatus, error_message: Optional[str]) -> str:
+    return json.dumps(status_event(analysis_id, status, error_message), ensure_ascii=False)
+
+
+def publish_status(analysis_id: int, status: AnalysisStatus, error_message: Optional[str] = None):
+    """Publish a committed status transition to connected clients (best effort)."""
+
+    try:
+        get_redis().publish(status_channel(analysis_id), _status_message(analysis_id, status, error_message))
+    except RedisError as e:
+        # Clients fall back to reading the analysis when the stream breaks
+        logger.warning(f"Failed to publish status of analysis {analysis_id}: {str(e)}")
+
+
+async def publish_status_async(analysis_id: int, status: AnalysisStatus, error_message: Optional[str] = None):
+    """Async version of publish_status, for the API."""
+
+    try:
+        await get_async_redis().publish(status_channel(analysis_id), _status_message(analysis_id, status, error_message))
+    except RedisError as e:
+        logger.warning(f"Failed to publish status of analysis {analysis_id}: {str(e)}")
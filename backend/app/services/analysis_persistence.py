@@ -0,0 +1,76 @@
+from typing import Any, Dict, List
+from sqlalchemy import delete, insert, update
+from sqlalchemy.orm import Session
+from app.models.analysis import Analysis, AnalysisStatus, PipelineStage
+from app.models.career_recommendation import CareerRecommendation, CareerType
+
+
+def _or_default(value: Any, default: float) -> Any:
+    """Model output may contain explicit nulls; NOT NULL sort keys get the default."""
+    return default if value is None else value
+
+
+def recommendation_rows(analysis_id: int, career_paths: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Career recommendation rows for a bulk insert, one per career path."""
+
+    return [
+        {
+            "analysis_id": analysis_id,
+            "career_type": CareerType(path["type"]),
+            "title": path["title"],
+            "description": path["description"],
+            "required_skills": path.get("required_skills", []),
+            "skill_match_percentage": _or_default(path.get("skill_match_percentage"), 0),
+            "skill_gaps": path.get("skill_gaps", []),
+            "salary_range_min": path.get("salary_range", {}).get("min"),
+            "salary_range_max": path.get("salary_range", {}).get("max"),
+            "market_demand": path.get("market_demand"),
+            "confidence_score": _or_default(path.get("confidence_score"), 0.5),
+            "next_steps": path.get("next_steps", []),
+        }
+        for path in career_paths
+    ]
+
+
+def validate_analysis_data(data: Dict[str, Any]):
+    """Raise ValueError if a parsed model result cannot be persisted."""
+
+    if not isinstance(data, dict) or not isinstance(data.get("career_paths", []), list):
+        raise ValueError("Model output is not an analysis object")
+    try:
+        recommendation_rows(0, data.get("career_paths", []))
+    except (KeyError, TypeError, AttributeError, ValueError) as e:
+        raise ValueError(f"Model output has an invalid career path: {e!r}") from e
+
+
+def persist_analysis_result(db: Session, analysis_id: int, data: Dict[str, Any], processing_time: float):
+    """Write a completed analysis and its recommendations with set-based statements.
+
+    Existing recommendations of the analysis are replaced, so a retried task
+    never duplicates rows. Rows are built before anything is written, so a
+    malformed result fails without touching the database. The caller commits,
+    which keeps the whole result in one transaction.
+    """
+
+    career_paths = data.get("career_paths", [])
+    rows = recommendation_rows(analysis_id, career_paths)
+    skill_gaps = list(dict.fromkeys(gap for path in career_paths for gap in path.get("skill_gaps", [])))
+
+    # Pending ORM changes (e.g. model_name) go out first so they cannot overwrite the result
+    db.flush()
+    db.execute(delete(CareerRecommendation).where(CareerRecommendation.analysis_id == analysis_id))
+    if rows:
+        db.execute(insert(CareerRecommendation), rows)
+    db.execute(
+        update(Analysis)
+        .where(Analysis.id == analysis_id)
+        .values(
+            status=AnalysisStatus.COMPLETED,
+            processing_time=processing_time,
+            gemini_response=data,
+            career_paths=career_paths,
+            skill_gaps=skill_gaps,
+            error_message=None,
+            pipeline_stage=PipelineStage.PERSIST.value,
+        )
+    )
@@ -0,0 +1,99 @@
+import hashlib
+import json
+import logging
+import time
+import uuid
+from typing import Callable, Optional, Tuple
+from redis.exceptions import RedisError
+from app.core.config import settings
+from app.core.redis import RELEASE_LOCK_SCRIPT, get_redis
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisSingleFlight:
+    """Coalesces concurrent Gemini analyses of identical document content.
+
+    The first caller for a key takes a Redis lock and generates; the others
+    wait for its raw output in a short-lived result registry. If the leader
+    fails it releases the lock (or the lock expires if its process dies) and
+    one waiter takes over.
+
+    This is not a result cache: only callers that found a flight in progress
+    read the registry, and its entries expire seconds after the flight ends.
+    """
+
+    def key(self, raw_text: str, document_type: str, model_name: str) -> str:
+        """Flight key: document content plus every parameter that changes the output."""
+        digest = hashlib.sha256(
+            "\0".join([raw_text, document_type, model_name, settings.GEMINI_ANALYSIS_MODE]).encode()
+        ).hexdigest()
+        return f"analysis:flight:{digest}"
+
+    def run(self, key: str, generate: Callable[[], Tuple[str, str]]) -> Tuple[str, str]:
+        """Return the raw model output for a key and the model that produced it,
+        generating it at most once at a time.
+        """
+
+        deadline = time.monotonic() + settings.ANALYSIS_SINGLE_FLIGHT_WAIT_SECONDS
+        try:
+            redis = get_redis()
+            waiting = False
+            while True:
+                # Only callers that found a flight in progress read its output
+                if waiting:
+                    result = self._published(redis, key)
+                    if result is not None:
+                        return result
+
+                token = uuid.uuid4().hex
+                if redis.set(f"{key}:lock", token, nx=True, ex=settings.ANALYSIS_SINGLE_FLIGHT_LOCK_SECONDS):
+                    if waiting:
+                        # The leader may have published and released the lock
+                        # since the read above
+                        result = self._published(redis, key)
+                        if result is not None:
+                            redis.eval(RELEASE_LOCK_SCRIPT, 1, f"{key}:lock", token)
+                            return result
+                    else:
+                        # Output left by an earlier flight is not ours to reuse
+                        redis.delete(f"{key}:result")
+                    break
+                waiting = True
+
+                if time.monotonic() > deadline:
+                    logger.warning(f"Timed out waiting for in-flight analysis {key}, generating directly")
+                    return generate()
+                time.sleep(1)
+        except RedisError as e:
+            logger.warning(f"Single-flight registry unavailable: {str(e)}")
+            return generate()
+
+        try:
+            output, model_name = generate()
+            try:
+                redis.set(
+                    f"{key}:result",
+                    json.dumps([output, model_name]),
+                    ex=settings.ANALYSIS_SINGLE_FLIGHT_RESULT_TTL_SECONDS
+                )
+            except RedisError as e:
+                logger.warning(f"Failed to publish analysis {key}: {str(e)}")
+            return output, model_name
+        finally:
+            try:
+                redis.eval(RELEASE_LOCK_SCRIPT, 1, f"{key}:lock", token)
+            except RedisError as e:
+                logger.warning(f"Failed to release single-flight lock {key}: {str(e)}")
+
+    def _published(self, redis, key: str) -> Optional[Tuple[str, str]]:
+        result = redis.get(f"{key}:result")
+        if result is None:
+            return None
+        logger.info(f"Attached to in-flight analysis {key}")
+        output, model_name = json.loads(result)
+        return output, model_name
+
+
+# Singleton instance
+analysis_single_flight = AnalysisSingleFlight()
@@ -0,0 +1,209 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Hashable, Optional
+from redis.exceptions import RedisError
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from app.core.config import settings
+from app.core.metrics import AUTH_CACHE_LOOKUPS
+from app.core.redis import get_async_redis, get_redis
+from app.core.security import verify_token
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+USER_KEY = "auth:user:{user_id}"
+# Everything a request needs from the user; never the password hash
+USER_FIELDS = ("id", "email", "full_name", "is_active", "is_superuser", "created_at", "updated_at")
+_PENDING_INVALIDATIONS = "auth_cache_invalidate"
+
+
+class TTLCache:
+    """Per-process LRU whose entries expire after a TTL."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float):
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable):
+        self._entries.pop(key, None)
+
+
+class AuthCache:
+    """Verified access tokens and active users, so most requests skip the
+    JWT decode and the user query.
+
+    Users are cached per process and, with AUTH_CACHE_REDIS_ENABLED, in Redis
+    shared by all API processes. Committed changes to a user invalidate both
+    (see the session events below); other processes keep their local copy for
+    at most the local TTL.
+    """
+
+    def __init__(self):
+        self._tokens = TTLCache(settings.AUTH_CACHE_MAX_ENTRIES)
+        self._users = TTLCache(settings.AUTH_CACHE_MAX_ENTRIES)
+        self._pending_deletes = set()
+
+    @property
+    def local_ttl(self) -> int:
+        if settings.AUTH_CACHE_REDIS_ENABLED:
+            return min(settings.AUTH_CACHE_LOCAL_TTL_SECONDS, settings.AUTH_CACHE_TTL_SECONDS)
+        return settings.AUTH_CACHE_TTL_SECONDS
+
+    def token_user_id(self, token: str) -> Optional[int]:
+        """User id of a valid access token, or None."""
+
+        if settings.AUTH_CACHE_ENABLED:
+            user_id = self._tokens.get(token)
+            AUTH_CACHE_LOOKUPS.labels("token", "miss" if user_id is None else "local").inc()
+            if user_id is not None:
+                return user_id
+
+        payload = verify_token(token)
+        # Scoped tokens (analysis status streams) are not access tokens
+        if payload is None or payload.get("scope") is not None:
+            return None
+        try:
+            user_id = int(payload.get("sub"))
+        except (ValueError, TypeError):
+            return None
+
+        if settings.AUTH_CACHE_ENABLED:
+            # Never outlive the token itself
+            ttl = settings.AUTH_CACHE_TTL_SECONDS
+            if payload.get("exp") is not None:
+                ttl = min(ttl, payload["exp"] - time.time())
+            if ttl > 0:
+                self._tokens.set(token, user_id, ttl)
+        return user_id
+
+    async def get_user(self, user_id: int) -> Optional[User]:
+        """Cached active user as a detached User, or None on a miss."""
+
+        if not settings.AUTH_CACHE_ENABLED:
+            return None
+
+        snapshot = self._users.get(user_id)
+        if snapshot is not None:
+            AUTH_CACHE_LOOKUPS.labels("user", "local").inc()
+            return User(**snapshot)
+
+        if settings.AUTH_CACHE_REDIS_ENABLED:
+            try:
+                cached = await get_async_redis().get(USER_KEY.format(user_id=user_id))
+            except RedisError as e:
+                logger.warning(f"Auth cache read failed, loading user {user_id}: {str(e)}")
+                cached = None
+            if cached:
+                snapshot = self._decode(cached)
+                self._users.set(user_id, snapshot, self.local_ttl)
+                AUTH_CACHE_LOOKUPS.labels("user", "redis").inc()
+                return User(**snapshot)
+
+        AUTH_CACHE_LOOKUPS.labels("user", "miss").inc()
+        return None
+
+    async def set_user(self, user: User):
+        """Cache a user just loaded from the database (active users only)."""
+
+        if not settings.AUTH_CACHE_ENABLED or not user.is_active:
+            return
+
+        snapshot = {field: getattr(user, field) for field in USER_FIELDS}
+        self._users.set(user.id, snapshot, self.local_ttl)
+        if settings.AUTH_CACHE_REDIS_ENABLED:
+            try:
+                await get_async_redis().set(
+                    USER_KEY.format(user_id=user.id),
+                    json.dumps(snapshot, default=lambda value: value.isoformat()),
+                    ex=settings.AUTH_CACHE_TTL_SECONDS
+                )
+            except RedisError as e:
+                logger.warning(f"Auth cache write failed for user {user.id}: {str(e)}")
+
+    def invalidate_user(self, user_id: int):
+        """Drop a user from this process and from Redis.
+
+        Called from session events, so it cannot await: on an event loop
+        (AsyncSession commits) the Redis delete is scheduled as a task.
+        """
+
+        self._users.pop(user_id)
+        if not settings.AUTH_CACHE_REDIS_ENABLED:
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is None:
+            try:
+                get_redis().delete(USER_KEY.format(user_id=user_id))
+            except RedisError as e:
+                logger.error(f"Auth cache invalidation failed for user {user_id}: {str(e)}")
+            return
+
+        task = loop.create_task(self._delete_shared(user_id))
+        # Keep a reference until it finishes; the loop only holds weak ones
+        self._pending_deletes.add(task)
+        task.add_done_callback(self._pending_deletes.discard)
+
+    async def _delete_shared(self, user_id: int):
+        try:
+            await get_async_redis().delete(USER_KEY.format(user_id=user_id))
+        except RedisError as e:
+            logger.error(f"Auth cache invalidation failed for user {user_id}: {str(e)}")
+
+    def _decode(self, cached: str) -> Dict[str, Any]:
+        snapshot = json.loads(cached)
+        for field in ("created_at", "updated_at"):
+            if snapshot.get(field):
+                snapshot[field] = datetime.fromisoformat(snapshot[field])
+        return snapshot
+
+
+# Singleton instance
+auth_cache = AuthCache()
+
+
+# Any committed UPDATE or DELETE of a user through the ORM (profile changes,
+# deactivation) drops the cached copy. Bulk update()/delete() statements
+# bypass these events and must call auth_cache.invalidate_user themselves.
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_PENDING_INVALIDATIONS, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    for user_id in session.info.pop(_PENDING_INVALIDATIONS, ()):
+        auth_cache.invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_users(session):
+    session.info.pop(_PENDING_INVALIDATIONS, None)
@@ -0,0 +1,148 @@
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+import unicodedata
+import uuid
+from typing import Any, Dict, List, Optional
+from redis.exceptions import RedisError
+from app.core.config import settings
+from app.core.redis import RELEASE_LOCK_SCRIPT, get_async_redis, get_redis
+from app.models.career_recommendation import CareerType
+from app.services.gemini_service import CAREER_TYPE_LABELS, GeminiService, gemini_service
+
+logger = logging.getLogger(__name__)
+
+SKILL_MATCH_BUCKETS = [
+    (34, "low", "必要スキルとのマッチ度は低い（0-33%）"),
+    (67, "medium", "必要スキルとのマッチ度は中程度（34-66%）"),
+    (101, "high", "必要スキルとのマッチ度は高い（67-100%）"),
+]
+
+
+def normalize_title(title: str) -> str:
+    """Normalize a career title so spelling variants share one catalog entry."""
+    title = unicodedata.normalize("NFKC", title).strip().lower()
+    return re.sub(r"\s+", " ", title)
+
+
+def skill_bucket(skill_match_percentage: Optional[float]) -> str:
+    """Coarse skill-set bucket: how far the user is from the path's requirements."""
+    percentage = skill_match_percentage or 0
+    for upper, bucket, _ in SKILL_MATCH_BUCKETS:
+        if percentage < upper:
+            return bucket
+    return SKILL_MATCH_BUCKETS[-1][1]
+
+
+def _bucket_description(bucket: str) -> str:
+    return next(description for _, name, description in SKILL_MATCH_BUCKETS if name == bucket)
+
+
+class CareerCatalog:
+    """Shared cache of detailed career paths, generated once per catalog key.
+
+    Entries are keyed by (career_type, normalized title, skill-set bucket), so a
+    popular path is generated by Gemini once and served to every user. Misses are
+    single-flight: one caller generates while concurrent callers wait for it.
+    """
+
+    def cache_key(self, career_type: CareerType, title: str, bucket: str) -> str:
+        title_hash = hashlib.sha1(normalize_title(title).encode()).hexdigest()[:16]
+        return f"career_catalog:{career_type.value}:{title_hash}:{bucket}"
+
+    async def get_or_generate(
+        self,
+        career_type: CareerType,
+        title: str,
+        required_skills: List[str],
+        skill_match_percentage: Optional[float]
+    ) -> Dict[str, Any]:
+        """Get a detailed career path from the catalog, generating it on a miss."""
+
+        bucket = skill_bucket(skill_match_percentage)
+        key = self.cache_key(career_type, title, bucket)
+        redis = get_async_redis()
+
+        async def generate():
+            return await gemini_service.generate_detailed_career_path(
+                CAREER_TYPE_LABELS[career_type],
+                required_skills,
+                _bucket_description(bucket),
+                title=title
+            )
+
+        try:
+            deadline = time.monotonic() + settings.CAREER_CATALOG_LOCK_SECONDS
+            while True:
+                cached = await redis.get(key)
+                if cached:
+                    return json.loads(cached)
+
+                token = uuid.uuid4().hex
+                if await redis.set(f"{key}:lock", token, nx=True, ex=settings.CAREER_CATALOG_LOCK_SECONDS):
+                    break
+
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Timed out waiting for catalog entry {key}")
+                # Another caller is generating this entry; wait for it to land
+                await asyncio.sleep(0.5)
+
+        except RedisError as e:
+            logger.warning(f"Career catalog unavailable, generating directly: {str(e)}")
+            return await generate()
+
+        # Redis errors from here on must not cost a second Gemini call
+        try:
+            detail = await generate()
+            try:
+                await redis.set(key, json.dumps(detail, ensure_ascii=False), ex=settings.CAREER_CATALOG_TTL_SECONDS)
+            except RedisError as e:
+                logger.warning(f"Failed to store catalog entry {key}: {str(e)}")
+            return detail
+        finally:
+            try:
+                await redis.eval(RELEASE_LOCK_SCRIPT, 1, f"{key}:lock", token)
+            except RedisError as e:
+                logger.warning(f"Failed to release catalog lock {key}: {str(e)}")
+
+    def prefetch(
+        self,
+        career_type: CareerType,
+        title: str,
+        required_skills: List[str],
+        service: GeminiService
+    ) -> int:
+        """Generate missing catalog entries for every skill bucket of a title (Celery)."""
+
+        redis = get_redis()
+        generated = 0
+
+        for _, bucket, description in SKILL_MATCH_BUCKETS:
+            key = self.cache_key(career_type, title, bucket)
+            if redis.exists(key):
+                continue
+
+            token = uuid.uuid4().hex
+            if not redis.set(f"{key}:lock", token, nx=True, ex=settings.CAREER_CATALOG_LOCK_SECONDS):
+                continue
+
+            try:
+                detail = service.generate_detailed_career_path_sync(
+                    CAREER_TYPE_LABELS[career_type],
+                    required_skills,
+                    description,
+                    title=title
+                )
+                redis.set(key, json.dumps(detail, ensure_ascii=False), ex=settings.CAREER_CATALOG_TTL_SECONDS)
+                generated += 1
+            finally:
+                redis.eval(RELEASE_LOCK_SCRIPT, 1, f"{key}:lock", token)
+
+        return generated
+
+
+# Singleton instance
+career_catalog = CareerCatalog()
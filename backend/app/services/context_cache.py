@@ -0,0 +1,137 @@
+import hashlib
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+from google.ai import generativelanguage as glm
+from google.protobuf import duration_pb2, field_mask_pb2
+from redis.exceptions import RedisError
+from app.core.config import settings
+from app.core.metrics import GEMINI_CONTEXT_CACHE_EVENTS
+from app.core.redis import RELEASE_LOCK_SCRIPT, get_redis
+from app.services.google_clients import create_cache_client
+from app.services.rate_limiter import GeminiRateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SplitPrompt:
+    """Prompt made of a static prefix that can be cached and a per-request body."""
+
+    prefix: str
+    body: str
+
+    def __str__(self) -> str:
+        return self.prefix + self.body
+
+
+class GeminiContextCache:
+    """Registry of Gemini cached contents holding static prompt prefixes.
+
+    Cached contents are scoped to an API key and a model, so each (model, key,
+    prefix) gets its own entry. Entry names are shared through Redis by all API
+    and Celery processes; the Redis key expires a refresh margin before the
+    cache itself, and the first caller inside that margin extends the TTL.
+    """
+
+    def _redis_key(self, model_name: str, api_key: str, prefix: str) -> str:
+        prefix_hash = hashlib.sha1(prefix.encode()).hexdigest()[:16]
+        key_id = GeminiRateLimiter.key_id(api_key)
+        return f"gemini:context_cache:{model_name}:{key_id}:{prefix_hash}"
+
+    def get(self, model_name: str, api_key: str, prefix: str) -> Optional[str]:
+        """Name of the cached content for a prefix, creating it on a miss.
+
+        Returns None when caching is off or unavailable, in which case the
+        caller sends the full prompt.
+        """
+
+        if not settings.GEMINI_CONTEXT_CACHE_ENABLED:
+            return None
+
+        key = self._redis_key(model_name, api_key, prefix)
+        try:
+            redis = get_redis()
+            entry = redis.hgetall(key)
+            if entry.get("disabled"):
+                return None
+            if entry.get("name"):
+                if float(entry["expires_at"]) - time.time() < settings.GEMINI_CONTEXT_CACHE_REFRESH_SECONDS:
+                    self._refresh(key, entry["name"], api_key)
+                GEMINI_CONTEXT_CACHE_EVENTS.labels(model=model_name, event="hit").inc()
+                return entry["name"]
+
+            token = uuid.uuid4().hex
+            if not redis.set(f"{key}:lock", token, nx=True, ex=60):
+                # Another process is creating the cache; send this request in full
+                return None
+            try:
+                return self._create(key, model_name, api_key, prefix)
+            finally:
+                redis.eval(RELEASE_LOCK_SCRIPT, 1, f"{key}:lock", token)
+
+        except RedisError as e:
+            logger.warning(f"Context cache registry unavailable: {str(e)}")
+            return None
+
+    def _create(self, key: str, model_name: str, api_key: str, prefix: str) -> Optional[str]:
+        ttl = settings.GEMINI_CONTEXT_CACHE_TTL_SECONDS
+        redis = get_redis()
+        try:
+            cached_content = create_cache_client(api_key).create_cached_content(
+                cached_content=glm.CachedContent(
+                    model=f"models/{model_name}",
+                    display_name="career-analysis-instructions",
+                    contents=[glm.Content(role="user", parts=[glm.Part(text=prefix)])],
+                    ttl=duration_pb2.Duration(seconds=ttl),
+                )
+            )
+        except Exception as e:
+            # Typically a prefix below the model's minimum cacheable size or a
+            # model without caching support; do not retry on every request
+            logger.warning(f"Could not create context cache for {model_name}: {str(e)}")
+            redis.hset(key, mapping={"disabled": "1"})
+            redis.expire(key, settings.GEMINI_CONTEXT_CACHE_RETRY_SECONDS)
+            GEMINI_CONTEXT_CACHE_EVENTS.labels(model=model_name, event="create_failed").inc()
+            return None
+
+        redis.hset(key, mapping={"name": cached_content.name, "expires_at": time.time() + ttl})
+        redis.expire(key, ttl)
+        GEMINI_CONTEXT_CACHE_EVENTS.labels(model=model_name, event="created").inc()
+        logger.info(f"Created context cache {cached_content.name} for {model_name}")
+        return cached_content.name
+
+    def _refresh(self, key: str, name: str, api_key: str):
+        """Extend the TTL of a cache nearing expiry; one caller wins per window."""
+
+        redis = get_redis()
+        if not redis.set(f"{key}:refresh", "1", nx=True, ex=settings.GEMINI_CONTEXT_CACHE_REFRESH_SECONDS):
+            return
+
+        ttl = settings.GEMINI_CONTEXT_CACHE_TTL_SECONDS
+        try:
+            create_cache_client(api_key).update_cached_content(
+                cached_content=glm.CachedContent(name=name, ttl=duration_pb2.Duration(seconds=ttl)),
+                update_mask=field_mask_pb2.FieldMask(paths=["ttl"]),
+            )
+        except Exception as e:
+            logger.warning(f"Could not refresh context cache {name}: {str(e)}")
+            return
+
+        redis.hset(key, "expires_at", time.time() + ttl)
+        redis.expire(key, ttl)
+
+    def invalidate(self, model_name: str, api_key: str, prefix: str):
+        """Forget a cache the API no longer knows, so the next call rebuilds it."""
+
+        try:
+            get_redis().delete(self._redis_key(model_name, api_key, prefix))
+            GEMINI_CONTEXT_CACHE_EVENTS.labels(model=model_name, event="invalidated").inc()
+        except RedisError as e:
+            logger.warning(f"Failed to invalidate context cache: {str(e)}")
+
+
+# Singleton instance
+gemini_context_cache = GeminiContextCache()
@@ -19,17 +19,21 @@ logger = logging.getLogger(__name__)
 class DocumentProcessor:
     """Service for processing uploaded documents (PDF, Word)."""
     
-    async def extract_text(self, file_content: bytes, file_type: str) -> str:
-        """Extract text from document based on file type."""
+    async def extract_text(self, file_content: bytes, file_type: str, allow_ocr: bool = True) -> str:
+        """Extract text from document based on file type.
+        
+        With allow_ocr=False a PDF without a text layer returns an empty string,
+        so the caller can hand it to the OCR queue.
+        """
         
         if file_type.lower() == 'pdf':
-            return await self._extract_pdf_text(file_content)
+            return await self._extract_pdf_text(file_content, allow_ocr)
         elif file_type.lower() in ['docx', 'doc']:
             return await self._extract_docx_text(file_content)
         else:
             raise ValueError(f"Unsupported file type: {file_type}")
     
-    async def _extract_pdf_text(self, file_content: bytes) -> str:
+    async def _extract_pdf_text(self, file_content: bytes, allow_ocr: bool = True) -> str:
         """Extract text from PDF file."""
         
         text = ""
@@ -140,6 +144,9 @@ class DocumentProcessor:
                 return text.strip()
             else:
                 # If still no text, check if PDF might be scanned/image-based
+                if not allow_ocr:
+                    logger.warning("No text extracted from PDF by any method - needs OCR")
+                    return ""
                 logger.warning("No text extracted from PDF by any method - attempting OCR")
                 
                 # Try OCR as last resort
@@ -0,0 +1,62 @@
+import asyncio
+import logging
+from typing import Optional
+from app.core.config import settings
+from app.models.document import Document
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentTextStore:
+    """Extracted document text, kept in documents.raw_text or offloaded to S3.
+    
+    raw_text is a deferred column: load documents with undefer(Document.raw_text)
+    before calling load() from async code.
+    """
+    
+    def key(self, document: Document) -> str:
+        return f"texts/{document.user_id}/{document.id}.txt"
+    
+    def assign(self, document: Document, text: str):
+        """Set the text of a document, uploading it to S3 if it is very large."""
+        
+        from app.services.s3_service import s3_service
+        
+        size = len(text.encode("utf-8"))
+        if settings.DOCUMENT_TEXT_OFFLOAD_BYTES and size > settings.DOCUMENT_TEXT_OFFLOAD_BYTES:
+            key = self.key(document)
+            asyncio.run(s3_service.upload_file(text.encode("utf-8"), key, "text/plain; charset=utf-8"))
+            logger.info(f"Stored {size} bytes of text of document {document.id} in S3: {key}")
+            document.raw_text = None
+            document.raw_text_s3_key = key
+        else:
+            document.raw_text = text
+            document.raw_text_s3_key = None
+    
+    async def load(self, document: Document) -> Optional[str]:
+        if document.raw_text_s3_key:
+            from app.services.s3_service import s3_service
+            return (await s3_service.download_file(document.raw_text_s3_key)).decode("utf-8")
+        return document.raw_text
+    
+    def load_sync(self, document: Document) -> Optional[str]:
+        """load() for Celery tasks and scripts; lazy-loads raw_text if deferred."""
+        
+        if document.raw_text_s3_key:
+            return asyncio.run(self.load(document))
+        return document.raw_text
+    
+    async def delete(self, document: Document):
+        """Remove offloaded text (best effort); inline text goes with the row."""
+        
+        if not document.raw_text_s3_key:
+            return
+        from app.services.s3_service import s3_service
+        try:
+            await s3_service.delete_file(document.raw_text_s3_key)
+        except Exception as e:
+            logger.error(f"Failed to delete text of document {document.id} from S3: {str(e)}")
+
+
+# Singleton instance
+document_text_store = DocumentTextStore()
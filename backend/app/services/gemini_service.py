@@ -1,34 +1,409 @@
+import asyncio
 import json
 import re
-from typing import Dict, Any, Optional, List
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait as futures_wait
+from typing import Dict, Any, Optional, List, Tuple, Union
 import google.generativeai as genai
-from tenacity import retry, stop_after_attempt, wait_exponential
+from google.api_core import exceptions as gcp_exceptions
+from tenacity import retry, retry_if_not_exception_type, stop_after_attempt, wait_exponential
 from app.core.config import settings
+from app.core.metrics import (
+    EXTERNAL_CALL_DURATION,
+    EXTERNAL_CALL_ERRORS,
+    GEMINI_CONTEXT_CACHE_EVENTS,
+    GEMINI_CONTEXT_CACHE_TOKENS_SAVED,
+    GEMINI_FALLBACK_REQUESTS,
+    GEMINI_HEDGED_REQUESTS,
+    GEMINI_HEDGE_WINS,
+)
+from app.models.career_recommendation import CareerType
+from app.services.context_cache import SplitPrompt, gemini_context_cache
+from app.services.google_clients import bind_api_key, bind_cached_content, configure_genai, uses_simulator
+from app.services.rate_limiter import gemini_rate_limiter, RateLimitTimeoutError
+from app.services.resilience import CircuitOpenError, get_circuit_breaker, get_latency_tracker
+from app.services.text_chunker import chunk_text
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Errors the API returns for a cached content that expired or was deleted
+CONTEXT_CACHE_ERRORS = (
+    gcp_exceptions.NotFound,
+    gcp_exceptions.PermissionDenied,
+    gcp_exceptions.FailedPrecondition,
+)
+
+CAREER_TYPE_LABELS = {
+    CareerType.CORPORATE: "企業転職",
+    CareerType.FREELANCE: "フリーランス",
+    CareerType.ENTREPRENEURSHIP: "起業",
+}
+
+ANALYSIS_RESULT_SCHEMA = """{
+  "extracted_skills": ["スキル1", "スキル2", ...],
+  "experience_summary": "経験の要約",
+  "career_paths": [
+    {
+      "type": "corporate",
+      "title": "職種名",
+      "description": "説明",
+      "required_skills": ["必要スキル1", ...],
+      "skill_match_percentage": スキルマッチ度(0-100の整数),
+      "skill_gaps": ["不足スキル1", ...],
+      "salary_range": {
+        "min": 最低年収(整数),
+        "max": 最高年収(整数)
+      },
+      "market_demand": "high/medium/low",
+      "confidence_score": 0.0-1.0の小数,
+      "next_steps": ["ステップ1", ...]
+    },
+    {
+      "type": "freelance",
+      ...同様の構造
+    },
+    {
+      "type": "entrepreneurship",
+      ...同様の構造
+    }
+  ],
+  "overall_insights": "全体的な洞察"
+}"""
+
+ANALYSIS_INSTRUCTIONS = f"""
+あなたはキャリアアドバイザーAIです。この後に続く履歴書または職務経歴書を分析し、キャリアパスの提案を行ってください。
+
+分析する内容:
+1. スキルと経験の抽出
+2. 3つのキャリアパス提案（企業転職、フリーランス、起業）
+3. 各パスに必要なスキルと、既存スキルとのマッチ度計算
+4. 各パスに必要なスキルギャップ
+5. 推定年収レンジ（日本市場）
+6. 具体的な次のステップ
+
+重要: skill_match_percentageは、候補者の現在のスキルが各キャリアパスに必要なスキルとどの程度マッチしているかを0-100の整数で必ず計算してください。
+
+以下の形式の厳密なJSONのみを出力してください（JSON以外の解説文、マークダウン、``` などを絶対に含めないでください）:
+
+{ANALYSIS_RESULT_SCHEMA}
+"""
+
 
 class GeminiService:
     """Service for interacting with Google Gemini API for career analysis."""
     
     def __init__(self):
-        genai.configure(api_key=settings.GEMINI_API_KEY)
+        configure_genai()
         self.model = genai.GenerativeModel(settings.GEMINI_MODEL)
+        self._models: Dict[Tuple[str, str], genai.GenerativeModel] = {}
+        self._cached_models: Dict[Tuple[str, str], Tuple[str, genai.GenerativeModel]] = {}
+    
+    def _get_model(self, model_name: str, api_key: str) -> genai.GenerativeModel:
+        """Get a model bound to one API key of the pool."""
+        
+        if api_key == settings.GEMINI_API_KEY and model_name == settings.GEMINI_MODEL:
+            return self.model
+        
+        cache_key = (model_name, api_key)
+        if cache_key not in self._models:
+            model = genai.GenerativeModel(model_name)
+            if api_key != settings.GEMINI_API_KEY:
+                model = bind_api_key(model, api_key)
+            self._models[cache_key] = model
+        return self._models[cache_key]
+    
+    def _get_cached_model(self, model_name: str, api_key: str, cache_name: str) -> genai.GenerativeModel:
+        """Get a model bound to an API key that sends requests against a context cache."""
+        
+        cached = self._cached_models.get((model_name, api_key))
+        if cached is None or cached[0] != cache_name:
+            model = genai.GenerativeModel(model_name)
+            if api_key != settings.GEMINI_API_KEY:
+                model = bind_api_key(model, api_key)
+            cached = (cache_name, bind_cached_content(model, cache_name))
+            self._cached_models[(model_name, api_key)] = cached
+        return cached[1]
+    
+    def _prepare_request(
+        self,
+        model_name: str,
+        api_key: str,
+        prompt: Union[str, SplitPrompt]
+    ) -> Tuple[genai.GenerativeModel, str, Optional[str]]:
+        """Model, contents and cache name for a call.
+        
+        The static prefix of a SplitPrompt is served from a context cache when one
+        is available, so only the per-request body is sent.
+        """
+        
+        if isinstance(prompt, SplitPrompt):
+            cache_name = gemini_context_cache.get(model_name, api_key, prompt.prefix)
+            if cache_name:
+                return self._get_cached_model(model_name, api_key, cache_name), prompt.body, cache_name
+        return self._get_model(model_name, api_key), str(prompt), None
+    
+    def _cache_fallback(self, model_name: str, api_key: str, prompt: SplitPrompt, error: Exception) -> genai.GenerativeModel:
+        """Drop a cache the API rejected and return the model for a full-prompt retry."""
+        
+        logger.warning(f"Context cache for {model_name} unusable, sending full prompt: {str(error)}")
+        gemini_context_cache.invalidate(model_name, api_key, prompt.prefix)
+        GEMINI_CONTEXT_CACHE_EVENTS.labels(model=model_name, event="fallback").inc()
+        return self._get_model(model_name, api_key)
+    
+    def _record_cache_savings(self, model_name: str, response):
+        usage = getattr(response, "usage_metadata", None)
+        cached_tokens = getattr(usage, "cached_content_token_count", 0)
+        if cached_tokens:
+            GEMINI_CONTEXT_CACHE_TOKENS_SAVED.labels(model=model_name).inc(cached_tokens)
+    
+    def _estimate_tokens(self, prompt: Union[str, SplitPrompt]) -> int:
+        """Rough token estimate used to reserve tokens/min capacity before a call."""
+        # Japanese text is close to one token per character, English about four
+        return len(str(prompt)) // 2 + settings.GEMINI_ESTIMATED_OUTPUT_TOKENS
+    
+    @staticmethod
+    def _total_tokens(response) -> Optional[int]:
+        return getattr(getattr(response, "usage_metadata", None), "total_token_count", None)
+    
+    async def analyze_resume(
+        self,
+        resume_text: str,
+        document_type: str,
+        model_name: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Analyze resume/CV using Gemini API (settings.GEMINI_MODEL unless model_name is given)."""
+        
+        if len(resume_text) > settings.GEMINI_CHUNKED_THRESHOLD_CHARS:
+            return await self.analyze_resume_chunked(resume_text, document_type, model_name)
+        if settings.GEMINI_ANALYSIS_MODE == "fanout":
+            return await self.analyze_resume_fanout(resume_text, document_type, model_name)
+        
+        prompt = self._create_analysis_prompt(resume_text, document_type)
+        parsed_response, raw_text, used_model = await self._generate_json_async(prompt, model_name)
+        
+        return {
+            "success": True,
+            "data": parsed_response,
+            "raw_response": raw_text,
+            "model_name": used_model
+        }
+    
+    def analyze_resume_sync(
+        self,
+        resume_text: str,
+        document_type: str,
+        model_name: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Synchronous version of analyze_resume for Celery tasks."""
+        
+        if len(resume_text) > settings.GEMINI_CHUNKED_THRESHOLD_CHARS:
+            return self.analyze_resume_chunked_sync(resume_text, document_type, model_name)
+        if settings.GEMINI_ANALYSIS_MODE == "fanout":
+            return self.analyze_resume_fanout_sync(resume_text, document_type, model_name)
+        
+        prompt = self._create_analysis_prompt(resume_text, document_type)
+        parsed_response, raw_text, used_model = self._generate_json(prompt, model_name)
+        
+        return {
+            "success": True,
+            "data": parsed_response,
+            "raw_response": raw_text,
+            "model_name": used_model
+        }
+    
+    async def analyze_resume_fanout(
+        self,
+        resume_text: str,
+        document_type: str,
+        model_name: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Analyze resume with one short extraction call and one concurrent call per career type."""
+        
+        summary, _, summary_model = await self._generate_json_async(
+            self._create_skills_prompt(resume_text, document_type),
+            model_name
+        )
+        
+        paths = await asyncio.gather(*[
+            self._generate_json_async(self._create_career_path_prompt(career_type, summary), model_name)
+            for career_type in CareerType
+        ])
+        
+        return self._merge_fanout_results(
+            summary,
+            [path for path, _, _ in paths],
+            [summary_model] + [path_model for _, _, path_model in paths]
+        )
+    
+    def analyze_resume_fanout_sync(
+        self,
+        resume_text: str,
+        document_type: str,
+        model_name: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Synchronous version of analyze_resume_fanout for Celery tasks."""
+        
+        summary, _, summary_model = self._generate_json(
+            self._create_skills_prompt(resume_text, document_type),
+            model_name
+        )
+        
+        with ThreadPoolExecutor(max_workers=len(CareerType)) as executor:
+            paths = list(executor.map(
+                lambda career_type: self._generate_json(
+                    self._create_career_path_prompt(career_type, summary),
+                    model_name
+                ),
+                CareerType
+            ))
+        
+        return self._merge_fanout_results(
+            summary,
+            [path for path, _, _ in paths],
+            [summary_model] + [path_model for _, _, path_model in paths]
+        )
+    
+    async def analyze_resume_chunked(
+        self,
+        resume_text: str,
+        document_type: str,
+        model_name: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Map-reduce analysis of a long document: extract per section chunk, then one reduce call."""
+        
+        chunks = chunk_text(resume_text, settings.GEMINI_CHUNK_SIZE_CHARS)
+        semaphore = asyncio.Semaphore(settings.GEMINI_CHUNK_PARALLELISM)
+        
+        async def extract(index: int, chunk: str) -> Dict[str, Any]:
+            async with semaphore:
+                partial, _, _ = await self._generate_json_async(
+                    self._create_chunk_prompt(chunk, document_type, index, len(chunks)),
+                    model_name
+                )
+                return partial
+        
+        partials = await asyncio.gather(*[extract(i, chunk) for i, chunk in enumerate(chunks)])
+        logger.info(f"Chunked analysis: {len(resume_text)} characters in {len(chunks)} chunks")
+        
+        parsed_response, raw_text, used_model = await self._generate_json_async(
+            self._create_reduce_prompt(partials, document_type),
+            model_name
+        )
+        
+        return {
+            "success": True,
+            "data": parsed_response,
+            "raw_response": raw_text,
+            "model_name": used_model
+        }
+    
+    def analyze_resume_chunked_sync(
+        self,
+        resume_text: str,
+        document_type: str,
+        model_name: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Synchronous version of analyze_resume_chunked for Celery tasks."""
+        
+        chunks = chunk_text(resume_text, settings.GEMINI_CHUNK_SIZE_CHARS)
+        
+        with ThreadPoolExecutor(max_workers=settings.GEMINI_CHUNK_PARALLELISM) as executor:
+            partials = list(executor.map(
+                lambda indexed: self._generate_json(
+                    self._create_chunk_prompt(indexed[1], document_type, indexed[0], len(chunks)),
+                    model_name
+                )[0],
+                enumerate(chunks)
+            ))
+        logger.info(f"Chunked analysis: {len(resume_text)} characters in {len(chunks)} chunks")
+        
+        parsed_response, raw_text, used_model = self._generate_json(
+            self._create_reduce_prompt(partials, document_type),
+            model_name
+        )
+        
+        return {
+            "success": True,
+            "data": parsed_response,
+            "raw_response": raw_text,
+            "model_name": used_model
+        }
+    
+    def _merge_fanout_results(
+        self,
+        summary: Dict[str, Any],
+        paths: List[Dict[str, Any]],
+        models: List[str]
+    ) -> Dict[str, Any]:
+        """Merge fan-out results into the single-prompt gemini_response shape.
+        
+        models: the model that served each call; several when the fallback
+        took over part of the fan-out.
+        """
+        
+        data = {
+            "extracted_skills": summary.get("extracted_skills", []),
+            "experience_summary": summary.get("experience_summary", ""),
+            "career_paths": paths,
+            "overall_insights": summary.get("overall_insights", "")
+        }
+        
+        return {
+            "success": True,
+            "data": data,
+            "raw_response": json.dumps(data, ensure_ascii=False),
+            "model_name": ",".join(dict.fromkeys(models))
+        }
+    
+    def analyze_resumes_batch_sync(self, items: List[Dict[str, Any]]) -> Tuple[Dict[int, Dict[str, Any]], str]:
+        """Analyze several short documents in one request.
+        
+        items: dicts with "id", "text" and "document_type".
+        Returns analysis data keyed by item id, and the model that served the
+        request; items missing from the model output are left out so the
+        caller can analyze them individually.
+        """
+        
+        parsed_response, _, used_model = self._generate_json(self._create_batch_analysis_prompt(items))
+        
+        expected_ids = {item["id"] for item in items}
+        results = {}
+        for result in parsed_response.get("results", []):
+            try:
+                item_id = int(result.pop("id"))
+            except (KeyError, TypeError, ValueError):
+                logger.warning("Batch analysis result without a valid id, skipping")
+                continue
+            if item_id in expected_ids:
+                results[item_id] = result
+        
+        missing = expected_ids - results.keys()
+        if missing:
+            logger.warning(f"Batch analysis returned no result for items {sorted(missing)}")
+        
+        return results, used_model
     
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=4, max=10),
+        retry=retry_if_not_exception_type((RateLimitTimeoutError, CircuitOpenError)),
         reraise=True
     )
-    async def analyze_resume(self, resume_text: str, document_type: str) -> Dict[str, Any]:
-        """Analyze resume/CV using Gemini API."""
+    async def _generate_json_async(
+        self,
+        prompt: Union[str, SplitPrompt],
+        model_name: Optional[str] = None
+    ) -> Tuple[Dict[str, Any], str, str]:
+        """Send a prompt to Gemini and return the parsed JSON, raw text and model used.
         
-        prompt = self._create_analysis_prompt(resume_text, document_type)
+        The model differs from model_name when its circuit is open and the
+        fallback model served the request.
+        """
         
         try:
-            # Generate content using Gemini
-            response = await self.model.generate_content_async(prompt)
+            model_name = self._select_model(model_name)
+            response = await self._generate_content_hedged_async(model_name, prompt)
             
             if not response.text:
                 logger.error("No text in Gemini response")
@@ -36,14 +411,7 @@ class GeminiService:
             
             logger.info(f"Raw Gemini response length: {len(response.text)}")
             
-            # Extract JSON from response
-            parsed_response = self._extract_json_from_response(response.text)
-            
-            return {
-                "success": True,
-                "data": parsed_response,
-                "raw_response": response.text
-            }
+            return self._extract_json_from_response(response.text), response.text, model_name
             
         except Exception as e:
             logger.error(f"Gemini API error: {str(e)}")
@@ -52,16 +420,19 @@ class GeminiService:
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=4, max=10),
+        retry=retry_if_not_exception_type((RateLimitTimeoutError, CircuitOpenError)),
         reraise=True
     )
-    def analyze_resume_sync(self, resume_text: str, document_type: str) -> Dict[str, Any]:
-        """Synchronous version of analyze_resume for Celery tasks."""
-        
-        prompt = self._create_analysis_prompt(resume_text, document_type)
+    def _generate_json(
+        self,
+        prompt: Union[str, SplitPrompt],
+        model_name: Optional[str] = None
+    ) -> Tuple[Dict[str, Any], str, str]:
+        """Synchronous version of _generate_json_async for Celery tasks."""
         
         try:
-            # Generate content using Gemini (synchronous)
-            response = self.model.generate_content(prompt)
+            model_name = self._select_model(model_name)
+            response = self._generate_content_hedged(model_name, prompt)
             
             if not response.text:
                 logger.error("No text in Gemini response")
@@ -69,28 +440,228 @@ class GeminiService:
             
             logger.info(f"Raw Gemini response length: {len(response.text)}")
             
-            # Extract JSON from response
-            parsed_response = self._extract_json_from_response(response.text)
-            
-            return {
-                "success": True,
-                "data": parsed_response,
-                "raw_response": response.text
-            }
+            return self._extract_json_from_response(response.text), response.text, model_name
             
         except Exception as e:
             logger.error(f"Gemini API error: {str(e)}")
             raise
     
-    def _create_analysis_prompt(self, resume_text: str, document_type: str) -> str:
-        """Create prompt for Gemini based on document type."""
+    def _select_model(self, model_name: Optional[str] = None) -> str:
+        """Pick the requested model, or the fallback model while its circuit is open."""
+        
+        model_name = model_name or settings.GEMINI_MODEL
+        if get_circuit_breaker(model_name).allow_request():
+            return model_name
+        
+        fallback = settings.GEMINI_FALLBACK_MODEL
+        if fallback and fallback != model_name and get_circuit_breaker(fallback).allow_request():
+            logger.warning(f"Circuit for {model_name} is open, using fallback model {fallback}")
+            GEMINI_FALLBACK_REQUESTS.labels(model=fallback).inc()
+            return fallback
+        
+        raise CircuitOpenError(f"Gemini circuit for {model_name} is open")
+    
+    def _hedge_delay(self, model_name: str) -> Optional[float]:
+        """Seconds to wait before sending a hedge, or None when hedging is off."""
+        
+        if not settings.GEMINI_HEDGING_ENABLED:
+            return None
+        return get_latency_tracker(model_name).percentile(
+            settings.GEMINI_HEDGE_PERCENTILE,
+            min_samples=settings.GEMINI_HEDGE_MIN_SAMPLES
+        )
+    
+    def _generate_content(self, model_name: str, prompt: Union[str, SplitPrompt]):
+        """Single rate-limited Gemini call that feeds the breaker and latency stats."""
+        
+        try:
+            lease = gemini_rate_limiter.acquire(model_name, self._estimate_tokens(prompt))
+        except RateLimitTimeoutError:
+            get_circuit_breaker(model_name).release_trial()
+            raise
+        start = time.monotonic()
+        
+        request_options = {"timeout": settings.GEMINI_REQUEST_TIMEOUT_SECONDS}
+        try:
+            model, contents, cache_name = self._prepare_request(model_name, lease.api_key, prompt)
+        except Exception:
+            # Nothing reached Gemini: not a model failure, and no capacity used
+            get_circuit_breaker(model_name).release_trial()
+            gemini_rate_limiter.settle(lease, 0)
+            raise
+        
+        try:
+            try:
+                response = model.generate_content(contents, request_options=request_options)
+            except CONTEXT_CACHE_ERRORS as e:
+                if not cache_name:
+                    raise
+                # The cache expired or was deleted; it is rebuilt on the next call
+                model = self._cache_fallback(model_name, lease.api_key, prompt, e)
+                response = model.generate_content(str(prompt), request_options=request_options)
+        except Exception as e:
+            self._record_failure(model_name, e, time.monotonic() - start)
+            if isinstance(e, gcp_exceptions.ResourceExhausted):
+                gemini_rate_limiter.penalize(lease)
+            raise
+        
+        self._record_success(model_name, response, time.monotonic() - start)
+        gemini_rate_limiter.settle(lease, self._total_tokens(response))
+        return response
+    
+    async def _generate_content_async(self, model_name: str, prompt: Union[str, SplitPrompt]):
+        """Async version of _generate_content."""
+        
+        try:
+            lease = await gemini_rate_limiter.acquire_async(model_name, self._estimate_tokens(prompt))
+        except (RateLimitTimeoutError, asyncio.CancelledError):
+            get_circuit_breaker(model_name).release_trial()
+            raise
+        start = time.monotonic()
+        
+        request_options = {"timeout": settings.GEMINI_REQUEST_TIMEOUT_SECONDS}
+        
+        async def generate(model: genai.GenerativeModel, contents: str):
+            if uses_simulator():
+                # The simulator speaks REST, which has no async client
+                return await asyncio.to_thread(model.generate_content, contents, request_options=request_options)
+            return await model.generate_content_async(contents, request_options=request_options)
+        
+        try:
+            model, contents, cache_name = await asyncio.to_thread(
+                self._prepare_request, model_name, lease.api_key, prompt
+            )
+        except (Exception, asyncio.CancelledError):
+            # Nothing reached Gemini: not a model failure, and no capacity used
+            get_circuit_breaker(model_name).release_trial()
+            await gemini_rate_limiter.settle_async(lease, 0)
+            raise
+        
+        try:
+            try:
+                response = await generate(model, contents)
+            except CONTEXT_CACHE_ERRORS as e:
+                if not cache_name:
+                    raise
+                # The cache expired or was deleted; it is rebuilt on the next call
+                model = self._cache_fallback(model_name, lease.api_key, prompt, e)
+                response = await generate(model, str(prompt))
+        except asyncio.CancelledError:
+            # The losing hedge says nothing about the model's health. Its prompt
+            # was sent, so only the output reservation is given back
+            get_circuit_breaker(model_name).release_trial()
+            await gemini_rate_limiter.settle_async(lease, lease.tokens - settings.GEMINI_ESTIMATED_OUTPUT_TOKENS)
+            raise
+        except Exception as e:
+            self._record_failure(model_name, e, time.monotonic() - start)
+            if isinstance(e, gcp_exceptions.ResourceExhausted):
+                await gemini_rate_limiter.penalize_async(lease)
+            raise
+        
+        self._record_success(model_name, response, time.monotonic() - start)
+        await gemini_rate_limiter.settle_async(lease, self._total_tokens(response))
+        return response
+    
+    def _record_success(self, model_name: str, response, elapsed: float):
+        """Metrics, breaker and latency stats of a call (the caller settles the lease)."""
+        EXTERNAL_CALL_DURATION.labels(service="gemini", operation=model_name).observe(elapsed)
+        get_circuit_breaker(model_name).record_success()
+        get_latency_tracker(model_name).record(elapsed)
+        self._record_cache_savings(model_name, response)
+    
+    def _record_failure(self, model_name: str, error: Exception, elapsed: float):
+        EXTERNAL_CALL_DURATION.labels(service="gemini", operation=model_name).observe(elapsed)
+        EXTERNAL_CALL_ERRORS.labels(service="gemini", operation=model_name, error=type(error).__name__).inc()
+        get_circuit_breaker(model_name).record_failure()
+    
+    def _generate_content_hedged(self, model_name: str, prompt: Union[str, SplitPrompt]):
+        """Send the request, and a hedge if it is still running after the p95 latency."""
+        
+        delay = self._hedge_delay(model_name)
+        if delay is None:
+            return self._generate_content(model_name, prompt)
+        
+        executor = ThreadPoolExecutor(max_workers=2)
+        try:
+            primary = executor.submit(self._generate_content, model_name, prompt)
+            done, _ = futures_wait([primary], timeout=delay)
+            if done:
+                return primary.result()
+            
+            GEMINI_HEDGED_REQUESTS.labels(model=model_name).inc()
+            hedge = executor.submit(self._generate_content, model_name, prompt)
+            done, pending = futures_wait([primary, hedge], return_when=FIRST_COMPLETED)
+            winner = done.pop()
+            if winner.exception() is not None and pending:
+                # First to finish failed; the other request may still succeed
+                winner = pending.pop()
+            if winner is hedge:
+                GEMINI_HEDGE_WINS.labels(model=model_name).inc()
+            return winner.result()
+        finally:
+            # Do not wait for the losing request; its thread finishes on its own
+            executor.shutdown(wait=False)
+    
+    async def _generate_content_hedged_async(self, model_name: str, prompt: Union[str, SplitPrompt]):
+        """Async version of _generate_content_hedged; the losing request is cancelled."""
+        
+        delay = self._hedge_delay(model_name)
+        if delay is None:
+            return await self._generate_content_async(model_name, prompt)
+        
+        primary = asyncio.ensure_future(self._generate_content_async(model_name, prompt))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+        
+        GEMINI_HEDGED_REQUESTS.labels(model=model_name).inc()
+        hedge = asyncio.ensure_future(self._generate_content_async(model_name, prompt))
+        try:
+            done, pending = await asyncio.wait({primary, hedge}, return_when=asyncio.FIRST_COMPLETED)
+            winner = done.pop()
+            if winner.exception() is not None and pending:
+                # First to finish failed; the other request may still succeed
+                winner = pending.pop()
+                await asyncio.wait({winner})
+            if winner is hedge:
+                GEMINI_HEDGE_WINS.labels(model=model_name).inc()
+            return winner.result()
+        finally:
+            for task in (primary, hedge):
+                if not task.done():
+                    task.cancel()
+    
+    def _create_analysis_prompt(self, resume_text: str, document_type: str) -> SplitPrompt:
+        """Create prompt for Gemini based on document type.
+        
+        The instructions and JSON schema form a static prefix shared by every
+        analysis, so they can be served from a context cache.
+        """
         
         doc_type_name = "履歴書" if document_type == "resume" else "職務経歴書"
         
+        return SplitPrompt(prefix=ANALYSIS_INSTRUCTIONS, body=f"""
+{doc_type_name}の内容:
+\"\"\"
+{resume_text}
+\"\"\"
+""")
+    
+    def _create_batch_analysis_prompt(self, items: List[Dict[str, Any]]) -> str:
+        """Create prompt that packs several documents with per-item delimiters and IDs."""
+        
+        documents = "\n\n".join(
+            f"<<<DOCUMENT id={item['id']} type={'履歴書' if item['document_type'] == 'resume' else '職務経歴書'}>>>\n"
+            f"{item['text']}\n"
+            f"<<<END DOCUMENT id={item['id']}>>>"
+            for item in items
+        )
+        
         return f"""
-あなたはキャリアアドバイザーAIです。以下の{doc_type_name}を分析し、キャリアパスの提案を行ってください。
+あなたはキャリアアドバイザーAIです。以下の{len(items)}件の書類をそれぞれ独立して分析し、書類ごとにキャリアパスの提案を行ってください。
+各書類は <<<DOCUMENT id=...>>> と <<<END DOCUMENT id=...>>> で区切られています。書類間で情報を混同しないでください。
 
-分析する内容:
+各書類について分析する内容:
 1. スキルと経験の抽出
 2. 3つのキャリアパス提案（企業転職、フリーランス、起業）
 3. 各パスに必要なスキルと、既存スキルとのマッチ度計算
@@ -98,38 +669,32 @@ class GeminiService:
 5. 推定年収レンジ（日本市場）
 6. 具体的な次のステップ
 
-重要: skill_match_percentageは、候補者の現在のスキルが各キャリアパスに必要なスキルとどの程度マッチしているかを0-100の整数で必ず計算してください。
+重要: skill_match_percentageは0-100の整数で必ず計算してください。
+
+以下の形式の厳密なJSONのみを出力してください（JSON以外の解説文、マークダウン、``` などを絶対に含めないでください）。
+resultsには書類ごとに1つの要素を含め、"id"には書類のidをそのまま入れてください。各要素の残りの項目は次の構造です:
+
+{ANALYSIS_RESULT_SCHEMA}
+
+出力形式:
+{{"results": [{{"id": 書類のid, "extracted_skills": [...], "experience_summary": "...", "career_paths": [...], "overall_insights": "..."}}, ...]}}
+
+{documents}
+"""
+    
+    def _create_skills_prompt(self, resume_text: str, document_type: str) -> str:
+        """Create the short skills/summary extraction prompt used by fan-out mode."""
+        
+        doc_type_name = "履歴書" if document_type == "resume" else "職務経歴書"
+        
+        return f"""
+あなたはキャリアアドバイザーAIです。以下の{doc_type_name}からスキルと経験を抽出してください。
 
 以下の形式の厳密なJSONのみを出力してください（JSON以外の解説文、マークダウン、``` などを絶対に含めないでください）:
 
 {{
   "extracted_skills": ["スキル1", "スキル2", ...],
   "experience_summary": "経験の要約",
-  "career_paths": [
-    {{
-      "type": "corporate",
-      "title": "職種名",
-      "description": "説明",
-      "required_skills": ["必要スキル1", ...],
-      "skill_match_percentage": スキルマッチ度(0-100の整数),
-      "skill_gaps": ["不足スキル1", ...],
-      "salary_range": {{
-        "min": 最低年収(整数),
-        "max": 最高年収(整数)
-      }},
-      "market_demand": "high/medium/low",
-      "confidence_score": 0.0-1.0の小数,
-      "next_steps": ["ステップ1", ...]
-    }},
-    {{
-      "type": "freelance",
-      ...同様の構造
-    }},
-    {{
-      "type": "entrepreneurship",
-      ...同様の構造
-    }}
-  ],
   "overall_insights": "全体的な洞察"
 }}
 
@@ -139,6 +704,97 @@ class GeminiService:
 \"\"\"
 """
     
+    def _create_chunk_prompt(self, chunk: str, document_type: str, index: int, total: int) -> str:
+        """Create the per-chunk extraction prompt used by chunked (map-reduce) mode."""
+        
+        doc_type_name = "履歴書" if document_type == "resume" else "職務経歴書"
+        
+        return f"""
+あなたはキャリアアドバイザーAIです。以下は長い{doc_type_name}を分割した{total}個のパートのうち{index + 1}番目です。
+このパートに書かれているスキルと経験だけを抽出してください。
+
+以下の形式の厳密なJSONのみを出力してください（JSON以外の解説文、マークダウン、``` などを絶対に含めないでください）:
+
+{{
+  "extracted_skills": ["スキル1", "スキル2", ...],
+  "experience_summary": "このパートの経験の要約（期間・役割・成果を含める）"
+}}
+
+{doc_type_name}のパート{index + 1}/{total}:
+\"\"\"
+{chunk}
+\"\"\"
+"""
+    
+    def _create_reduce_prompt(self, partials: List[Dict[str, Any]], document_type: str) -> str:
+        """Create the reduce prompt that turns per-chunk extractions into the full analysis."""
+        
+        doc_type_name = "履歴書" if document_type == "resume" else "職務経歴書"
+        skills = list(dict.fromkeys(
+            skill for partial in partials for skill in partial.get("extracted_skills", [])
+        ))
+        summaries = "\n".join(
+            f"{i + 1}. {partial.get('experience_summary', '')}" for i, partial in enumerate(partials)
+        )
+        
+        return f"""
+あなたはキャリアアドバイザーAIです。以下は{doc_type_name}を分割して抽出したスキルと経験の要約です。
+これらを統合して候補者を分析し、キャリアパスの提案を行ってください。
+
+分析する内容:
+1. スキルと経験の統合（重複を除き、経験全体の要約を作成）
+2. 3つのキャリアパス提案（企業転職、フリーランス、起業）
+3. 各パスに必要なスキルと、既存スキルとのマッチ度計算
+4. 各パスに必要なスキルギャップ
+5. 推定年収レンジ（日本市場）
+6. 具体的な次のステップ
+
+重要: skill_match_percentageは、候補者の現在のスキルが各キャリアパスに必要なスキルとどの程度マッチしているかを0-100の整数で必ず計算してください。
+
+以下の形式の厳密なJSONのみを出力してください（JSON以外の解説文、マークダウン、``` などを絶対に含めないでください）:
+
+{ANALYSIS_RESULT_SCHEMA}
+
+抽出されたスキル: {', '.join(skills)}
+
+パートごとの経験の要約（時系列順）:
+{summaries}
+"""
+    
+    def _create_career_path_prompt(self, career_type: CareerType, summary: Dict[str, Any]) -> str:
+        """Create the prompt for a single career type used by fan-out mode."""
+        
+        return f"""
+あなたはキャリアアドバイザーAIです。以下の候補者に対して、{CAREER_TYPE_LABELS[career_type]}のキャリアパスを1つ提案してください。
+
+現在のスキル: {', '.join(summary.get("extracted_skills", []))}
+経験の要約: {summary.get("experience_summary", "")}
+
+重要: skill_match_percentageは、候補者の現在のスキルがこのキャリアパスに必要なスキルとどの程度マッチしているかを0-100の整数で必ず計算してください。
+
+以下の形式の厳密なJSONのみを出力してください（JSON以外の解説文、マークダウン、``` などを絶対に含めないでください）:
+
+{{
+  "type": "{career_type.value}",
+  "title": "職種名",
+  "description": "説明",
+  "required_skills": ["必要スキル1", ...],
+  "skill_match_percentage": スキルマッチ度(0-100の整数),
+  "skill_gaps": ["不足スキル1", ...],
+  "salary_range": {{
+    "min": 最低年収(整数),
+    "max": 最高年収(整数)
+  }},
+  "market_demand": "high/medium/low",
+  "confidence_score": 0.0-1.0の小数,
+  "next_steps": ["ステップ1", ...]
+}}
+"""
+    
+    def parse_analysis(self, raw_text: str) -> Dict[str, Any]:
+        """Parse the raw model output of an analysis (see analyze_resume_sync)."""
+        return self._extract_json_from_response(raw_text)
+    
     def _extract_json_from_response(self, response_text: str) -> Dict[str, Any]:
         """Extract JSON object from Gemini response text."""
         
@@ -162,12 +818,51 @@ class GeminiService:
         self,
         career_type: str,
         skills: List[str],
-        experience: str
+        experience: str,
+        title: Optional[str] = None
     ) -> Dict[str, Any]:
         """Generate detailed career path recommendations."""
         
-        prompt = f"""
-以下の情報を基に、{career_type}のキャリアパスの詳細な分析を提供してください。
+        prompt = self._create_detailed_career_path_prompt(career_type, skills, experience, title)
+        
+        try:
+            parsed_response, _, _ = await self._generate_json_async(prompt)
+            return parsed_response
+        except Exception as e:
+            logger.error(f"Detailed path generation error: {str(e)}")
+            raise
+    
+    def generate_detailed_career_path_sync(
+        self,
+        career_type: str,
+        skills: List[str],
+        experience: str,
+        title: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Synchronous version of generate_detailed_career_path for Celery tasks."""
+        
+        prompt = self._create_detailed_career_path_prompt(career_type, skills, experience, title)
+        
+        try:
+            parsed_response, _, _ = self._generate_json(prompt)
+            return parsed_response
+        except Exception as e:
+            logger.error(f"Detailed path generation error: {str(e)}")
+            raise
+    
+    def _create_detailed_career_path_prompt(
+        self,
+        career_type: str,
+        skills: List[str],
+        experience: str,
+        title: Optional[str] = None
+    ) -> str:
+        """Create prompt for a detailed career path analysis."""
+        
+        target = f"{career_type}「{title}」" if title else career_type
+        
+        return f"""
+以下の情報を基に、{target}のキャリアパスの詳細な分析を提供してください。
 
 現在のスキル: {', '.join(skills)}
 経験: {experience}
@@ -195,15 +890,6 @@ class GeminiService:
   }}
 }}
 """
-        
-        try:
-            response = await self.model.generate_content_async(prompt)
-            parsed_response = self._extract_json_from_response(response.text)
-            return parsed_response
-        except Exception as e:
-            logger.error(f"Detailed path generation error: {str(e)}")
-            raise
-
 
 # Singleton instance
 gemini_service = GeminiService()
\ No newline at end of file
@@ -0,0 +1,68 @@
+from functools import lru_cache
+from typing import Any, Dict, Optional
+import google.generativeai as genai
+from google.ai import generativelanguage as glm
+from google.auth.credentials import AnonymousCredentials
+from google.cloud import vision
+from app.core.config import settings
+
+
+def uses_simulator() -> bool:
+    """Whether Google API calls go to the local simulator instead of Google."""
+    return bool(settings.GOOGLE_API_SIMULATOR_URL)
+
+
+def _gemini_client_kwargs(api_key: Optional[str] = None) -> Dict[str, Any]:
+    client_options: Dict[str, Any] = {}
+    if api_key:
+        client_options["api_key"] = api_key
+    if uses_simulator():
+        client_options["api_endpoint"] = settings.GOOGLE_API_SIMULATOR_URL
+        return {"client_options": client_options, "transport": "rest"}
+    return {"client_options": client_options}
+
+
+def configure_genai():
+    """Configure the process-global Gemini client (real API or simulator)."""
+    kwargs = _gemini_client_kwargs()
+    genai.configure(api_key=settings.GEMINI_API_KEY, **kwargs)
+
+
+def bind_api_key(model: genai.GenerativeModel, api_key: str) -> genai.GenerativeModel:
+    """Give a model its own clients for a non-default API key.
+
+    genai.configure is process-global, so pool keys need per-model clients.
+    """
+    kwargs = _gemini_client_kwargs(api_key)
+    model._client = glm.GenerativeServiceClient(**kwargs)
+    if not uses_simulator():
+        # The async client only supports gRPC
+        model._async_client = glm.GenerativeServiceAsyncClient(client_options=kwargs["client_options"])
+    return model
+
+
+@lru_cache(maxsize=None)
+def create_cache_client(api_key: str) -> glm.CacheServiceClient:
+    """Cached-content client for one API key (caches are scoped to the key)."""
+    return glm.CacheServiceClient(**_gemini_client_kwargs(api_key))
+
+
+def bind_cached_content(model: genai.GenerativeModel, cached_content_name: str) -> genai.GenerativeModel:
+    """Make a model send requests against a cached content prefix.
+
+    GenerativeModel.from_cached_content looks the cache up with the default
+    key, which fails for caches created with pool keys.
+    """
+    model._cached_content = cached_content_name
+    return model
+
+
+def create_vision_client() -> vision.ImageAnnotatorClient:
+    """Create a Cloud Vision client (real API or simulator)."""
+    if uses_simulator():
+        return vision.ImageAnnotatorClient(
+            credentials=AnonymousCredentials(),
+            transport="rest",
+            client_options={"api_endpoint": settings.GOOGLE_API_SIMULATOR_URL},
+        )
+    return vision.ImageAnnotatorClient()
@@ -0,0 +1,110 @@
+import logging
+from dataclasses import dataclass
+from typing import Optional
+from redis.exceptions import RedisError
+from app.core.config import settings
+from app.core.redis import broker_queue_keys, get_async_redis, get_redis
+from app.services.resilience import CircuitBreaker, get_circuit_breaker, get_latency_tracker
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ModelChoice:
+    model_name: str
+    reason: str
+
+
+class ModelRouter:
+    """Picks the Gemini model tier for each analysis.
+
+    Short, clean documents go to the fast tier; long or complex ones stay on the
+    quality tier (settings.GEMINI_MODEL). A deep analysis queue or a degraded
+    quality tier (observed error rate or median latency) also moves work to the
+    fast tier, and an unhealthy fast tier sends everything back to quality.
+    """
+
+    def queue_depth(self) -> Optional[int]:
+        """Pending analysis tasks in the broker queue, or None if unknown."""
+        try:
+            pipe = get_redis().pipeline()
+            for key in broker_queue_keys(settings.MODEL_ROUTING_QUEUE):
+                pipe.llen(key)
+            return sum(pipe.execute())
+        except RedisError as e:
+            logger.warning(f"Could not read analysis queue depth: {str(e)}")
+            return None
+
+    async def queue_depth_async(self) -> Optional[int]:
+        """Async version of queue_depth for the API."""
+        try:
+            pipe = get_async_redis().pipeline()
+            for key in broker_queue_keys(settings.MODEL_ROUTING_QUEUE):
+                pipe.llen(key)
+            return sum(await pipe.execute())
+        except RedisError as e:
+            logger.warning(f"Could not read analysis queue depth: {str(e)}")
+            return None
+
+    def _is_healthy(self, model_name: str) -> bool:
+        breaker = get_circuit_breaker(model_name)
+        return (
+            breaker.state != CircuitBreaker.OPEN
+            and breaker.error_rate() <= settings.MODEL_ROUTING_MAX_ERROR_RATE
+        )
+
+    def _is_slow(self, model_name: str) -> bool:
+        median = get_latency_tracker(model_name).percentile(0.5, min_samples=settings.GEMINI_HEDGE_MIN_SAMPLES)
+        return median is not None and median > settings.MODEL_ROUTING_MAX_MEDIAN_SECONDS
+
+    def choose(self, text_length: int, document_type: str) -> ModelChoice:
+        """Choose the model for one analysis from input size, type, load and model health."""
+
+        choice = self._choose_without_load(text_length, document_type)
+        if choice:
+            return choice
+        return self._choose_by_load(text_length, document_type, self.queue_depth())
+
+    async def choose_async(self, text_length: int, document_type: str) -> ModelChoice:
+        """Async version of choose; reads the queue depth without blocking the event loop."""
+
+        choice = self._choose_without_load(text_length, document_type)
+        if choice:
+            return choice
+        return self._choose_by_load(text_length, document_type, await self.queue_depth_async())
+
+    def _choose_without_load(self, text_length: int, document_type: str) -> Optional[ModelChoice]:
+        """Decisions that need no queue depth, or None to decide by load."""
+
+        quality = settings.GEMINI_MODEL
+        fast = settings.GEMINI_FAST_MODEL
+
+        if not settings.MODEL_ROUTING_ENABLED or not fast or fast == quality:
+            return ModelChoice(quality, "routing disabled")
+
+        if not self._is_healthy(fast):
+            return ModelChoice(quality, "fast tier unhealthy")
+
+        if (
+            text_length <= settings.MODEL_ROUTING_FAST_MAX_CHARS
+            and document_type in (settings.MODEL_ROUTING_FAST_DOCUMENT_TYPES or [])
+        ):
+            return ModelChoice(fast, f"short {document_type} ({text_length} chars)")
+
+        if not self._is_healthy(quality):
+            return ModelChoice(fast, "quality tier unhealthy")
+
+        if self._is_slow(quality):
+            return ModelChoice(fast, "quality tier median latency above limit")
+
+        return None
+
+    def _choose_by_load(self, text_length: int, document_type: str, depth: Optional[int]) -> ModelChoice:
+        if depth is not None and depth > settings.MODEL_ROUTING_QUEUE_DEPTH_THRESHOLD:
+            return ModelChoice(settings.GEMINI_FAST_MODEL, f"queue depth {depth}")
+
+        return ModelChoice(settings.GEMINI_MODEL, f"{document_type} ({text_length} chars)")
+
+
+# Singleton instance
+model_router = ModelRouter()
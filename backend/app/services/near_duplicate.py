@@ -0,0 +1,135 @@
+import hashlib
+import logging
+import random
+import re
+import unicodedata
+from typing import List, Optional, Tuple
+from redis.exceptions import RedisError
+from app.core.config import settings
+from app.core.redis import get_async_redis, get_redis
+
+logger = logging.getLogger(__name__)
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+class NearDuplicateIndex:
+    """MinHash/LSH index over character shingles of document text.
+
+    Signatures and LSH band buckets live in Redis and are scoped per user, so
+    a new upload is only compared with that user's previous documents.
+    """
+
+    def __init__(self):
+        self.num_perm = settings.NEAR_DUP_NUM_PERM
+        self.bands = settings.NEAR_DUP_BANDS
+        self.rows = self.num_perm // self.bands
+        # Fixed seed: signatures must stay comparable across processes and restarts
+        rng = random.Random(1)
+        self._permutations = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(self.num_perm)
+        ]
+
+    def _shingles(self, text: str) -> List[int]:
+        """Hashes of character k-shingles of the normalized text."""
+
+        text = re.sub(r"\s+", "", unicodedata.normalize("NFKC", text))
+        k = settings.NEAR_DUP_SHINGLE_SIZE
+        shingles = {text[i:i + k] for i in range(max(len(text) - k + 1, 1))}
+        return [
+            int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=4).digest(), "big")
+            for shingle in shingles
+        ]
+
+    def signature(self, text: str) -> List[int]:
+        """MinHash signature of a document."""
+
+        hashes = self._shingles(text)
+        return [
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self._permutations
+        ]
+
+    def _band_keys(self, user_id: int, signature: List[int]) -> List[str]:
+        keys = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows]
+            digest = hashlib.blake2b(",".join(map(str, rows)).encode(), digest_size=8).hexdigest()
+            keys.append(f"lsh:{user_id}:{band}:{digest}")
+        return keys
+
+    @staticmethod
+    def _similarity(a: List[int], b: List[int]) -> float:
+        """Estimated Jaccard similarity of two signatures."""
+        return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+    def add(self, document_id: int, user_id: int, text: str):
+        """Hash a document and add it to the index.
+
+        CPU-bound (about a second for a long resume): call it from the prefork
+        extract workers, never from the gevent analyze workers.
+        """
+
+        try:
+            signature = self.signature(text)
+            pipe = get_redis().pipeline()
+            pipe.set(f"lsh:sig:{document_id}", ",".join(map(str, signature)))
+            for key in self._band_keys(user_id, signature):
+                pipe.sadd(key, document_id)
+            pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Failed to add document {document_id} to near-duplicate index: {str(e)}")
+
+    def find_similar(self, document_id: int, user_id: int) -> Optional[Tuple[int, float]]:
+        """Find this user's most similar other indexed document.
+
+        Uses the signature stored by add(), so nothing is hashed here. Returns
+        (document_id, similarity) when a candidate reaches the threshold.
+        """
+
+        try:
+            redis = get_redis()
+            raw_signature = redis.get(f"lsh:sig:{document_id}")
+            if not raw_signature:
+                return None
+            signature = [int(v) for v in raw_signature.split(",")]
+
+            candidates = set(redis.sunion(self._band_keys(user_id, signature))) - {str(document_id)}
+            best = None
+            if candidates:
+                candidate_ids = sorted(candidates)
+                stored = redis.mget([f"lsh:sig:{candidate_id}" for candidate_id in candidate_ids])
+                for candidate_id, raw_candidate in zip(candidate_ids, stored):
+                    if not raw_candidate:
+                        continue
+                    similarity = self._similarity(signature, [int(v) for v in raw_candidate.split(",")])
+                    if similarity >= settings.NEAR_DUP_THRESHOLD and (best is None or similarity > best[1]):
+                        best = (int(candidate_id), similarity)
+            return best
+
+        except RedisError as e:
+            logger.warning(f"Near-duplicate index unavailable: {str(e)}")
+            return None
+
+    async def remove(self, document_id: int, user_id: int):
+        """Remove a deleted document from the index (API)."""
+
+        try:
+            redis = get_async_redis()
+            raw_signature = await redis.get(f"lsh:sig:{document_id}")
+            if not raw_signature:
+                return
+            signature = [int(v) for v in raw_signature.split(",")]
+            pipe = redis.pipeline()
+            for key in self._band_keys(user_id, signature):
+                pipe.srem(key, document_id)
+            pipe.delete(f"lsh:sig:{document_id}")
+            await pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Failed to remove document {document_id} from near-duplicate index: {str(e)}")
+
+
+# Singleton instance
+near_duplicate_index = NearDuplicateIndex()
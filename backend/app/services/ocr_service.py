@@ -7,6 +7,8 @@ from google.cloud import vision
 from google.api_core import exceptions as gcp_exceptions
 import google.generativeai as genai
 from app.core.config import settings
+from app.core.metrics import observe_call
+from app.services.google_clients import configure_genai, create_vision_client, uses_simulator
 
 logger = logging.getLogger(__name__)
 
@@ -18,10 +20,10 @@ class OCRService:
         self.use_cloud_vision = False
         self.vision_client = None
         
-        # Try to initialize Google Cloud Vision if credentials are available
-        if hasattr(settings, 'GOOGLE_CLOUD_CREDENTIALS_PATH') and settings.GOOGLE_CLOUD_CREDENTIALS_PATH:
+        # Try to initialize Google Cloud Vision if credentials (or the simulator) are available
+        if uses_simulator() or (hasattr(settings, 'GOOGLE_CLOUD_CREDENTIALS_PATH') and settings.GOOGLE_CLOUD_CREDENTIALS_PATH):
             try:
-                self.vision_client = vision.ImageAnnotatorClient()
+                self.vision_client = create_vision_client()
                 self.use_cloud_vision = True
                 logger.info("Google Cloud Vision API initialized successfully")
             except Exception as e:
@@ -29,8 +31,8 @@ class OCRService:
         
         # Initialize Gemini for fallback OCR
         if settings.GEMINI_API_KEY:
-            genai.configure(api_key=settings.GEMINI_API_KEY)
-            self.gemini_model = genai.GenerativeModel('gemini-1.5-flash')
+            configure_genai()
+            self.gemini_model = genai.GenerativeModel(settings.GEMINI_OCR_MODEL)
             logger.info("Gemini API initialized for OCR fallback")
     
     async def extract_text_from_image_pdf(self, pdf_content: bytes) -> str:
@@ -50,16 +52,7 @@ class OCRService:
             all_text = []
             for i, image in enumerate(images):
                 logger.info(f"Processing image {i+1}/{len(images)}")
-                
-                # Try Google Cloud Vision first
-                if self.use_cloud_vision:
-                    text = await self._ocr_with_cloud_vision(image)
-                    if text:
-                        all_text.append(text)
-                        continue
-                
-                # Fallback to Gemini Vision
-                text = await self._ocr_with_gemini(image)
+                text = await self._ocr_image(image)
                 if text:
                     all_text.append(text)
             
@@ -72,6 +65,56 @@ class OCRService:
             logger.error(f"OCR extraction failed: {str(e)}")
             return ""
     
+    def page_count(self, pdf_content: bytes) -> int:
+        """Number of pages in a PDF, for per-page OCR fan-out."""
+        
+        pdf_document = fitz.open(stream=pdf_content, filetype="pdf")
+        try:
+            return pdf_document.page_count
+        finally:
+            pdf_document.close()
+    
+    async def extract_text_from_page(self, pdf_content: bytes, page_number: int) -> str:
+        """OCR a single page (0-based) of an image-based PDF.
+        
+        Raises if OCR fails (e.g. Vision and Gemini both rate limited), so the
+        page task can retry instead of keeping an empty page.
+        """
+        
+        pdf_document = fitz.open(stream=pdf_content, filetype="pdf")
+        try:
+            image = self._render_page(pdf_document, page_number)
+        finally:
+            pdf_document.close()
+        
+        text = await self._ocr_image(image, raise_errors=True)
+        logger.info(f"OCR extracted {len(text or '')} characters from page {page_number+1}")
+        return text or ""
+    
+    async def _ocr_image(self, image: bytes, raise_errors: bool = False) -> Optional[str]:
+        """OCR one page image with Cloud Vision, falling back to Gemini Vision.
+        
+        With raise_errors, a Gemini failure is raised instead of returning None
+        (a Vision failure still falls back to Gemini).
+        """
+        
+        # Try Google Cloud Vision first
+        if self.use_cloud_vision:
+            text = await self._ocr_with_cloud_vision(image)
+            if text:
+                return text
+        
+        # Fallback to Gemini Vision
+        return await self._ocr_with_gemini(image, raise_errors)
+    
+    def _render_page(self, pdf_document, page_num: int) -> bytes:
+        """Render one PDF page to PNG."""
+        
+        page = pdf_document[page_num]
+        mat = fitz.Matrix(2, 2)  # 2x zoom for better quality
+        pix = page.get_pixmap(matrix=mat)
+        return pix.tobytes("png")
+    
     def _extract_images_from_pdf(self, pdf_content: bytes) -> List[bytes]:
         """Extract images from PDF pages."""
         
@@ -81,12 +124,8 @@ class OCRService:
             pdf_document = fitz.open(stream=pdf_content, filetype="pdf")
             
             for page_num in range(pdf_document.page_count):
-                page = pdf_document[page_num]
-                
                 # Convert page to image
-                mat = fitz.Matrix(2, 2)  # 2x zoom for better quality
-                pix = page.get_pixmap(matrix=mat)
-                img_data = pix.tobytes("png")
+                img_data = self._render_page(pdf_document, page_num)
                 images.append(img_data)
                 
                 logger.info(f"Converted page {page_num+1} to image ({len(img_data)} bytes)")
@@ -108,10 +147,11 @@ class OCRService:
             image = vision.Image(content=image_bytes)
             
             # Perform OCR with Japanese language hint
-            response = self.vision_client.document_text_detection(
-                image=image,
-                image_context={"language_hints": ["ja", "en"]}
-            )
+            with observe_call("vision", "document_text_detection"):
+                response = self.vision_client.document_text_detection(
+                    image=image,
+                    image_context={"language_hints": ["ja", "en"]}
+                )
             
             if response.error.message:
                 logger.error(f"Cloud Vision API error: {response.error.message}")
@@ -129,7 +169,7 @@ class OCRService:
             logger.error(f"Cloud Vision OCR failed: {str(e)}")
             return None
     
-    async def _ocr_with_gemini(self, image_bytes: bytes) -> Optional[str]:
+    async def _ocr_with_gemini(self, image_bytes: bytes, raise_errors: bool = False) -> Optional[str]:
         """Perform OCR using Gemini Vision API as fallback."""
         
         try:
@@ -141,7 +181,8 @@ class OCRService:
 表形式のデータは適切に整形してください。"""
             
             # Send image to Gemini
-            response = self.gemini_model.generate_content([prompt, image])
+            with observe_call("gemini", settings.GEMINI_OCR_MODEL):
+                response = self.gemini_model.generate_content([prompt, image])
             
             if response.text:
                 logger.info(f"Gemini OCR extracted {len(response.text)} characters")
@@ -152,6 +193,8 @@ class OCRService:
                 
         except Exception as e:
             logger.error(f"Gemini OCR failed: {str(e)}")
+            if raise_errors:
+                raise
             return None
 
 
@@ -0,0 +1,244 @@
+import asyncio
+import hashlib
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from redis.exceptions import RedisError
+from app.core.config import settings
+from app.core.redis import get_async_redis, get_redis
+
+logger = logging.getLogger(__name__)
+
+# Refills the request and token buckets of every key in the pool, then takes
+# capacity from the least-loaded key that can serve the request.
+# KEYS: one bucket hash per API key, followed by one cooldown key per API key.
+# ARGV: requests/min, tokens/min, token cost of this request.
+# Returns {key index (1-based) or -1, seconds until capacity is expected}.
+TOKEN_BUCKET_SCRIPT = """
+local pool_size = #KEYS / 2
+local rpm = tonumber(ARGV[1])
+local tpm = tonumber(ARGV[2])
+local cost = math.min(tonumber(ARGV[3]), tpm)
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+
+local best = -1
+local best_score = -1
+local min_wait = -1
+local state = {}
+
+for i = 1, pool_size do
+  local data = redis.call('HMGET', KEYS[i], 'requests', 'tokens', 'ts')
+  local requests = tonumber(data[1]) or rpm
+  local tokens = tonumber(data[2]) or tpm
+  local elapsed = math.max(0, now - (tonumber(data[3]) or now))
+  requests = math.min(rpm, requests + elapsed * rpm / 60)
+  tokens = math.min(tpm, tokens + elapsed * tpm / 60)
+  state[i] = {requests, tokens}
+
+  local cooldown = redis.call('PTTL', KEYS[pool_size + i]) / 1000
+  if cooldown <= 0 and requests >= 1 and tokens >= cost then
+    local score = math.min(requests / rpm, tokens / tpm)
+    if score > best_score then
+      best = i
+      best_score = score
+    end
+  else
+    local wait = math.max(cooldown, (1 - requests) * 60 / rpm, (cost - tokens) * 60 / tpm)
+    if min_wait < 0 or wait < min_wait then
+      min_wait = wait
+    end
+  end
+end
+
+for i = 1, pool_size do
+  local requests = state[i][1]
+  local tokens = state[i][2]
+  if i == best then
+    requests = requests - 1
+    tokens = tokens - cost
+  end
+  redis.call('HSET', KEYS[i], 'requests', requests, 'tokens', tokens, 'ts', now)
+  redis.call('EXPIRE', KEYS[i], 120)
+end
+
+if best > 0 then
+  return {best, '0'}
+end
+return {-1, tostring(min_wait)}
+"""
+
+
+class RateLimitTimeoutError(Exception):
+    """Raised when no API key frees up capacity within the maximum wait."""
+
+
+@dataclass
+class RateLimitLease:
+    """Capacity taken from one API key of the pool for a single request."""
+
+    model_name: str
+    api_key: str
+    key_id: str
+    tokens: int
+
+
+class GeminiRateLimiter:
+    """Redis-backed token-bucket limiter shared by all API and Celery processes.
+
+    Each API key in the pool has a requests/min and a tokens/min bucket per model.
+    Callers wait for capacity on the least-loaded key instead of burning retries.
+    """
+
+    def __init__(self):
+        self.api_keys = self._build_key_pool()
+        self._script = None
+        self._async_script = None
+
+    def _build_key_pool(self) -> List[str]:
+        """Primary key first, then any extra pool keys without duplicates."""
+        keys = [settings.GEMINI_API_KEY] + (settings.GEMINI_API_KEYS or [])
+        return list(dict.fromkeys(key for key in keys if key))
+
+    @staticmethod
+    def key_id(api_key: str) -> str:
+        """Stable, non-secret identifier of an API key for Redis keys and logs."""
+        return hashlib.sha256(api_key.encode()).hexdigest()[:12]
+
+    def _redis_keys(self, model_name: str) -> List[str]:
+        prefix = f"gemini:ratelimit:{model_name}"
+        key_ids = [self.key_id(api_key) for api_key in self.api_keys]
+        return (
+            [f"{prefix}:{key_id}" for key_id in key_ids]
+            + [f"{prefix}:{key_id}:cooldown" for key_id in key_ids]
+        )
+
+    @staticmethod
+    def _script_args(tokens: int) -> list:
+        return [settings.GEMINI_REQUESTS_PER_MINUTE, settings.GEMINI_TOKENS_PER_MINUTE, tokens]
+
+    def _try_acquire(self, model_name: str, tokens: int) -> Tuple[Optional[RateLimitLease], float]:
+        """Take capacity atomically; returns a lease or the expected wait in seconds."""
+
+        if not settings.GEMINI_RATE_LIMIT_ENABLED:
+            return self._lease(model_name, 0, tokens), 0.0
+
+        try:
+            if self._script is None:
+                self._script = get_redis().register_script(TOKEN_BUCKET_SCRIPT)
+            result = self._script(keys=self._redis_keys(model_name), args=self._script_args(tokens))
+        except RedisError as e:
+            # Fail open: an unavailable limiter must not stop analyses
+            logger.warning(f"Rate limiter unavailable, proceeding without it: {str(e)}")
+            return self._lease(model_name, 0, tokens), 0.0
+        return self._acquire_result(model_name, tokens, result)
+
+    async def _try_acquire_async(self, model_name: str, tokens: int) -> Tuple[Optional[RateLimitLease], float]:
+        """_try_acquire on the asyncio Redis client."""
+
+        if not settings.GEMINI_RATE_LIMIT_ENABLED:
+            return self._lease(model_name, 0, tokens), 0.0
+
+        try:
+            if self._async_script is None:
+                self._async_script = get_async_redis().register_script(TOKEN_BUCKET_SCRIPT)
+            result = await self._async_script(keys=self._redis_keys(model_name), args=self._script_args(tokens))
+        except RedisError as e:
+            logger.warning(f"Rate limiter unavailable, proceeding without it: {str(e)}")
+            return self._lease(model_name, 0, tokens), 0.0
+        return self._acquire_result(model_name, tokens, result)
+
+    def _acquire_result(self, model_name: str, tokens: int, result) -> Tuple[Optional[RateLimitLease], float]:
+        index, wait = result
+        index = int(index)
+        if index > 0:
+            return self._lease(model_name, index - 1, tokens), 0.0
+        return None, float(wait)
+
+    def _lease(self, model_name: str, index: int, tokens: int) -> RateLimitLease:
+        api_key = self.api_keys[index]
+        return RateLimitLease(
+            model_name=model_name,
+            api_key=api_key,
+            key_id=self.key_id(api_key),
+            tokens=tokens,
+        )
+
+    def _next_sleep(self, wait: float, deadline: float) -> float:
+        if time.monotonic() + wait > deadline:
+            raise RateLimitTimeoutError(
+                f"No Gemini capacity within {settings.GEMINI_RATE_LIMIT_MAX_WAIT_SECONDS}s"
+            )
+        # Jitter so queued callers do not all wake up on the same tick
+        return min(max(wait, 0.05), 5.0) * random.uniform(1.0, 1.2)
+
+    def acquire(self, model_name: str, tokens: int) -> RateLimitLease:
+        """Block until a key of the pool has capacity for this request."""
+
+        deadline = time.monotonic() + settings.GEMINI_RATE_LIMIT_MAX_WAIT_SECONDS
+        while True:
+            lease, wait = self._try_acquire(model_name, tokens)
+            if lease:
+                return lease
+            time.sleep(self._next_sleep(wait, deadline))
+
+    async def acquire_async(self, model_name: str, tokens: int) -> RateLimitLease:
+        """Async version of acquire; Redis calls and waits never block the event loop."""
+
+        deadline = time.monotonic() + settings.GEMINI_RATE_LIMIT_MAX_WAIT_SECONDS
+        while True:
+            lease, wait = await self._try_acquire_async(model_name, tokens)
+            if lease:
+                return lease
+            await asyncio.sleep(self._next_sleep(wait, deadline))
+
+    def _bucket_key(self, lease: RateLimitLease) -> str:
+        return f"gemini:ratelimit:{lease.model_name}:{lease.key_id}"
+
+    def settle(self, lease: RateLimitLease, actual_tokens: Optional[int]):
+        """Correct the token bucket once the real usage of a request is known."""
+
+        if not settings.GEMINI_RATE_LIMIT_ENABLED or actual_tokens is None:
+            return
+        try:
+            get_redis().hincrbyfloat(self._bucket_key(lease), "tokens", lease.tokens - actual_tokens)
+        except RedisError as e:
+            logger.warning(f"Failed to settle rate limiter usage: {str(e)}")
+
+    async def settle_async(self, lease: RateLimitLease, actual_tokens: Optional[int]):
+        """Async version of settle."""
+
+        if not settings.GEMINI_RATE_LIMIT_ENABLED or actual_tokens is None:
+            return
+        try:
+            await get_async_redis().hincrbyfloat(self._bucket_key(lease), "tokens", lease.tokens - actual_tokens)
+        except RedisError as e:
+            logger.warning(f"Failed to settle rate limiter usage: {str(e)}")
+
+    def penalize(self, lease: RateLimitLease, seconds: int = 60):
+        """Take a key out of rotation after it hit its quota (HTTP 429)."""
+
+        logger.warning(f"Gemini key {lease.key_id} exhausted its quota, cooling down for {seconds}s")
+        if not settings.GEMINI_RATE_LIMIT_ENABLED:
+            return
+        try:
+            get_redis().set(f"{self._bucket_key(lease)}:cooldown", 1, ex=seconds)
+        except RedisError as e:
+            logger.warning(f"Failed to put key on cooldown: {str(e)}")
+
+    async def penalize_async(self, lease: RateLimitLease, seconds: int = 60):
+        """Async version of penalize."""
+
+        logger.warning(f"Gemini key {lease.key_id} exhausted its quota, cooling down for {seconds}s")
+        if not settings.GEMINI_RATE_LIMIT_ENABLED:
+            return
+        try:
+            await get_async_redis().set(f"{self._bucket_key(lease)}:cooldown", 1, ex=seconds)
+        except RedisError as e:
+            logger.warning(f"Failed to put key on cooldown: {str(e)}")
+
+
+# Singleton instance
+gemini_rate_limiter = GeminiRateLimiter()
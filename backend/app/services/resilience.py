@@ -0,0 +1,165 @@
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+from app.core.config import settings
+from app.core.metrics import CIRCUIT_BREAKER_STATE, CIRCUIT_BREAKER_REJECTIONS
+
+
+class CircuitOpenError(Exception):
+    """Raised when a circuit breaker rejects a call without attempting it."""
+
+
+class CircuitBreaker:
+    """Error-rate circuit breaker over a rolling time window.
+
+    closed: calls pass; opens when the failure rate in the window crosses the threshold.
+    open: calls fail fast until the cool-down has elapsed.
+    half_open: a single trial call decides between closing and re-opening.
+    """
+
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+    _STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float,
+        min_calls: int,
+        window_seconds: int,
+        open_seconds: int,
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.state = self.CLOSED
+        self._calls: Deque[Tuple[float, bool]] = deque()
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self._set_state(self.CLOSED)
+
+    def _set_state(self, state: str):
+        self.state = state
+        CIRCUIT_BREAKER_STATE.labels(name=self.name).set(self._STATE_VALUES[state])
+
+    def allow_request(self) -> bool:
+        """Whether a call may be attempted now."""
+
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    CIRCUIT_BREAKER_REJECTIONS.labels(name=self.name).inc()
+                    return False
+                self._set_state(self.HALF_OPEN)
+
+            if self.state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    CIRCUIT_BREAKER_REJECTIONS.labels(name=self.name).inc()
+                    return False
+                self._trial_in_flight = True
+
+            return True
+
+    def error_rate(self) -> float:
+        """Failure rate of the calls in the current window (0 when there are none)."""
+        with self._lock:
+            if not self._calls:
+                return 0.0
+            return sum(1 for _, ok in self._calls if not ok) / len(self._calls)
+
+    def release_trial(self):
+        """Give back a half-open trial slot that was never used for a call."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._trial_in_flight = False
+                self._calls.clear()
+                self._set_state(self.CLOSED)
+                return
+            self._record(True)
+
+    def record_failure(self):
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._trial_in_flight = False
+                self._open()
+                return
+            self._record(False)
+            failures = sum(1 for _, ok in self._calls if not ok)
+            if (
+                self.state == self.CLOSED
+                and len(self._calls) >= self.min_calls
+                and failures / len(self._calls) >= self.failure_rate_threshold
+            ):
+                self._open()
+
+    def _record(self, ok: bool):
+        now = time.monotonic()
+        self._calls.append((now, ok))
+        while self._calls and now - self._calls[0][0] > self.window_seconds:
+            self._calls.popleft()
+
+    def _open(self):
+        self._opened_at = time.monotonic()
+        self._set_state(self.OPEN)
+
+
+class LatencyTracker:
+    """Rolling sample of recent call latencies for percentile estimates."""
+
+    def __init__(self, max_samples: int = 500):
+        self._samples: Deque[float] = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float, min_samples: int = 1) -> Optional[float]:
+        """Latency at quantile q (0-1), or None until enough samples exist."""
+
+        with self._lock:
+            if len(self._samples) < max(min_samples, 1):
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+# Process-wide registries: Celery tasks create a new service per task, so the
+# state has to outlive individual service instances.
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
+_latency_trackers: Dict[str, LatencyTracker] = {}
+_registry_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """Get the process-wide circuit breaker for a dependency (e.g. a model name)."""
+    with _registry_lock:
+        if name not in _circuit_breakers:
+            _circuit_breakers[name] = CircuitBreaker(
+                name,
+                failure_rate_threshold=settings.GEMINI_CIRCUIT_FAILURE_RATE,
+                min_calls=settings.GEMINI_CIRCUIT_MIN_CALLS,
+                window_seconds=settings.GEMINI_CIRCUIT_WINDOW_SECONDS,
+                open_seconds=settings.GEMINI_CIRCUIT_OPEN_SECONDS,
+            )
+        return _circuit_breakers[name]
+
+
+def get_latency_tracker(name: str) -> LatencyTracker:
+    """Get the process-wide latency tracker for a dependency (e.g. a model name)."""
+    with _registry_lock:
+        if name not in _latency_trackers:
+            _latency_trackers[name] = LatencyTracker()
+        return _latency_trackers[name]
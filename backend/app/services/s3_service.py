@@ -3,6 +3,7 @@ from botocore.exceptions import ClientError
 from typing import Optional
 import logging
 from app.core.config import settings
+from app.core.metrics import observe_call
 
 logger = logging.getLogger(__name__)
 
@@ -54,12 +55,13 @@ class S3Service:
             if content_type:
                 extra_args['ContentType'] = content_type
             
-            self.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=key,
-                Body=file_content,
-                **extra_args
-            )
+            with observe_call("s3", "put_object"):
+                self.s3_client.put_object(
+                    Bucket=self.bucket_name,
+                    Key=key,
+                    Body=file_content,
+                    **extra_args
+                )
             
             logger.info(f"Uploaded file to S3: {key}")
             return key
@@ -71,11 +73,12 @@ class S3Service:
     async def download_file(self, key: str) -> bytes:
         """Download file from S3."""
         try:
-            response = self.s3_client.get_object(
-                Bucket=self.bucket_name,
-                Key=key
-            )
-            return response['Body'].read()
+            with observe_call("s3", "get_object"):
+                response = self.s3_client.get_object(
+                    Bucket=self.bucket_name,
+                    Key=key
+                )
+                return response['Body'].read()
             
         except ClientError as e:
             logger.error(f"S3 download failed: {str(e)}")
@@ -84,10 +87,11 @@ class S3Service:
     async def delete_file(self, key: str):
         """Delete file from S3."""
         try:
-            self.s3_client.delete_object(
-                Bucket=self.bucket_name,
-                Key=key
-            )
+            with observe_call("s3", "delete_object"):
+                self.s3_client.delete_object(
+                    Bucket=self.bucket_name,
+                    Key=key
+                )
             logger.info(f"Deleted file from S3: {key}")
             
         except ClientError as e:
@@ -0,0 +1,65 @@
+import re
+from typing import List
+
+# Lines that open a new section in Japanese resumes and CVs:
+# ■職務経歴, 【プロジェクト】, ◆案件, ●, ＜スキル＞, "2019年4月〜", "1. ..."
+SECTION_START = re.compile(
+    r"^\s*(?:[■□◆◇●○▼▽★☆【＜<\[]"
+    r"|\d{4}\s*[年/.-]\s*\d{1,2}"
+    r"|(?:職務要約|職務経歴|職歴|学歴|資格|免許|スキル|自己PR|プロジェクト|案件)"
+    r"|\d+[.．、)]\s)"
+)
+
+
+def split_sections(text: str) -> List[str]:
+    """Split document text into sections at heading and date lines."""
+
+    sections: List[str] = []
+    current: List[str] = []
+    for line in text.splitlines():
+        if SECTION_START.match(line) and any(previous.strip() for previous in current):
+            sections.append("\n".join(current))
+            current = []
+        current.append(line)
+    if any(previous.strip() for previous in current):
+        sections.append("\n".join(current))
+    return sections
+
+
+def _split_long(section: str, max_chars: int) -> List[str]:
+    """Split a section longer than max_chars at line, then character, boundaries."""
+
+    pieces: List[str] = []
+    current = ""
+    for line in section.splitlines():
+        while len(line) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(line[:max_chars])
+            line = line[max_chars:]
+        if current and len(current) + len(line) + 1 > max_chars:
+            pieces.append(current)
+            current = line
+        else:
+            current = f"{current}\n{line}" if current else line
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_text(text: str, max_chars: int) -> List[str]:
+    """Pack consecutive sections into chunks of at most max_chars characters."""
+
+    chunks: List[str] = []
+    current = ""
+    for section in split_sections(text):
+        for piece in ([section] if len(section) <= max_chars else _split_long(section, max_chars)):
+            if current and len(current) + len(piece) + 1 > max_chars:
+                chunks.append(current)
+                current = piece
+            else:
+                current = f"{current}\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
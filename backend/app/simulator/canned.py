@@ -0,0 +1,116 @@
+"""Canned Japanese career-analysis payloads returned by the API simulator."""
+
+import re
+from typing import Any, Dict, List
+
+SKILLS = ["Python", "TypeScript", "React", "AWS", "SQL", "チームマネジメント", "要件定義"]
+
+CAREER_PATHS: Dict[str, Dict[str, Any]] = {
+    "corporate": {
+        "type": "corporate",
+        "title": "フロントエンドエンジニア",
+        "description": "Web系企業でReactを中心としたフロントエンド開発をリードするポジションです。",
+        "required_skills": ["TypeScript", "React", "テスト自動化", "パフォーマンス改善"],
+        "skill_match_percentage": 78,
+        "skill_gaps": ["テスト自動化", "パフォーマンス改善"],
+        "salary_range": {"min": 5500000, "max": 8000000},
+        "market_demand": "high",
+        "confidence_score": 0.82,
+        "next_steps": ["ポートフォリオを更新する", "転職エージェントに登録する"],
+    },
+    "freelance": {
+        "type": "freelance",
+        "title": "フリーランスWebエンジニア",
+        "description": "業務委託でWebアプリケーションの設計から実装までを請け負う働き方です。",
+        "required_skills": ["Python", "React", "AWS", "顧客折衝"],
+        "skill_match_percentage": 70,
+        "skill_gaps": ["顧客折衝", "契約・税務の知識"],
+        "salary_range": {"min": 6000000, "max": 10000000},
+        "market_demand": "medium",
+        "confidence_score": 0.7,
+        "next_steps": ["副業で小規模案件を受注する", "開業届と会計の準備をする"],
+    },
+    "entrepreneurship": {
+        "type": "entrepreneurship",
+        "title": "SaaSスタートアップ創業者",
+        "description": "業務課題を解決するSaaSプロダクトを立ち上げる道です。",
+        "required_skills": ["プロダクト開発", "マーケティング", "資金調達", "チームマネジメント"],
+        "skill_match_percentage": 45,
+        "skill_gaps": ["マーケティング", "資金調達"],
+        "salary_range": {"min": 3000000, "max": 15000000},
+        "market_demand": "medium",
+        "confidence_score": 0.55,
+        "next_steps": ["顧客インタビューで課題を検証する", "MVPを3ヶ月で開発する"],
+    },
+}
+
+OCR_TEXT = """職務経歴書
+氏名 山田 太郎
+
+■職務要約
+Web系企業にてフロントエンドおよびバックエンドの開発に5年間従事。
+
+■職務経歴
+2019年4月〜現在 株式会社サンプル
+・ReactとTypeScriptによる管理画面の開発
+・PythonとAWSを用いたAPIサーバーの設計・構築
+
+■スキル
+Python / TypeScript / React / AWS / SQL
+"""
+
+
+def analysis() -> Dict[str, Any]:
+    return {
+        "extracted_skills": SKILLS,
+        "experience_summary": "Web系企業で5年間フルスタック開発に従事し、小規模チームのリードも経験。",
+        "career_paths": list(CAREER_PATHS.values()),
+        "overall_insights": "技術力は高く、企業転職では即戦力として評価されやすいプロファイルです。",
+    }
+
+
+def skills_summary() -> Dict[str, Any]:
+    data = analysis()
+    return {
+        "extracted_skills": data["extracted_skills"],
+        "experience_summary": data["experience_summary"],
+        "overall_insights": data["overall_insights"],
+    }
+
+
+def detailed_path() -> Dict[str, Any]:
+    return {
+        "detailed_path": {
+            "title": "フロントエンドエンジニア",
+            "description": "ユーザー体験を左右する画面を設計・実装し、プロダクトの品質を高める職種です。",
+            "pros": ["需要が高く求人が多い", "成果が目に見えやすい"],
+            "cons": ["技術の移り変わりが速い"],
+            "required_skills": ["TypeScript", "React", "アクセシビリティ"],
+            "recommended_courses": [
+                {"name": "React実践講座", "platform": "Udemy", "duration": "6週間", "cost": "2万円"}
+            ],
+            "estimated_preparation_time": 8,
+            "success_stories": ["SIerから自社開発企業へ転職し年収が150万円向上"],
+            "market_trends": "生成AI関連プロダクトの増加によりフロントエンド人材の需要は堅調です。",
+        }
+    }
+
+
+def batch(prompt: str) -> Dict[str, Any]:
+    ids: List[str] = re.findall(r"<<<DOCUMENT id=(\d+)", prompt)
+    return {"results": [{"id": int(item_id), **analysis()} for item_id in ids]}
+
+
+def for_prompt(prompt: str) -> Dict[str, Any]:
+    """Pick the canned payload matching the JSON shape a prompt asks for."""
+
+    if "<<<DOCUMENT id=" in prompt:
+        return batch(prompt)
+    if '"detailed_path"' in prompt:
+        return detailed_path()
+    if '"career_paths"' not in prompt:
+        for career_type, path in CAREER_PATHS.items():
+            if f'"type": "{career_type}"' in prompt:
+                return path
+        return skills_summary()
+    return analysis()
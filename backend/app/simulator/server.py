@@ -0,0 +1,294 @@
+"""Deterministic local stand-in for the Gemini and Cloud Vision APIs.
+
+Implements the REST surfaces the backend uses (generateContent,
+streamGenerateContent, countTokens, cachedContents and images:annotate) with configurable
+latency, token throughput and 429/500 error injection, so workers, retries,
+rate limiting and caching can be benchmarked offline.
+
+Run with:
+    uvicorn app.simulator.server:app --port 8090
+
+and point the backend at it with GOOGLE_API_SIMULATOR_URL=http://localhost:8090.
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from app.simulator import canned
+
+
+class SimulatorSettings(BaseSettings):
+    SEED: int = 42
+    LATENCY_DISTRIBUTION: str = "lognormal"  # fixed, uniform or lognormal
+    LATENCY_MEDIAN_MS: float = 800.0  # Time to first token
+    LATENCY_SIGMA: float = 0.5  # lognormal shape; uniform spread is median * (1 +/- sigma)
+    TOKENS_PER_SECOND: float = 80.0  # Output generation rate, 0 to disable
+    ERROR_429_RATE: float = 0.0
+    ERROR_500_RATE: float = 0.0
+    STREAM_CHUNKS: int = 5
+
+    model_config = SettingsConfigDict(env_prefix="SIMULATOR_")
+
+
+sim_settings = SimulatorSettings()
+app = FastAPI(title="Google API Simulator")
+
+_seen_requests: Counter = Counter()
+_seen_lock = threading.Lock()
+_stats: Counter = Counter()
+_cached_contents: Dict[str, Dict[str, Any]] = {}
+
+
+def _rng(body: bytes) -> random.Random:
+    """Per-request RNG seeded by the request body and how often it was seen.
+
+    Results do not depend on how concurrent requests interleave, so a
+    benchmark replays identically for the same seed and request sequence.
+    """
+    digest = hashlib.sha256(body).hexdigest()
+    with _seen_lock:
+        _seen_requests[digest] += 1
+        occurrence = _seen_requests[digest]
+    return random.Random(f"{sim_settings.SEED}:{digest}:{occurrence}")
+
+
+def _latency_seconds(rng: random.Random) -> float:
+    median = sim_settings.LATENCY_MEDIAN_MS / 1000
+    if sim_settings.LATENCY_DISTRIBUTION == "fixed":
+        return median
+    if sim_settings.LATENCY_DISTRIBUTION == "uniform":
+        spread = median * sim_settings.LATENCY_SIGMA
+        return max(0.0, rng.uniform(median - spread, median + spread))
+    return rng.lognormvariate(0, sim_settings.LATENCY_SIGMA) * median
+
+
+def _count_tokens(text: str) -> int:
+    return max(1, len(text) // 2)
+
+
+def _inject_errors(rng: random.Random):
+    roll = rng.random()
+    if roll < sim_settings.ERROR_429_RATE:
+        _stats["errors_429"] += 1
+        raise HTTPException(status_code=429, detail={"code": 429, "status": "RESOURCE_EXHAUSTED", "message": "Simulated quota exhaustion"})
+    if roll < sim_settings.ERROR_429_RATE + sim_settings.ERROR_500_RATE:
+        _stats["errors_500"] += 1
+        raise HTTPException(status_code=500, detail={"code": 500, "status": "INTERNAL", "message": "Simulated internal error"})
+
+
+def _prompt_parts(payload: Dict[str, Any]) -> Tuple[str, bool]:
+    texts: List[str] = []
+    has_image = False
+    for content in payload.get("contents", []):
+        for part in content.get("parts", []):
+            if "text" in part:
+                texts.append(part["text"])
+            if "inlineData" in part or "inline_data" in part:
+                has_image = True
+    return "\n".join(texts), has_image
+
+
+def _resolve_cached_content(payload: Dict[str, Any]) -> Tuple[str, int]:
+    """Text and token count of the cached content a request refers to, if any."""
+
+    name = payload.get("cachedContent")
+    if not name:
+        return "", 0
+    entry = _cached_contents.get(name)
+    if entry is None or entry["expires_at"] < time.time():
+        _cached_contents.pop(name, None)
+        raise HTTPException(status_code=404, detail={"code": 404, "status": "NOT_FOUND", "message": f"{name} not found"})
+    return entry["text"], entry["tokens"]
+
+
+def _parse_ttl(ttl: str) -> float:
+    return float(ttl.rstrip("s"))
+
+
+def _cached_content_resource(name: str) -> Dict[str, Any]:
+    entry = _cached_contents[name]
+    expire_time = datetime.fromtimestamp(entry["expires_at"], tz=timezone.utc)
+    return {
+        "name": name,
+        "model": entry["model"],
+        "displayName": entry["display_name"],
+        "expireTime": expire_time.isoformat().replace("+00:00", "Z"),
+        "usageMetadata": {"totalTokenCount": entry["tokens"]},
+    }
+
+
+def _response_text(prompt: str, has_image: bool) -> str:
+    if has_image:
+        return canned.OCR_TEXT
+    return json.dumps(canned.for_prompt(prompt), ensure_ascii=False, indent=2)
+
+
+def _generate_response(text: str, prompt_tokens: int, output_tokens: int, cached_tokens: int = 0) -> Dict[str, Any]:
+    usage = {
+        "promptTokenCount": prompt_tokens,
+        "candidatesTokenCount": output_tokens,
+        "totalTokenCount": prompt_tokens + output_tokens,
+    }
+    if cached_tokens:
+        usage["cachedContentTokenCount"] = cached_tokens
+    return {
+        "candidates": [{
+            "content": {"parts": [{"text": text}], "role": "model"},
+            "finishReason": "STOP",
+            "index": 0,
+        }],
+        "usageMetadata": usage,
+    }
+
+
+@app.exception_handler(HTTPException)
+async def google_error_handler(request: Request, exc: HTTPException):
+    """Return errors in the Google API error envelope so clients map them to exceptions."""
+    return JSONResponse(status_code=exc.status_code, content={"error": exc.detail})
+
+
+@app.post("/v1beta/models/{model_action}")
+@app.post("/v1/models/{model_action}")
+async def models(model_action: str, request: Request):
+    """Dispatch "<model>:<method>" requests, as used by the Gemini REST API."""
+
+    model, _, method = model_action.partition(":")
+    body = await request.body()
+    payload = json.loads(body or b"{}")
+    prompt, has_image = _prompt_parts(payload)
+    cached_text, cached_tokens = _resolve_cached_content(payload)
+    prompt = cached_text + prompt
+    prompt_tokens = _count_tokens(prompt) + (258 if has_image else 0)
+
+    if method == "countTokens":
+        return {"totalTokens": prompt_tokens}
+    if method not in ("generateContent", "streamGenerateContent"):
+        raise HTTPException(status_code=404, detail={"code": 404, "status": "NOT_FOUND", "message": f"Unknown method {method}"})
+
+    rng = _rng(body)
+    _stats[f"requests:{model}"] += 1
+    await asyncio.sleep(_latency_seconds(rng))
+    _inject_errors(rng)
+
+    text = _response_text(prompt, has_image)
+    output_tokens = _count_tokens(text)
+    generation_seconds = output_tokens / sim_settings.TOKENS_PER_SECOND if sim_settings.TOKENS_PER_SECOND else 0
+
+    if method == "generateContent":
+        await asyncio.sleep(generation_seconds)
+        if cached_tokens:
+            _stats["cached_tokens"] += cached_tokens
+        return _generate_response(text, prompt_tokens, output_tokens, cached_tokens)
+
+    chunk_count = max(1, sim_settings.STREAM_CHUNKS)
+    chunk_size = -(-len(text) // chunk_count)
+    chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+    sse = request.query_params.get("alt") == "sse"
+
+    async def stream():
+        if not sse:
+            yield "["
+        for i, chunk in enumerate(chunks):
+            await asyncio.sleep(generation_seconds / len(chunks))
+            data = json.dumps(_generate_response(chunk, prompt_tokens, _count_tokens(chunk), cached_tokens), ensure_ascii=False)
+            if sse:
+                yield f"data: {data}\r\n\r\n"
+            else:
+                yield ("," if i else "") + data
+        if not sse:
+            yield "]"
+
+    return StreamingResponse(stream(), media_type="text/event-stream" if sse else "application/json")
+
+
+@app.post("/v1beta/cachedContents")
+async def create_cached_content(request: Request):
+    """Store a static prompt prefix for later generateContent calls."""
+
+    payload = await request.json()
+    text, _ = _prompt_parts(payload)
+    name = f"cachedContents/{uuid.uuid4().hex[:12]}"
+    _cached_contents[name] = {
+        "model": payload.get("model", ""),
+        "display_name": payload.get("displayName", ""),
+        "text": text,
+        "tokens": _count_tokens(text),
+        "expires_at": time.time() + _parse_ttl(payload.get("ttl", "3600s")),
+    }
+    _stats["cache_creates"] += 1
+    return _cached_content_resource(name)
+
+
+@app.get("/v1beta/cachedContents/{cache_id}")
+async def get_cached_content(cache_id: str):
+    name = f"cachedContents/{cache_id}"
+    _resolve_cached_content({"cachedContent": name})
+    return _cached_content_resource(name)
+
+
+@app.patch("/v1beta/cachedContents/{cache_id}")
+async def update_cached_content(cache_id: str, request: Request):
+    """Update the TTL of a cached content (the only mutable field used)."""
+
+    name = f"cachedContents/{cache_id}"
+    _resolve_cached_content({"cachedContent": name})
+    payload = await request.json()
+    if "ttl" in payload:
+        _cached_contents[name]["expires_at"] = time.time() + _parse_ttl(payload["ttl"])
+    _stats["cache_refreshes"] += 1
+    return _cached_content_resource(name)
+
+
+@app.delete("/v1beta/cachedContents/{cache_id}")
+async def delete_cached_content(cache_id: str):
+    _cached_contents.pop(f"cachedContents/{cache_id}", None)
+    return {}
+
+
+@app.post("/v1/images:annotate")
+async def annotate_images(request: Request):
+    """Cloud Vision batch annotate with (document_)text_detection results."""
+
+    body = await request.body()
+    payload = json.loads(body or b"{}")
+    rng = _rng(body)
+    _stats["requests:vision"] += 1
+    await asyncio.sleep(_latency_seconds(rng))
+    _inject_errors(rng)
+
+    text = canned.OCR_TEXT
+    return {
+        "responses": [
+            {
+                "fullTextAnnotation": {"text": text},
+                "textAnnotations": [{"locale": "ja", "description": text}],
+            }
+            for _ in payload.get("requests", [])
+        ]
+    }
+
+
+@app.get("/simulator/stats")
+async def stats():
+    """Request and injected-error counters since start-up."""
+    return dict(_stats)
+
+
+@app.post("/simulator/reset")
+async def reset():
+    """Reset counters and the per-request RNG sequence between benchmark runs."""
+    with _seen_lock:
+        _seen_requests.clear()
+    _stats.clear()
+    _cached_contents.clear()
+    return {"status": "reset"}
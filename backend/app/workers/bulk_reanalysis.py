@@ -0,0 +1,240 @@
+import logging
+import time
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import exists, or_, select
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.redis import get_async_redis, get_redis
+from app.models.user import User  # noqa: F401  (load model before relationships are used)
+from app.models.document import Document
+from app.models.analysis import Analysis, AnalysisStatus
+from app.services.analysis_persistence import persist_analysis_result
+from app.services.document_text import document_text_store
+from app.services.gemini_service import GeminiService
+
+logger = logging.getLogger(__name__)
+
+JOB_KEY = "bulk_reanalysis:{job_id}"
+PAGE_SIZE = 100
+
+
+async def create_job() -> str:
+    """Register a new bulk re-analysis job and return its id (API)."""
+
+    job_id = uuid.uuid4().hex
+    await get_async_redis().hset(JOB_KEY.format(job_id=job_id), mapping={
+        "status": "pending",
+        "last_document_id": 0,
+        "processed": 0,
+        "failed": 0,
+        "model": settings.GEMINI_MODEL,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    })
+    return job_id
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Get the progress of a bulk re-analysis job."""
+
+    return _job(job_id, get_redis().hgetall(JOB_KEY.format(job_id=job_id)))
+
+
+async def get_job_async(job_id: str) -> Optional[Dict[str, Any]]:
+    """Async version of get_job, for the API."""
+
+    return _job(job_id, await get_async_redis().hgetall(JOB_KEY.format(job_id=job_id)))
+
+
+def _job(job_id: str, state: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    if not state:
+        return None
+    return {
+        "job_id": job_id,
+        "status": state["status"],
+        "last_document_id": int(state["last_document_id"]),
+        "processed": int(state["processed"]),
+        "failed": int(state["failed"]),
+        "model": state.get("model"),
+        "created_at": state.get("created_at"),
+    }
+
+
+def _checkpoint(job_id: str, last_document_id: int, processed: int, failed: int):
+    key = JOB_KEY.format(job_id=job_id)
+    pipe = get_redis().pipeline()
+    pipe.hset(key, mapping={"status": "running", "last_document_id": last_document_id})
+    pipe.hincrby(key, "processed", processed)
+    pipe.hincrby(key, "failed", failed)
+    pipe.execute()
+
+
+def _job_started_at(job: Dict[str, Any]) -> datetime:
+    """Job creation time as naive UTC, like the created_at columns."""
+
+    started = datetime.fromisoformat(job["created_at"])
+    if started.tzinfo is not None:
+        started = started.astimezone(timezone.utc).replace(tzinfo=None)
+    return started
+
+
+def _stream_documents(db, after_id: int, started: datetime) -> Iterator[Any]:
+    """Stream documents with text in id order, one keyset page at a time.
+
+    Documents already analyzed since the job started are skipped, so a batch
+    stored but not checkpointed before a crash is not analyzed twice. Text
+    offloaded to S3 is fetched as its row is reached.
+    """
+
+    analyzed = exists(select(Analysis.id).where(
+        Analysis.document_id == Document.id,
+        Analysis.created_at >= started
+    ))
+
+    while True:
+        rows = db.query(
+            Document.id,
+            Document.user_id,
+            Document.raw_text,
+            Document.raw_text_s3_key,
+            Document.document_type
+        ).filter(
+            Document.id > after_id,
+            or_(Document.raw_text.isnot(None), Document.raw_text_s3_key.isnot(None)),
+            ~analyzed
+        ).order_by(Document.id).limit(PAGE_SIZE).all()
+
+        if not rows:
+            return
+        for row in rows:
+            if row.raw_text_s3_key:
+                row = SimpleNamespace(**{**row._asdict(), "raw_text": document_text_store.load_sync(row)})
+            yield row
+        after_id = rows[-1].id
+
+
+def _pack(rows: Iterable[Any]) -> Iterator[List[Any]]:
+    """Group short documents into batches while keeping id order for checkpoints."""
+
+    batch, size = [], 0
+    for row in rows:
+        text_len = len(row.raw_text)
+        if batch and (
+            text_len > settings.BULK_PACK_MAX_DOC_CHARS
+            or len(batch) >= settings.BULK_PACK_MAX_DOCS
+            or size + text_len > settings.BULK_PACK_MAX_CHARS
+        ):
+            yield batch
+            batch, size = [], 0
+        batch.append(row)
+        size += text_len
+        if text_len > settings.BULK_PACK_MAX_DOC_CHARS:
+            # Long documents are analyzed on their own
+            yield batch
+            batch, size = [], 0
+    if batch:
+        yield batch
+
+
+def _analyze_batch(gemini_service: GeminiService, batch: List[Any]) -> Dict[int, Tuple[Dict[str, Any], str]]:
+    """Analyze a batch in one request, falling back to single requests for misses.
+
+    Returns the analysis data and the model that produced it, by document id.
+    """
+
+    results = {}
+    if len(batch) > 1:
+        try:
+            packed, model_name = gemini_service.analyze_resumes_batch_sync([
+                {"id": row.id, "text": row.raw_text, "document_type": row.document_type.value}
+                for row in batch
+            ])
+            results = {document_id: (data, model_name) for document_id, data in packed.items()}
+        except Exception as e:
+            logger.warning(f"Packed analysis of {len(batch)} documents failed, analyzing individually: {str(e)}")
+
+    for row in batch:
+        if row.id in results:
+            continue
+        try:
+            result = gemini_service.analyze_resume_sync(
+                row.raw_text,
+                row.document_type.value
+            )
+            results[row.id] = (result["data"], result["model_name"])
+        except Exception as e:
+            logger.error(f"Re-analysis of document {row.id} failed: {str(e)}")
+
+    return results
+
+
+def run_bulk_reanalysis(job_id: str) -> bool:
+    """Run a bulk re-analysis job until it finishes or its time budget is used up.
+
+    Returns True when every document has been processed.
+    """
+
+    job = get_job(job_id)
+    if job is None:
+        raise ValueError(f"Bulk re-analysis job {job_id} not found")
+
+    deadline = time.monotonic() + settings.BULK_REANALYSIS_TIME_BUDGET_SECONDS
+    seconds_per_document = 60 / settings.BULK_REANALYSIS_DOCS_PER_MINUTE
+    throttle_start = time.monotonic()
+    documents_sent = 0
+    started = _job_started_at(job)
+
+    db = SessionLocal()
+    gemini_service = GeminiService()
+
+    try:
+        for batch in _pack(_stream_documents(db, job["last_document_id"], started)):
+            if time.monotonic() > deadline:
+                return False
+
+            # Throughput throttle on top of the shared Gemini rate limiter
+            wait = throttle_start + documents_sent * seconds_per_document - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            documents_sent += len(batch)
+
+            start_time = datetime.now(timezone.utc)
+            results = _analyze_batch(gemini_service, batch)
+            processing_time = (datetime.now(timezone.utc) - start_time).total_seconds() / len(batch)
+
+            stored = 0
+            for row in batch:
+                if row.id not in results:
+                    continue
+                data, model_name = results[row.id]
+                try:
+                    # Savepoint so one malformed result does not lose the whole batch
+                    with db.begin_nested():
+                        analysis = Analysis(
+                            user_id=row.user_id,
+                            document_id=row.id,
+                            status=AnalysisStatus.PROCESSING,
+                            model_name=model_name
+                        )
+                        db.add(analysis)
+                        db.flush()
+                        persist_analysis_result(db, analysis.id, data, processing_time)
+                    stored += 1
+                except Exception as e:
+                    logger.error(f"Storing re-analysis of document {row.id} failed: {str(e)}")
+
+            db.commit()
+            _checkpoint(job_id, batch[-1].id, stored, len(batch) - stored)
+
+        get_redis().hset(JOB_KEY.format(job_id=job_id), "status", "completed")
+        logger.info(f"Bulk re-analysis job {job_id} completed")
+        return True
+
+    except Exception:
+        db.rollback()
+        raise
+
+    finally:
+        db.close()
@@ -1,6 +1,53 @@
 from celery import Celery
+from kombu import Queue
 from app.core.config import settings
 
+# Redis priorities: lower runs first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_DEFAULT = 5
+PRIORITY_BACKFILL = 9
+
+# (hard, soft) time limits in seconds per queue
+QUEUE_TIME_LIMITS = {
+    "extract": (5 * 60, 4 * 60),
+    "ocr": (5 * 60, 4 * 60),  # One page per task
+    settings.CELERY_ANALYSIS_QUEUE: (15 * 60, 12 * 60),
+    "bulk": (30 * 60, 25 * 60),
+    "celery": (30 * 60, 25 * 60),
+}
+
+TASK_QUEUES = {
+    "app.workers.tasks.extract_document_task": "extract",
+    "app.workers.tasks.ocr_page_task": "ocr",
+    "app.workers.tasks.assemble_ocr_task": "extract",
+    "app.workers.tasks.process_analysis_task": settings.CELERY_ANALYSIS_QUEUE,
+    "app.workers.tasks.bulk_reanalysis_task": "bulk",
+    "app.workers.tasks.prefetch_career_catalog_task": "bulk",
+}
+
+
+def _make_io_cooperative():
+    """Make psycopg2 and gRPC yield to other greenlets under the gevent pool.
+    
+    Celery monkey-patches the standard library before loading the app when
+    started with -P gevent; the C-level drivers need their own hooks.
+    """
+    try:
+        from gevent import monkey
+    except ImportError:
+        return
+    if not monkey.is_module_patched("socket"):
+        return
+    
+    from psycogreen.gevent import patch_psycopg
+    import grpc.experimental.gevent as grpc_gevent
+    
+    patch_psycopg()
+    grpc_gevent.init_gevent()
+
+
+_make_io_cooperative()
+
 celery_app = Celery(
     "career_assistant",
     broker=settings.CELERY_BROKER_URL,
@@ -19,5 +66,35 @@ celery_app.conf.update(
     task_time_limit=30 * 60,  # 30 minutes
     task_soft_time_limit=25 * 60,  # 25 minutes
     worker_prefetch_multiplier=1,
-    worker_max_tasks_per_child=1000,
-)
\ No newline at end of file
+    # Recycle prefork children on memory, not task count: PDF and image
+    # libraries fragment the heap at very different rates per document
+    worker_max_memory_per_child=settings.CELERY_WORKER_MAX_MEMORY_MB * 1024,  # KiB
+    worker_max_tasks_per_child=settings.CELERY_WORKER_MAX_TASKS_PER_CHILD or None,
+    # CPU-bound extract/ocr run on prefork workers, network-bound analyze on a
+    # gevent worker and bulk backfills on their own; see scripts/start_worker.sh
+    task_queues=[Queue(name) for name in QUEUE_TIME_LIMITS],
+    task_default_queue="celery",
+    task_routes={task: {"queue": queue} for task, queue in TASK_QUEUES.items()},
+    task_annotations={
+        task: {"time_limit": QUEUE_TIME_LIMITS[queue][0], "soft_time_limit": QUEUE_TIME_LIMITS[queue][1]}
+        for task, queue in TASK_QUEUES.items()
+    },
+    task_default_priority=PRIORITY_DEFAULT,
+    broker_transport_options={
+        "priority_steps": list(range(10)),
+        "sep": ":",
+        "queue_order_strategy": "priority",
+    },
+)
+
+# Task metrics and the worker's /metrics server (signal handlers)
+import app.workers.monitoring  # noqa: E402,F401
+
+if settings.CAREER_CATALOG_PREFETCH_ENABLED:
+    # Requires a beat process: celery -A app.workers.celery_app beat
+    celery_app.conf.beat_schedule = {
+        "prefetch-career-catalog": {
+            "task": "app.workers.tasks.prefetch_career_catalog_task",
+            "schedule": settings.CAREER_CATALOG_PREFETCH_INTERVAL_SECONDS,
+        },
+    }
@@ -0,0 +1,86 @@
+import logging
+import os
+import resource
+import time
+from typing import Dict, Tuple
+from celery.signals import before_task_publish, task_postrun, task_prerun, worker_process_shutdown, worker_ready
+from prometheus_client import start_http_server
+from app.core.config import settings
+from app.core.metrics import (
+    CELERY_TASK_DURATION,
+    CELERY_TASK_QUEUE_WAIT,
+    CELERY_TASK_RSS_GROWTH,
+    CELERY_WORKER_RSS,
+    MULTIPROCESS,
+    mark_process_dead,
+    metrics_registry,
+)
+
+logger = logging.getLogger(__name__)
+
+# Start time and resident memory of running tasks in this process, by task id
+_task_started: Dict[str, Tuple[float, int]] = {}
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def process_rss_bytes() -> int:
+    """Current resident memory of this process (peak RSS where /proc is unavailable)."""
+
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        # ru_maxrss is in KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+@before_task_publish.connect
+def _stamp_publish_time(headers=None, **kwargs):
+    if headers is not None:
+        headers.setdefault("published_at", time.time())
+
+
+@task_prerun.connect
+def _task_started_handler(task_id=None, task=None, **kwargs):
+    _task_started[task_id] = (time.monotonic(), process_rss_bytes())
+    published_at = getattr(task.request, "published_at", None) or (task.request.headers or {}).get("published_at")
+    if published_at and not task.request.retries:
+        CELERY_TASK_QUEUE_WAIT.labels(task=task.name).observe(max(0.0, time.time() - float(published_at)))
+
+
+@task_postrun.connect
+def _task_finished_handler(task_id=None, task=None, state=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    if started is None:
+        return
+    start, rss_before = started
+    CELERY_TASK_DURATION.labels(task=task.name, state=state or "UNKNOWN").observe(time.monotonic() - start)
+    
+    # Prefork children are replaced by Celery once they pass
+    # worker_max_memory_per_child; the gauge shows how close each one is
+    rss = process_rss_bytes()
+    CELERY_WORKER_RSS.set(rss)
+    CELERY_TASK_RSS_GROWTH.labels(task=task.name).observe(max(0, rss - rss_before))
+
+
+@worker_process_shutdown.connect
+def _worker_process_shutdown_handler(**kwargs):
+    mark_process_dead(os.getpid())
+
+
+@worker_ready.connect
+def _start_metrics_server(sender=None, **kwargs):
+    """Expose the worker's metrics from its main process.
+
+    Prefork children only report through PROMETHEUS_MULTIPROC_DIR; gevent and
+    solo workers run tasks in the main process and work either way.
+    """
+
+    if not settings.CELERY_METRICS_PORT:
+        return
+    pool = getattr(sender, "pool", None)
+    if not MULTIPROCESS and type(pool).__module__ == "celery.concurrency.prefork":
+        logger.warning("PROMETHEUS_MULTIPROC_DIR is not set; task metrics of prefork children are not exported")
+    start_http_server(settings.CELERY_METRICS_PORT, registry=metrics_registry())
+    logger.info(f"Serving worker metrics on port {settings.CELERY_METRICS_PORT}")
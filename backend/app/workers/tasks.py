@@ -1,14 +1,26 @@
+import asyncio
 import logging
-from datetime import datetime
-from celery import Task
-from app.workers.celery_app import celery_app
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from celery import Task, chord, group
+from sqlalchemy import update
+from sqlalchemy.orm import undefer
+from app.workers.celery_app import celery_app, PRIORITY_BACKFILL, PRIORITY_INTERACTIVE
+from app.core.config import settings
 from app.core.database import SessionLocal
 # Import all models to ensure they're loaded before using relationships
 from app.models.user import User  # Import User model first
-from app.models.document import Document
-from app.models.analysis import Analysis, AnalysisStatus
-from app.models.career_recommendation import CareerRecommendation, CareerType
-from app.services.gemini_service import GeminiService
+from app.models.document import Document, DocumentStatus
+from app.models.analysis import Analysis, AnalysisStatus, PipelineStage
+from app.models.career_recommendation import CareerRecommendation
+from app.services.analysis_events import publish_status
+from app.services.analysis_persistence import persist_analysis_result, validate_analysis_data
+from app.services.analysis_singleflight import analysis_single_flight
+from app.services.document_text import document_text_store
+from app.services.gemini_service import GeminiService, gemini_service
+from app.services.model_router import model_router
+from app.services.near_duplicate import near_duplicate_index
 
 logger = logging.getLogger(__name__)
 
@@ -25,88 +37,432 @@ class CallbackTask(Task):
         logger.error(f"Task {task_id} failed: {str(exc)}")
 
 
+def find_reusable_analysis(db, document: Document) -> Optional[Analysis]:
+    """Find a recent completed analysis of a near-duplicate document of the same user.
+    
+    Only reads the index; the document was hashed and indexed at extraction.
+    """
+    
+    match = near_duplicate_index.find_similar(document.id, document.user_id)
+    if not match:
+        return None
+    
+    similar_document_id, similarity = match
+    source = db.query(Analysis).filter(
+        Analysis.document_id == similar_document_id,
+        Analysis.user_id == document.user_id,
+        Analysis.status == AnalysisStatus.COMPLETED,
+        Analysis.gemini_response.isnot(None),
+        Analysis.created_at >= datetime.utcnow() - timedelta(days=settings.NEAR_DUP_MAX_AGE_DAYS)
+    ).order_by(Analysis.created_at.desc()).first()
+    
+    if source:
+        logger.info(
+            f"Document {document.id} is a near-duplicate of document {similar_document_id} "
+            f"(similarity {similarity:.2f}), reusing analysis {source.id}"
+        )
+    return source
+
+
+def _complete_extraction(db, document: Document, analysis_id: int, text: str, priority: int):
+    """Store extracted text and queue the analysis that waits for it."""
+    
+    from app.services.document_processor import document_processor
+    
+    document_text_store.assign(document, text)
+    document.document_type = document_processor.detect_document_type(text, document.filename)
+    if document.document_type == "resume":
+        document.structured_data = document_processor.parse_japanese_resume(text)
+    elif document.document_type == "cv":
+        document.structured_data = document_processor.parse_japanese_cv(text)
+    document.status = DocumentStatus.PROCESSED
+    db.commit()
+    
+    # MinHash is CPU-bound: hash here on the prefork extract queue, so the
+    # gevent analyze workers only look the signature up
+    if settings.NEAR_DUP_ENABLED:
+        near_duplicate_index.add(document.id, document.user_id, text)
+    
+    logger.info(f"Extracted {len(text)} characters from document {document.id}")
+    process_analysis_task.apply_async((analysis_id,), priority=priority)
+
+
+def _fail_extraction(db, document: Document, analysis_id: int, message: str):
+    """Mark a document and its pending analysis as failed."""
+    
+    document.status = DocumentStatus.FAILED
+    document.error_message = message
+    analysis = db.query(Analysis).filter(Analysis.id == analysis_id).first()
+    if analysis:
+        analysis.status = AnalysisStatus.FAILED
+        analysis.error_message = message
+    db.commit()
+    publish_status(analysis_id, AnalysisStatus.FAILED, message)
+
+
 @celery_app.task(base=CallbackTask, bind=True, max_retries=3)
-def process_analysis_task(self, analysis_id: int):
-    """Process career analysis asynchronously."""
+def extract_document_task(self, document_id: int, analysis_id: int, priority: int = PRIORITY_INTERACTIVE):
+    """Extract the text layer of an uploaded document (CPU-bound, extract queue).
+    
+    PDFs without a text layer are fanned out to per-page OCR tasks.
+    """
+    
+    from app.services.document_processor import document_processor
+    from app.services.s3_service import s3_service
     
     db = SessionLocal()
     
     try:
-        # Get analysis
-        analysis = db.query(Analysis).filter(Analysis.id == analysis_id).first()
-        if not analysis:
-            raise ValueError(f"Analysis {analysis_id} not found")
+        document = db.query(Document).filter(Document.id == document_id).first()
+        if not document:
+            raise ValueError(f"Document {document_id} not found")
         
-        # Update status
-        analysis.status = AnalysisStatus.PROCESSING
+        document.status = DocumentStatus.PROCESSING
         db.commit()
         
-        start_time = datetime.utcnow()
+        contents = asyncio.run(s3_service.download_file(document.s3_key))
+        try:
+            text = asyncio.run(document_processor.extract_text(contents, document.file_type, allow_ocr=False))
+        except ValueError as e:
+            # Corrupted, encrypted or unsupported file; retrying will not help
+            _fail_extraction(db, document, analysis_id, str(e))
+            return {"status": "failed", "document_id": document_id}
+        
+        if not text.strip():
+            return _start_ocr(db, document, analysis_id, contents, priority)
+        
+        _complete_extraction(db, document, analysis_id, text.strip(), priority)
+        return {"status": "success", "document_id": document_id}
+        
+    except Exception as e:
+        logger.error(f"Extraction of document {document_id} failed: {str(e)}")
+        if self.request.retries >= self.max_retries and 'document' in locals() and document:
+            _fail_extraction(db, document, analysis_id, str(e))
+            raise
+        raise self.retry(exc=e, countdown=30 * (self.request.retries + 1))
         
-        # Get document
-        document = db.query(Document).filter(Document.id == analysis.document_id).first()
+    finally:
+        db.close()
+
+
+def _start_ocr(db, document: Document, analysis_id: int, contents: bytes, priority: int) -> dict:
+    """Fan a scanned PDF out to one OCR task per page, joined by a chord callback."""
+    
+    from app.services.ocr_service import ocr_service
+    
+    pages = ocr_service.page_count(contents)
+    if not pages:
+        _fail_extraction(db, document, analysis_id, "PDFにページがありません。")
+        return {"status": "failed", "document_id": document.id}
+    
+    header = group(
+        ocr_page_task.s(document.s3_key, page_number).set(priority=priority)
+        for page_number in range(pages)
+    )
+    callback = assemble_ocr_task.s(document.id, analysis_id, priority).set(priority=priority)
+    # Called if a page task dies without returning (e.g. killed by its time limit)
+    callback.link_error(ocr_failed_task.s(document.id, analysis_id))
+    chord(header)(callback)
+    
+    logger.info(f"Document {document.id} sent to OCR as {pages} page tasks")
+    return {"status": "ocr", "document_id": document.id, "pages": pages}
+
+
+# PDFs recently downloaded by this OCR process, by S3 key. Pages of a document
+# are queued together, so each process downloads it once rather than once per
+# page; upload keys are unique, so a cached file never goes stale.
+_ocr_sources: "OrderedDict[str, bytes]" = OrderedDict()
+_OCR_SOURCES_MAX = 2
+
+
+def _ocr_source(s3_key: str) -> bytes:
+    from app.services.s3_service import s3_service
+    
+    contents = _ocr_sources.get(s3_key)
+    if contents is None:
+        contents = asyncio.run(s3_service.download_file(s3_key))
+        _ocr_sources[s3_key] = contents
+        while len(_ocr_sources) > _OCR_SOURCES_MAX:
+            _ocr_sources.popitem(last=False)
+    else:
+        _ocr_sources.move_to_end(s3_key)
+    return contents
+
+
+@celery_app.task(base=CallbackTask, bind=True, max_retries=2)
+def ocr_page_task(self, s3_key: str, page_number: int) -> dict:
+    """OCR one page of a scanned PDF (ocr queue).
+    
+    A page that still fails after its retries contributes no text rather than
+    failing the chord, so one bad page does not lose the rest of the document.
+    """
+    
+    from app.services.ocr_service import ocr_service
+    
+    try:
+        contents = _ocr_source(s3_key)
+        text = asyncio.run(ocr_service.extract_text_from_page(contents, page_number))
+    except Exception as e:
+        logger.error(f"OCR of page {page_number + 1} of {s3_key} failed: {str(e)}")
+        if self.request.retries >= self.max_retries:
+            return {"page": page_number, "text": ""}
+        raise self.retry(exc=e, countdown=30 * (self.request.retries + 1))
+    
+    return {"page": page_number, "text": text}
+
+
+@celery_app.task(base=CallbackTask, bind=True, max_retries=3)
+def assemble_ocr_task(self, pages: list, document_id: int, analysis_id: int, priority: int = PRIORITY_INTERACTIVE):
+    """Chord callback: join page texts in page order and queue the analysis (extract queue)."""
+    
+    db = SessionLocal()
+    
+    try:
+        document = db.query(Document).filter(Document.id == document_id).first()
         if not document:
-            raise ValueError(f"Document {analysis.document_id} not found")
+            raise ValueError(f"Document {document_id} not found")
         
+        # Results arrive in completion order with some result backends
+        texts = [page["text"].strip() for page in sorted(pages, key=lambda page: page["page"])]
+        text = "\n\n".join(page_text for page_text in texts if page_text)
+        logger.info(f"OCR extracted {len(text)} characters from {len(pages)} pages of document {document_id}")
+        
+        if not text:
+            _fail_extraction(
+                db,
+                document,
+                analysis_id,
+                "PDFからテキストを抽出できませんでした。スキャンされたPDFの可能性があり、OCRも失敗しました。"
+            )
+            return {"status": "failed", "document_id": document_id}
+        
+        _complete_extraction(db, document, analysis_id, text, priority)
+        return {"status": "success", "document_id": document_id}
+        
+    except Exception as e:
+        logger.error(f"Assembling OCR text of document {document_id} failed: {str(e)}")
+        if self.request.retries >= self.max_retries and 'document' in locals() and document:
+            _fail_extraction(db, document, analysis_id, str(e))
+            raise
+        raise self.retry(exc=e, countdown=30 * (self.request.retries + 1))
+        
+    finally:
+        db.close()
+
+
+@celery_app.task(base=CallbackTask)
+def ocr_failed_task(request, exc, traceback, document_id: int, analysis_id: int):
+    """Error callback of the OCR chord: fail the document instead of leaving it processing."""
+    
+    db = SessionLocal()
+    
+    try:
+        document = db.query(Document).filter(Document.id == document_id).first()
+        if document:
+            _fail_extraction(db, document, analysis_id, f"OCR failed: {str(exc)}")
+    finally:
+        db.close()
+
+
+def _generate_stage(db, analysis: Analysis, document: Document, raw_text: str) -> str:
+    """Call Gemini and checkpoint its raw output before anything parses it."""
+    
+    document_type = document.document_type.value
+    choice = model_router.choose(len(raw_text), document_type)
+    logger.info(f"Analysis {analysis.id} routed to {choice.model_name}: {choice.reason}")
+    analysis.model_name = choice.model_name
+    
+    # Publish PROCESSING and return the DB connection to the pool while
+    # waiting on Gemini, so in-flight analyses share a small pool
+    db.commit()
+    publish_status(analysis.id, AnalysisStatus.PROCESSING)
+    
+    def generate() -> Tuple[str, str]:
         # Call Gemini API (synchronous version for Celery)
         # Create a new instance for each task to avoid connection reuse issues
-        gemini_service = GeminiService()
-        result = gemini_service.analyze_resume_sync(
-            document.raw_text,
-            document.document_type.value
+        result = GeminiService().analyze_resume_sync(
+            raw_text,
+            document_type,
+            choice.model_name
         )
+        # Never hand unusable output to analyses waiting on this one
+        validate_analysis_data(gemini_service.parse_analysis(result["raw_response"]))
+        # The fallback model serves the call while the routed model's circuit is open
+        return result["raw_response"], result["model_name"]
+    
+    if settings.ANALYSIS_SINGLE_FLIGHT_ENABLED:
+        # Concurrent analyses of the same content attach to one Gemini call
+        flight_key = analysis_single_flight.key(raw_text, document_type, choice.model_name)
+        raw_output, model_name = analysis_single_flight.run(flight_key, generate)
+    else:
+        raw_output, model_name = generate()
+    
+    analysis.model_name = model_name
+    analysis.raw_model_output = raw_output
+    analysis.pipeline_stage = PipelineStage.GENERATE.value
+    db.commit()
+    return raw_output
+
+
+def _parse_stage(db, analysis: Analysis, raw_output: str) -> dict:
+    """Parse and validate checkpointed model output.
+    
+    Output that cannot be used is discarded, so the retry generates it again
+    instead of failing on the same text.
+    """
+    
+    try:
+        data = gemini_service.parse_analysis(raw_output)
+        validate_analysis_data(data)
+        return data
+    except ValueError:
+        analysis.raw_model_output = None
+        analysis.pipeline_stage = None
+        db.commit()
+        raise
+
+
+@celery_app.task(base=CallbackTask, bind=True, max_retries=3)
+def process_analysis_task(self, analysis_id: int):
+    """Process career analysis asynchronously.
+    
+    Runs fetch, generate, parse and persist. The raw model output is saved
+    after generate, so a retry after a parse or database error resumes from
+    it instead of calling Gemini again.
+    """
+    
+    db = SessionLocal()
+    
+    try:
+        # Fetch
+        analysis = db.query(Analysis).filter(Analysis.id == analysis_id).first()
+        if not analysis:
+            raise ValueError(f"Analysis {analysis_id} not found")
         
-        # Update analysis with results
-        analysis.status = AnalysisStatus.COMPLETED
-        analysis.processing_time = (datetime.utcnow() - start_time).total_seconds()
-        analysis.gemini_response = result["data"]
-        analysis.career_paths = result["data"].get("career_paths", [])
-        analysis.skill_gaps = []
-        
-        # Extract all skill gaps
-        all_skill_gaps = set()
-        
-        # Create career recommendations
-        for path in result["data"].get("career_paths", []):
-            # Collect skill gaps
-            path_skill_gaps = path.get("skill_gaps", [])
-            all_skill_gaps.update(path_skill_gaps)
-            
-            recommendation = CareerRecommendation(
-                analysis_id=analysis.id,
-                career_type=CareerType(path["type"]),
-                title=path["title"],
-                description=path["description"],
-                required_skills=path.get("required_skills", []),
-                skill_match_percentage=path.get("skill_match_percentage", 0),
-                skill_gaps=path_skill_gaps,
-                salary_range_min=path.get("salary_range", {}).get("min"),
-                salary_range_max=path.get("salary_range", {}).get("max"),
-                market_demand=path.get("market_demand"),
-                confidence_score=path.get("confidence_score", 0.5),
-                next_steps=path.get("next_steps", [])
-            )
-            db.add(recommendation)
+        if analysis.pipeline_stage == PipelineStage.PERSIST.value:
+            logger.info(f"Analysis {analysis_id} already stored, skipping duplicate delivery")
+            return {"status": "success", "analysis_id": analysis_id}
+        
+        # Written with the routing decision, or with the result on reuse
+        analysis.status = AnalysisStatus.PROCESSING
+        
+        start_time = datetime.utcnow()
         
-        # Update overall skill gaps
-        analysis.skill_gaps = list(all_skill_gaps)
+        if analysis.pipeline_stage == PipelineStage.GENERATE.value:
+            logger.info(f"Analysis {analysis_id} resuming from saved model output")
+            data = _parse_stage(db, analysis, analysis.raw_model_output)
+        else:
+            document = db.query(Document).options(
+                undefer(Document.raw_text)
+            ).filter(Document.id == analysis.document_id).first()
+            if not document:
+                raise ValueError(f"Document {analysis.document_id} not found")
+            
+            # Reuse the analysis of a near-identical earlier upload from the same user
+            source = find_reusable_analysis(db, document) if settings.NEAR_DUP_ENABLED else None
+            
+            if source:
+                analysis.reused_from_analysis_id = source.id
+                analysis.model_name = source.model_name
+                data = source.gemini_response
+            else:
+                raw_text = document_text_store.load_sync(document)
+                raw_output = _generate_stage(db, analysis, document, raw_text)
+                data = _parse_stage(db, analysis, raw_output)
         
+        # Persist: result and recommendations in one transaction
+        persist_analysis_result(
+            db,
+            analysis_id,
+            data,
+            (datetime.utcnow() - start_time).total_seconds()
+        )
         db.commit()
+        publish_status(analysis_id, AnalysisStatus.COMPLETED)
         
         logger.info(f"Analysis {analysis_id} completed successfully")
         return {"status": "success", "analysis_id": analysis_id}
         
     except Exception as e:
         logger.error(f"Analysis {analysis_id} failed: {str(e)}")
+        db.rollback()
         
-        # Update analysis status
-        if 'analysis' in locals():
-            analysis.status = AnalysisStatus.FAILED
-            analysis.error_message = str(e)
+        # Only the last attempt marks the analysis failed; earlier ones stay processing
+        if self.request.retries >= self.max_retries:
+            db.execute(
+                update(Analysis)
+                .where(Analysis.id == analysis_id)
+                .values(status=AnalysisStatus.FAILED, error_message=str(e))
+            )
             db.commit()
+            publish_status(analysis_id, AnalysisStatus.FAILED, str(e))
         
         # Retry the task
         raise self.retry(exc=e, countdown=60 * (self.request.retries + 1))
         
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+@celery_app.task(base=CallbackTask, bind=True, max_retries=3)
+def bulk_reanalysis_task(self, job_id: str):
+    """Re-analyze stored documents in packed batches, resuming from the job checkpoint."""
+    
+    from app.workers.bulk_reanalysis import run_bulk_reanalysis
+    
+    try:
+        finished = run_bulk_reanalysis(job_id)
+    except Exception as e:
+        logger.error(f"Bulk re-analysis job {job_id} failed: {str(e)}")
+        raise self.retry(exc=e, countdown=60 * (self.request.retries + 1))
+    
+    if not finished:
+        # Time budget used up; continue from the checkpoint in a fresh task
+        bulk_reanalysis_task.apply_async((job_id,), priority=PRIORITY_BACKFILL)
+    
+    return {"status": "finished" if finished else "continued", "job_id": job_id}
+
+
+@celery_app.task(base=CallbackTask)
+def prefetch_career_catalog_task():
+    """Generate catalog entries for the most frequently recommended career paths."""
+    
+    from sqlalchemy import func
+    from app.services.career_catalog import career_catalog
+    
+    db = SessionLocal()
+    catalog_gemini = GeminiService()
+    generated = 0
+    
+    try:
+        top_paths = db.query(
+            CareerRecommendation.career_type,
+            CareerRecommendation.title
+        ).group_by(
+            CareerRecommendation.career_type,
+            CareerRecommendation.title
+        ).order_by(
+            func.count(CareerRecommendation.id).desc()
+        ).limit(settings.CAREER_CATALOG_PREFETCH_TOP_N).all()
+        
+        for career_type, title in top_paths:
+            sample = db.query(CareerRecommendation.required_skills).filter(
+                CareerRecommendation.career_type == career_type,
+                CareerRecommendation.title == title
+            ).order_by(CareerRecommendation.id.desc()).first()
+            
+            try:
+                generated += career_catalog.prefetch(
+                    career_type,
+                    title,
+                    sample.required_skills or [],
+                    catalog_gemini
+                )
+            except Exception as e:
+                logger.error(f"Catalog prefetch for {title} failed: {str(e)}")
+        
+        logger.info(f"Career catalog prefetch generated {generated} entries")
+        return {"status": "success", "generated": generated}
+        
+    finally:
+        db.close()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Benchmark single-prompt vs fan-out career analysis wall-clock time"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.core.config import settings
+from app.services.gemini_service import GeminiService
+
+
+async def run_mode(service, mode, resume_text, document_type, runs):
+    """Run one analysis mode several times and return wall-clock timings"""
+
+    settings.GEMINI_ANALYSIS_MODE = mode
+    timings = []
+
+    for i in range(runs):
+        start = time.perf_counter()
+        result = await service.analyze_resume(resume_text, document_type)
+        elapsed = time.perf_counter() - start
+        timings.append(elapsed)
+        print(f"  [{mode}] run {i+1}: {elapsed:.2f}s, {len(result['data'].get('career_paths', []))} career paths")
+
+    return timings
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("resume", help="Path to a plain-text resume/CV")
+    parser.add_argument("--document-type", default="cv", choices=["resume", "cv"])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    resume_text = Path(args.resume).read_text(encoding="utf-8")
+    service = GeminiService()
+
+    print(f"\n=== Benchmarking {args.resume} ({len(resume_text)} chars, {args.runs} runs) ===")
+
+    results = {}
+    for mode in ["single", "fanout"]:
+        results[mode] = await run_mode(service, mode, resume_text, args.document_type, args.runs)
+
+    print("\n--- Summary ---")
+    for mode, timings in results.items():
+        print(
+            f"{mode:>7}: median {statistics.median(timings):.2f}s, "
+            f"min {min(timings):.2f}s, max {max(timings):.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Load test read endpoints of a single API worker at increasing concurrency
+
+Run the API as one process, so event-loop blocking shows up directly, e.g.
+
+    uvicorn app.main:app --workers 1 --port 8000
+
+then run this script against it. To compare the sync and async database
+layers, run it once per git revision with the same data and flags; with
+blocking queries, throughput stops growing after a few concurrent clients
+and latency grows linearly instead.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+DEFAULT_PATHS = ["/api/v1/users/me", "/api/v1/documents/", "/api/v1/analysis/", "/api/v1/career-paths/"]
+
+
+async def login(client, email, password):
+    response = await client.post("/api/v1/auth/login", data={"username": email, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def run_level(client, token, paths, concurrency, duration):
+    """Keep `concurrency` requests in flight for `duration` seconds; return latencies and errors"""
+
+    headers = {"Authorization": f"Bearer {token}"}
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def client_loop(index):
+        nonlocal errors
+        i = index
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = await client.get(paths[i % len(paths)], headers=headers)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+            i += 1
+
+    await asyncio.gather(*(client_loop(i) for i in range(concurrency)))
+    return latencies, errors
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--concurrency", default="1,4,16,64,128", help="Comma-separated levels")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds per level")
+    parser.add_argument("--path", action="append", dest="paths", help="Endpoint to request (repeatable)")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        token = await login(client, args.email, args.password)
+        paths = args.paths or DEFAULT_PATHS
+
+        print(f"\n{'clients':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>6}")
+        for concurrency in levels:
+            latencies, errors = await run_level(client, token, paths, concurrency, args.duration)
+            latencies.sort()
+            quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+            print(
+                f"{concurrency:7d} {len(latencies) / args.duration:8.1f} "
+                f"{quantiles[49] * 1000:8.1f} {quantiles[94] * 1000:8.1f} {quantiles[98] * 1000:8.1f} {errors:6d}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""Soak test extraction and OCR workers and report memory growth per worker process
+
+Feeds synthetic PDFs through the real upload pipeline (extract_document_task,
+and per-page OCR for scanned ones) and samples the resident memory of every
+worker process over time. A prefork child that is recycled shows up as a
+process that disappears and is replaced by a new PID.
+
+Start the CPU worker profile under test, pointed at the API simulator
+(GOOGLE_API_SIMULATOR_URL) so OCR and the follow-up analyses do not call
+Google, e.g.
+
+    CELERY_WORKER_MAX_MEMORY_MB=300 scripts/start_worker.sh cpu
+    scripts/start_worker.sh io
+
+then run this script with an existing user id. Documents and analyses it
+creates are left in place; use a throwaway database.
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import fitz  # PyMuPDF
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.core.database import SessionLocal
+from app.models.user import User  # noqa: F401  (registers the relationship target)
+from app.models.document import Document, DocumentStatus, DocumentType
+from app.models.analysis import Analysis, AnalysisStatus
+from app.services.s3_service import s3_service
+from app.workers.celery_app import PRIORITY_BACKFILL
+from app.workers.tasks import extract_document_task
+
+LINES = [
+    "2018年4月 株式会社サンプル 入社 バックエンドエンジニアとして決済基盤を担当",
+    "Python / Go / PostgreSQL / Kubernetes を用いたマイクロサービスの設計と運用",
+    "2021年 テックリードとして5名のチームを率い、リリースサイクルを週次に短縮",
+    "AWS認定ソリューションアーキテクト プロフェッショナル 取得",
+    "Led migration of a monolith to event-driven services handling 2M requests/day",
+]
+
+
+def synthetic_pdf(pages, scanned, rng):
+    """A resume-like PDF; scanned ones are page images without a text layer"""
+
+    document = fitz.open()
+    for _ in range(pages):
+        page = document.new_page()
+        text = "\n".join(rng.choice(LINES) for _ in range(40))
+        page.insert_textbox(fitz.Rect(40, 40, 555, 800), text, fontsize=9, fontname="japan")
+    if not scanned:
+        return document.tobytes()
+
+    scanned_document = fitz.open()
+    for page in document:
+        pixmap = page.get_pixmap(matrix=fitz.Matrix(1.5, 1.5))
+        image_page = scanned_document.new_page(width=page.rect.width, height=page.rect.height)
+        image_page.insert_image(image_page.rect, stream=pixmap.tobytes("png"))
+    return scanned_document.tobytes()
+
+
+def worker_processes(pattern):
+    """RSS in bytes of every process whose command line contains pattern, by PID"""
+
+    processes = {}
+    for proc in Path("/proc").iterdir():
+        if not proc.name.isdigit():
+            continue
+        try:
+            cmdline = (proc / "cmdline").read_bytes().replace(b"\0", b" ").decode(errors="replace")
+            if pattern not in cmdline or "extraction_soak" in cmdline:
+                continue
+            for line in (proc / "status").read_text().splitlines():
+                if line.startswith("VmRSS:"):
+                    processes[int(proc.name)] = int(line.split()[1]) * 1024
+        except (FileNotFoundError, ProcessLookupError, PermissionError):
+            continue
+    return processes
+
+
+def enqueue_documents(db, user_id, count, scanned_ratio, max_pages, rng):
+    document_ids = []
+    for i in range(count):
+        scanned = rng.random() < scanned_ratio
+        pages = rng.randint(1, max_pages)
+        contents = synthetic_pdf(pages, scanned, rng)
+        key = f"soak/{uuid.uuid4()}.pdf"
+        asyncio.run(s3_service.upload_file(contents, key, "application/pdf"))
+
+        document = Document(
+            user_id=user_id,
+            filename=f"soak-{i}.pdf",
+            file_type="pdf",
+            file_size=len(contents),
+            s3_key=key,
+            document_type=DocumentType.OTHER,
+            status=DocumentStatus.UPLOADED,
+        )
+        db.add(document)
+        db.flush()
+        analysis = Analysis(user_id=user_id, document_id=document.id, status=AnalysisStatus.PENDING)
+        db.add(analysis)
+        db.commit()
+
+        extract_document_task.apply_async((document.id, analysis.id, PRIORITY_BACKFILL), priority=PRIORITY_BACKFILL)
+        document_ids.append(document.id)
+    return document_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("user_id", type=int, help="Owner of the synthetic documents")
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--scanned-ratio", type=float, default=0.3, help="Share of documents without a text layer")
+    parser.add_argument("--max-pages", type=int, default=8)
+    parser.add_argument("--worker-pattern", default="celery -A app.workers.celery_app worker")
+    parser.add_argument("--sample-seconds", type=float, default=10)
+    parser.add_argument("--timeout", type=int, default=4 * 3600)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    db = SessionLocal()
+    try:
+        print(f"\n=== Enqueueing {args.documents} synthetic documents ===")
+        start = time.perf_counter()
+        document_ids = enqueue_documents(db, args.user_id, args.documents, args.scanned_ratio, args.max_pages, rng)
+
+        # PID -> (first seen at, first RSS, last RSS, peak RSS)
+        seen = {}
+        done = 0
+        print(f"\n{'elapsed':>8} {'done':>6} {'procs':>5} {'total MB':>9} {'max MB':>7}")
+        while done < len(document_ids):
+            if time.perf_counter() - start > args.timeout:
+                print(f"Timed out with {done}/{len(document_ids)} documents finished")
+                break
+            time.sleep(args.sample_seconds)
+            elapsed = time.perf_counter() - start
+            processes = worker_processes(args.worker_pattern)
+            for pid, rss in processes.items():
+                first_seen, first_rss, _, peak = seen.get(pid, (elapsed, rss, rss, rss))
+                seen[pid] = (first_seen, first_rss, rss, max(peak, rss))
+
+            done = db.query(Document).filter(
+                Document.id.in_(document_ids),
+                Document.status.in_([DocumentStatus.PROCESSED, DocumentStatus.FAILED])
+            ).count()
+            db.rollback()  # End the read transaction so the next count sees new commits
+            print(
+                f"{elapsed:8.0f} {done:6d} {len(processes):5d} "
+                f"{sum(processes.values()) / 2 ** 20:9.0f} {max(processes.values(), default=0) / 2 ** 20:7.0f}"
+            )
+        elapsed = time.perf_counter() - start
+
+        failed = db.query(Document).filter(
+            Document.id.in_(document_ids),
+            Document.status == DocumentStatus.FAILED
+        ).count()
+    finally:
+        db.close()
+
+    alive = worker_processes(args.worker_pattern)
+    print("\n--- Worker processes ---")
+    print(f"{'pid':>8} {'from s':>7} {'first MB':>9} {'last MB':>8} {'peak MB':>8} {'MB/h':>7} {'state':>8}")
+    for pid, (first_seen, first_rss, last_rss, peak) in sorted(seen.items(), key=lambda item: item[1][0]):
+        lifetime_hours = max(elapsed - first_seen, args.sample_seconds) / 3600
+        print(
+            f"{pid:8d} {first_seen:7.0f} {first_rss / 2 ** 20:9.0f} {last_rss / 2 ** 20:8.0f} "
+            f"{peak / 2 ** 20:8.0f} {(last_rss - first_rss) / 2 ** 20 / lifetime_hours:7.0f} "
+            f"{'alive' if pid in alive else 'recycled':>8}"
+        )
+
+    print("\n--- Summary ---")
+    print(f"finished:   {done} ({failed} failed) in {elapsed:.1f}s")
+    print(f"processes:  {len(seen)} seen, {len(seen) - len(alive)} recycled or exited")
+    print(f"peak RSS:   {max((peak for *_, peak in seen.values()), default=0) / 2 ** 20:.0f} MB in one process")
+
+
+if __name__ == "__main__":
+    main()
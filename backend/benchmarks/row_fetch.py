@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""Compare row fetch latency and size with large columns deferred and loaded
+
+Runs the ORM queries behind the document and analysis endpoints twice: as
+they are now (raw_text, gemini_response, career_paths and the other large
+columns deferred) and with every column loaded, as before. For each it
+reports the median fetch time and the approximate bytes of the values
+loaded (close to what the database sends).
+
+Use a database seeded by query_plans.py; --fill gives the busiest user's
+rows resume-sized text and model output first:
+
+    DATABASE_URL=... python benchmarks/row_fetch.py --fill
+
+Never point it at a real database.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from sqlalchemy import inspect, select, text
+from sqlalchemy.orm import undefer
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.core.database import SessionLocal
+from app.models.user import User  # noqa: F401  (registers the relationship target)
+from app.models.document import Document
+from app.models.analysis import Analysis
+from app.models.career_recommendation import CareerRecommendation  # noqa: F401
+
+FILL_SQL = """
+UPDATE documents SET raw_text = repeat('2018年4月 株式会社サンプル入社 バックエンド開発を担当。', :repeats)
+WHERE user_id = :user_id;
+
+UPDATE analyses SET gemini_response = CAST(:response AS json), career_paths = CAST(:paths AS json),
+                    raw_model_output = :raw_output
+WHERE user_id = :user_id;
+"""
+
+
+def fill(session, user_id, text_chars):
+    paths = [
+        {"title": f"Career {i}", "description": "説明" * 200, "required_skills": ["Python"] * 20}
+        for i in range(5)
+    ]
+    response = json.dumps({"career_paths": paths, "overall_insights": "洞察" * 500}, ensure_ascii=False)
+    params = {
+        "user_id": user_id,
+        "repeats": max(text_chars // 30, 1),
+        "response": response,
+        "paths": json.dumps(paths, ensure_ascii=False),
+        "raw_output": response,
+    }
+    for statement in FILL_SQL.split(";"):
+        if statement.strip():
+            session.execute(text(statement), params)
+    session.commit()
+    session.execute(text("ANALYZE documents, analyses"))
+
+
+def queries(user_id, document_id, analysis_id):
+    """The endpoint queries, without options"""
+
+    return {
+        "documents.list_documents": select(Document).where(
+            Document.user_id == user_id
+        ).order_by(Document.created_at.desc(), Document.id.desc()).limit(20),
+        "documents.get_document": select(Document).where(Document.id == document_id),
+        "analysis.list_analyses": select(Analysis).where(
+            Analysis.user_id == user_id
+        ).order_by(Analysis.created_at.desc(), Analysis.id.desc()).limit(20),
+        "analysis.get_analysis": select(Analysis).options(
+            undefer(Analysis.career_paths)
+        ).where(Analysis.id == analysis_id),
+    }
+
+
+def loaded_bytes(session, statement):
+    """Approximate size of the column values the statement loads into objects"""
+
+    session.expunge_all()
+    total = 0
+    for instance in session.execute(statement).scalars():
+        for key, value in inspect(instance).dict.items():
+            if key.startswith("_") or value is None:
+                continue
+            value = json.dumps(value, ensure_ascii=False) if isinstance(value, (dict, list)) else str(value)
+            total += len(value.encode("utf-8"))
+    return total
+
+
+def time_fetch(session, statement, repeat):
+    timings = []
+    for _ in range(repeat):
+        session.expunge_all()
+        start = time.perf_counter()
+        session.execute(statement).scalars().all()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fill", action="store_true", help="Fill text and model output of the busiest user")
+    parser.add_argument("--text-chars", type=int, default=20000, help="Extracted text length used by --fill")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    try:
+        user_id = session.execute(
+            text("SELECT user_id FROM analyses GROUP BY user_id ORDER BY count(*) DESC LIMIT 1")
+        ).scalar_one()
+        if args.fill:
+            fill(session, user_id, args.text_chars)
+        document_id, analysis_id = session.execute(
+            text("SELECT document_id, id FROM analyses WHERE user_id = :user_id LIMIT 1"), {"user_id": user_id}
+        ).one()
+
+        print(f"\n{'query':30s} {'before ms':>10} {'after ms':>9} {'before KB':>10} {'after KB':>9}")
+        for name, statement in queries(user_id, document_id, analysis_id).items():
+            # Every column loaded, as before the large ones were deferred
+            before = statement.options(undefer("*"))
+            before_ms = time_fetch(session, before, args.repeat) * 1000
+            after_ms = time_fetch(session, statement, args.repeat) * 1000
+            print(
+                f"{name:30s} {before_ms:10.2f} {after_ms:9.2f} "
+                f"{loaded_bytes(session, before) / 1024:10.1f} {loaded_bytes(session, statement) / 1024:9.1f}"
+            )
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
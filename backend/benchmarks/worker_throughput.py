@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Benchmark analysis throughput per GB of worker RAM for a running Celery worker setup
+
+Start the worker configuration under test (ideally against the API simulator,
+GOOGLE_API_SIMULATOR_URL), then run this script once per configuration, e.g.
+
+    celery -A app.workers.celery_app worker -P prefork -c 16 -Q analyze
+    celery -A app.workers.celery_app worker -P gevent -c 200 -Q analyze
+
+Run the workers with NEAR_DUP_ENABLED=False and
+ANALYSIS_SINGLE_FLIGHT_ENABLED=False. The benchmark re-analyzes one document,
+so otherwise most analyses reuse an earlier result or attach to a concurrent
+Gemini call instead of generating.
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.core.database import SessionLocal
+from app.models.user import User  # noqa: F401  (registers the relationship target)
+from app.models.document import Document
+from app.models.analysis import Analysis, AnalysisStatus
+from app.workers.tasks import process_analysis_task
+
+
+def worker_rss_bytes(pattern):
+    """Total resident memory of processes whose command line contains pattern"""
+
+    total = 0
+    for proc in Path("/proc").iterdir():
+        if not proc.name.isdigit():
+            continue
+        try:
+            cmdline = (proc / "cmdline").read_bytes().replace(b"\0", b" ").decode(errors="replace")
+            if pattern not in cmdline or "worker_throughput" in cmdline:
+                continue
+            for line in (proc / "status").read_text().splitlines():
+                if line.startswith("VmRSS:"):
+                    total += int(line.split()[1]) * 1024
+        except (FileNotFoundError, ProcessLookupError, PermissionError):
+            continue
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("document_id", type=int, help="Stored document to analyze repeatedly")
+    parser.add_argument("--analyses", type=int, default=500)
+    parser.add_argument("--worker-pattern", default="celery -A app.workers.celery_app worker")
+    parser.add_argument("--timeout", type=int, default=1800)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        document = db.query(Document).filter(Document.id == args.document_id).one()
+        analyses = [
+            Analysis(user_id=document.user_id, document_id=document.id, status=AnalysisStatus.PENDING)
+            for _ in range(args.analyses)
+        ]
+        db.add_all(analyses)
+        db.commit()
+        analysis_ids = [analysis.id for analysis in analyses]
+
+        print(f"\n=== Enqueueing {len(analysis_ids)} analyses of document {document.id} ===")
+        start = time.perf_counter()
+        for analysis_id in analysis_ids:
+            process_analysis_task.delay(analysis_id)
+
+        rss_samples = []
+        done = 0
+        while done < len(analysis_ids):
+            if time.perf_counter() - start > args.timeout:
+                print(f"Timed out with {done}/{len(analysis_ids)} analyses finished")
+                break
+            time.sleep(1)
+            rss_samples.append(worker_rss_bytes(args.worker_pattern))
+            done = db.query(Analysis).filter(
+                Analysis.id.in_(analysis_ids),
+                Analysis.status.in_([AnalysisStatus.COMPLETED, AnalysisStatus.FAILED])
+            ).count()
+            db.rollback()  # End the read transaction so the next count sees new commits
+        elapsed = time.perf_counter() - start
+
+        failed = db.query(Analysis).filter(
+            Analysis.id.in_(analysis_ids),
+            Analysis.status == AnalysisStatus.FAILED
+        ).count()
+    finally:
+        db.close()
+
+    peak_gb = max(rss_samples, default=0) / 1024 ** 3
+    throughput = done / elapsed * 60
+
+    print("\n--- Summary ---")
+    print(f"finished:   {done} ({failed} failed) in {elapsed:.1f}s")
+    print(f"throughput: {throughput:.1f} analyses/min")
+    print(f"worker RSS: peak {peak_gb:.2f} GB, median {statistics.median(rss_samples or [0]) / 1024 ** 3:.2f} GB")
+    if peak_gb:
+        print(f"per GB:     {throughput / peak_gb:.1f} analyses/min/GB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+# Gunicorn settings for the API (Dockerfile.prod)
+
+import os
+import shutil
+
+bind = "0.0.0.0:8000"
+workers = int(os.environ.get("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    # Samples from a previous run would otherwise be summed into the new ones
+    multiproc_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if multiproc_dir:
+        shutil.rmtree(multiproc_dir, ignore_errors=True)
+        os.makedirs(multiproc_dir, exist_ok=True)
+
+
+def when_ready(server):
+    # Metrics of all workers, including Celery queue depth for autoscaling, on
+    # an internal port rather than the public API
+    from prometheus_client import start_http_server
+    from app.core.config import settings
+    from app.core.metrics import metrics_registry
+
+    if settings.API_METRICS_PORT:
+        start_http_server(settings.API_METRICS_PORT, registry=metrics_registry(include_queue_depth=True))
+
+
+def child_exit(server, worker):
+    from app.core.metrics import mark_process_dead
+
+    mark_process_dead(worker.pid)
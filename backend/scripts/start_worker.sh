@@ -0,0 +1,57 @@
+#!/bin/bash
+
+# Start a Celery worker subscribed to the queues of one node type.
+#
+#   cpu   extract, ocr (and default) queues on prefork, one process per core
+#   io    analyze queue on gevent, hundreds of in-flight Gemini calls
+#   bulk  bulk re-analysis and catalog prefetch backfills
+#   all   every queue on one prefork worker (development)
+#
+# Usage: scripts/start_worker.sh <profile> [extra celery worker args]
+# WORKER_CONCURRENCY overrides the profile's default concurrency.
+
+set -e
+
+PROFILE="${1:-all}"
+shift || true
+
+case "$PROFILE" in
+  cpu)
+    POOL=prefork
+    QUEUES=extract,ocr,celery
+    CONCURRENCY="${WORKER_CONCURRENCY:-$(nproc)}"
+    ;;
+  io)
+    POOL=gevent
+    QUEUES="${CELERY_ANALYSIS_QUEUE:-analyze}"
+    CONCURRENCY="${WORKER_CONCURRENCY:-200}"
+    ;;
+  bulk)
+    POOL=prefork
+    QUEUES=bulk
+    CONCURRENCY="${WORKER_CONCURRENCY:-2}"
+    ;;
+  all)
+    POOL=prefork
+    QUEUES="extract,ocr,${CELERY_ANALYSIS_QUEUE:-analyze},bulk,celery"
+    CONCURRENCY="${WORKER_CONCURRENCY:-4}"
+    ;;
+  *)
+    echo "Unknown worker profile: $PROFILE (expected cpu, io, bulk or all)" >&2
+    exit 1
+    ;;
+esac
+
+# Prefork children report metrics through PROMETHEUS_MULTIPROC_DIR; start clean
+if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+  rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+  mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi
+
+exec celery -A app.workers.celery_app worker \
+  --pool="$POOL" \
+  --concurrency="$CONCURRENCY" \
+  --queues="$QUEUES" \
+  --hostname="${PROFILE}@%h" \
+  --loglevel=info \
+  "$@"
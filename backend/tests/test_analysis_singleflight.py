@@ -0,0 +1,119 @@
+import json
+
+import pytest
+from redis.exceptions import RedisError
+
+from app.services import analysis_singleflight as singleflight_module
+from app.services.analysis_singleflight import AnalysisSingleFlight
+
+FLIGHT = AnalysisSingleFlight()
+KEY = FLIGHT.key("職務経歴", "resume", "gemini-pro")
+
+
+@pytest.fixture(autouse=True)
+def redis(monkeypatch, fake_redis):
+    monkeypatch.setattr(singleflight_module, "get_redis", lambda: fake_redis)
+    monkeypatch.setattr(singleflight_module.time, "sleep", lambda seconds: None)
+    return fake_redis
+
+
+class Generator:
+    def __init__(self, output="output", model_name="gemini-pro"):
+        self.result = (output, model_name)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.result
+
+
+def test_key_depends_on_every_output_parameter():
+    assert FLIGHT.key("text", "resume", "a") != FLIGHT.key("text", "resume", "b")
+    assert FLIGHT.key("text", "resume", "a") != FLIGHT.key("text", "cv", "a")
+    assert FLIGHT.key("text", "resume", "a") == FLIGHT.key("text", "resume", "a")
+
+
+def test_leader_generates_publishes_and_releases(redis):
+    generate = Generator(model_name="gemini-1.5-flash")
+
+    assert FLIGHT.run(KEY, generate) == ("output", "gemini-1.5-flash")
+    assert generate.calls == 1
+    assert json.loads(redis.get(f"{KEY}:result")) == ["output", "gemini-1.5-flash"]
+    assert f"{KEY}:lock" not in redis.data
+
+
+def test_output_of_a_finished_flight_is_not_reused(redis):
+    redis.set(f"{KEY}:result", json.dumps(["stale", "gemini-pro"]))
+    generate = Generator("fresh")
+
+    assert FLIGHT.run(KEY, generate) == ("fresh", "gemini-pro")
+    assert generate.calls == 1
+
+
+def test_waiter_attaches_to_the_leaders_output(redis):
+    redis.set(f"{KEY}:lock", "leader")
+    published = iter([None, json.dumps(["shared", "gemini-pro"])])
+    redis.get = lambda key: next(published) if key.endswith(":result") else None
+    generate = Generator()
+
+    assert FLIGHT.run(KEY, generate) == ("shared", "gemini-pro")
+    assert generate.calls == 0
+
+
+def test_waiter_taking_the_lock_rechecks_the_result(redis):
+    """The leader publishes and releases between the waiter's read and its lock attempt."""
+    redis.set(f"{KEY}:lock", "leader")
+    read = redis.get
+
+    def get(key):
+        value = read(key)
+        if key.endswith(":result") and value is None:
+            redis.set(f"{KEY}:result", json.dumps(["leader output", "gemini-pro"]))
+            redis.delete(f"{KEY}:lock")
+        return value
+
+    redis.get = get
+    generate = Generator()
+
+    assert FLIGHT.run(KEY, generate) == ("leader output", "gemini-pro")
+    assert generate.calls == 0
+    assert redis.data[f"{KEY}:result"] is not None
+    assert f"{KEY}:lock" not in redis.data
+
+
+def test_waiter_takes_over_when_the_leader_fails(redis):
+    redis.set(f"{KEY}:lock", "leader")
+    read = redis.get
+
+    def get(key):
+        # The leader gave up without publishing
+        if redis.data.get(f"{KEY}:lock") == "leader":
+            redis.delete(f"{KEY}:lock")
+        return read(key)
+
+    redis.get = get
+    generate = Generator("retry")
+
+    assert FLIGHT.run(KEY, generate) == ("retry", "gemini-pro")
+    assert generate.calls == 1
+
+
+def test_waiter_generates_itself_after_the_wait_limit(redis, monkeypatch):
+    monkeypatch.setattr(singleflight_module.settings, "ANALYSIS_SINGLE_FLIGHT_WAIT_SECONDS", -1)
+    redis.set(f"{KEY}:lock", "leader")
+    generate = Generator()
+
+    assert FLIGHT.run(KEY, generate) == ("output", "gemini-pro")
+    assert generate.calls == 1
+    assert redis.get(f"{KEY}:lock") == "leader"
+
+
+def test_unavailable_registry_generates_directly(redis):
+    def unavailable(*args, **kwargs):
+        raise RedisError("connection refused")
+
+    redis.set = unavailable
+    generate = Generator()
+
+    assert FLIGHT.run(KEY, generate) == ("output", "gemini-pro")
+    assert generate.calls == 1
@@ -0,0 +1,47 @@
+import pytest
+from fastapi import HTTPException
+
+from app.api.dependencies import get_analysis_events_user
+from app.core.security import create_access_token, create_analysis_events_token
+from app.services.auth_cache import AuthCache
+
+
+@pytest.fixture
+def cache():
+    return AuthCache()
+
+
+def test_access_token_resolves_to_its_user(cache):
+    token = create_access_token({"sub": "7"})
+
+    assert cache.token_user_id(token) == 7
+    # Served from the local cache the second time
+    assert cache.token_user_id(token) == 7
+
+
+def test_invalid_token_is_rejected(cache):
+    assert cache.token_user_id("not-a-jwt") is None
+
+
+def test_stream_token_is_not_an_access_token(cache):
+    token = create_analysis_events_token(user_id=7, analysis_id=3)
+
+    assert cache.token_user_id(token) is None
+
+
+async def test_stream_token_only_opens_its_own_analysis():
+    token = create_analysis_events_token(user_id=7, analysis_id=3)
+
+    with pytest.raises(HTTPException) as raised:
+        await get_analysis_events_user(analysis_id=4, token=token)
+
+    assert raised.value.status_code == 401
+
+
+async def test_access_token_does_not_open_a_stream():
+    token = create_access_token({"sub": "7"})
+
+    with pytest.raises(HTTPException) as raised:
+        await get_analysis_events_user(analysis_id=3, token=token)
+
+    assert raised.value.status_code == 401
@@ -0,0 +1,103 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from app.workers import bulk_reanalysis
+from app.workers.bulk_reanalysis import JOB_KEY
+
+
+@pytest.fixture(autouse=True)
+def redis(monkeypatch, fake_redis, fake_async_redis):
+    monkeypatch.setattr(bulk_reanalysis, "get_redis", lambda: fake_redis)
+    monkeypatch.setattr(bulk_reanalysis, "get_async_redis", lambda: fake_async_redis)
+    return fake_redis
+
+
+def row(document_id, length=100):
+    return SimpleNamespace(
+        id=document_id,
+        user_id=1,
+        raw_text="職" * length,
+        document_type=SimpleNamespace(value="resume"),
+    )
+
+
+class FakeGemini:
+    def __init__(self, batch=None, batch_error=None, single_model="gemini-pro"):
+        self.batch = batch or {}
+        self.batch_error = batch_error
+        self.single_model = single_model
+        self.single_calls = []
+
+    def analyze_resumes_batch_sync(self, items):
+        if self.batch_error:
+            raise self.batch_error
+        return {item["id"]: self.batch[item["id"]] for item in items if item["id"] in self.batch}, "gemini-1.5-flash"
+
+    def analyze_resume_sync(self, text, document_type):
+        self.single_calls.append(text)
+        return {"data": {"single": True}, "model_name": self.single_model}
+
+
+async def test_new_job_starts_at_the_beginning():
+    job_id = await bulk_reanalysis.create_job()
+
+    job = await bulk_reanalysis.get_job_async(job_id)
+    assert job["status"] == "pending"
+    assert (job["last_document_id"], job["processed"], job["failed"]) == (0, 0, 0)
+    assert datetime.fromisoformat(job["created_at"]).tzinfo is not None
+
+
+def test_unknown_job():
+    assert bulk_reanalysis.get_job("missing") is None
+
+
+def test_checkpoints_accumulate_progress(redis):
+    redis.hset(JOB_KEY.format(job_id="job"), mapping={
+        "status": "pending", "last_document_id": 0, "processed": 0, "failed": 0
+    })
+
+    bulk_reanalysis._checkpoint("job", last_document_id=5, processed=4, failed=1)
+    bulk_reanalysis._checkpoint("job", last_document_id=9, processed=3, failed=0)
+
+    job = bulk_reanalysis.get_job("job")
+    assert job["status"] == "running"
+    assert (job["last_document_id"], job["processed"], job["failed"]) == (9, 7, 1)
+
+
+@pytest.mark.parametrize("created_at", ["2026-10-19T09:30:00+09:00", "2026-10-19T00:30:00"])
+def test_job_start_is_naive_utc(created_at):
+    # Jobs created before timezone-aware timestamps stored naive UTC
+    assert bulk_reanalysis._job_started_at({"created_at": created_at}) == datetime(2026, 10, 19, 0, 30)
+
+
+def test_short_documents_are_packed_in_id_order(monkeypatch):
+    monkeypatch.setattr(bulk_reanalysis.settings, "BULK_PACK_MAX_DOCS", 2)
+    monkeypatch.setattr(bulk_reanalysis.settings, "BULK_PACK_MAX_CHARS", 1000)
+    monkeypatch.setattr(bulk_reanalysis.settings, "BULK_PACK_MAX_DOC_CHARS", 500)
+
+    batches = bulk_reanalysis._pack([row(1), row(2), row(3, 600), row(4), row(5, 450), row(6, 450)])
+
+    assert [[document.id for document in batch] for batch in batches] == [[1, 2], [3], [4, 5], [6]]
+
+
+def test_batch_results_record_the_model_that_served_them():
+    gemini = FakeGemini(batch={1: {"packed": True}}, single_model="gemini-1.5-pro")
+
+    results = bulk_reanalysis._analyze_batch(gemini, [row(1), row(2)])
+
+    assert results == {
+        1: ({"packed": True}, "gemini-1.5-flash"),
+        2: ({"single": True}, "gemini-1.5-pro"),
+    }
+    assert len(gemini.single_calls) == 1
+
+
+def test_failed_batch_falls_back_to_single_requests():
+    gemini = FakeGemini(batch_error=RuntimeError("malformed batch output"))
+
+    results = bulk_reanalysis._analyze_batch(gemini, [row(1), row(2)])
+
+    assert set(results) == {1, 2}
+    assert len(gemini.single_calls) == 2
@@ -0,0 +1,35 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2026, 10, 19, 12, 30, 15, 123456)
+
+    cursor = encode_cursor(created_at, 42)
+
+    assert decode_cursor(cursor, (datetime, int)) == (created_at, 42)
+
+
+def test_cursor_is_url_safe_without_padding():
+    cursor = encode_cursor(datetime(2026, 1, 1), 1)
+
+    assert "=" not in cursor
+    assert "+" not in cursor and "/" not in cursor
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor",
+    encode_cursor(1),  # too short for the sort key
+    encode_cursor("yesterday", 1),  # not a datetime
+    encode_cursor(datetime(2026, 1, 1), "x"),  # not an id
+])
+def test_invalid_cursor_is_a_client_error(cursor):
+    with pytest.raises(HTTPException) as raised:
+        decode_cursor(cursor, (datetime, int))
+
+    assert raised.value.status_code == 400
+    assert raised.value.__suppress_context__
@@ -0,0 +1,40 @@
+"""The hot endpoint queries keep using indexes (EXPLAIN checks).
+
+Needs an empty throwaway PostgreSQL database migrated to head in
+QUERY_PLANS_DATABASE_URL; skipped otherwise. The rows are seeded in a
+transaction that is rolled back. Sequential scans are disabled for it, so a
+small dataset is enough: the planner only picks one when no index can serve
+the query. benchmarks/query_plans.py runs the same checks on millions of rows.
+"""
+
+import os
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from benchmarks.query_plans import hot_queries, query_plan, sample_ids, seed, sequential_scans
+
+QUERY_PLANS_DATABASE_URL = os.environ.get("QUERY_PLANS_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not QUERY_PLANS_DATABASE_URL, reason="QUERY_PLANS_DATABASE_URL is not set")
+
+
+@pytest.fixture(scope="module")
+def connection():
+    engine = create_engine(QUERY_PLANS_DATABASE_URL)
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            seed(connection, users=50, documents=1000, analyses=2000)
+            connection.execute(text("SET LOCAL enable_seqscan = off"))
+            yield connection
+        finally:
+            transaction.rollback()
+    engine.dispose()
+
+
+@pytest.mark.parametrize("name", list(hot_queries(0, 0, 0, 0)))
+def test_hot_query_uses_indexes(connection, name):
+    statement = hot_queries(*sample_ids(connection))[name]
+
+    assert sequential_scans(query_plan(connection, statement)) == []
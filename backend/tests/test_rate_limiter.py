@@ -0,0 +1,113 @@
+import pytest
+from redis.exceptions import RedisError
+
+from app.services import rate_limiter as rate_limiter_module
+from app.services.rate_limiter import GeminiRateLimiter, RateLimitLease, RateLimitTimeoutError
+
+MODEL = "gemini-pro"
+
+
+@pytest.fixture
+def limiter(monkeypatch, fake_redis, fake_async_redis):
+    monkeypatch.setattr(rate_limiter_module, "get_redis", lambda: fake_redis)
+    monkeypatch.setattr(rate_limiter_module, "get_async_redis", lambda: fake_async_redis)
+    monkeypatch.setattr(rate_limiter_module.settings, "GEMINI_RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(rate_limiter_module.time, "sleep", lambda seconds: None)
+    limiter = GeminiRateLimiter()
+    limiter.api_keys = ["key-a", "key-b"]
+    return limiter
+
+
+def script_results(limiter, *results):
+    """Replace the token bucket script with canned {key index, wait} replies."""
+    replies = iter(results)
+    limiter._script = lambda keys, args: next(replies)
+
+
+def lease(limiter, tokens=3000):
+    return RateLimitLease(model_name=MODEL, api_key="key-b", key_id=limiter.key_id("key-b"), tokens=tokens)
+
+
+def bucket_tokens(redis, limiter):
+    return float(redis.hgetall(f"gemini:ratelimit:{MODEL}:{limiter.key_id('key-b')}").get("tokens", 0))
+
+
+def test_key_pool_has_no_duplicates(monkeypatch):
+    monkeypatch.setattr(rate_limiter_module.settings, "GEMINI_API_KEY", "key-a")
+    monkeypatch.setattr(rate_limiter_module.settings, "GEMINI_API_KEYS", ["key-b", "key-a", ""])
+
+    assert GeminiRateLimiter().api_keys == ["key-a", "key-b"]
+
+
+def test_acquire_leases_the_key_chosen_by_the_script(limiter):
+    script_results(limiter, [-1, "0.2"], [2, "0"])
+
+    acquired = limiter.acquire(MODEL, 3000)
+
+    assert acquired.api_key == "key-b"
+    assert acquired.key_id == limiter.key_id("key-b")
+    assert acquired.tokens == 3000
+
+
+def test_acquire_gives_up_past_the_maximum_wait(limiter, monkeypatch):
+    monkeypatch.setattr(rate_limiter_module.settings, "GEMINI_RATE_LIMIT_MAX_WAIT_SECONDS", 10)
+    script_results(limiter, [-1, "60"])
+
+    with pytest.raises(RateLimitTimeoutError):
+        limiter.acquire(MODEL, 3000)
+
+
+def test_acquire_fails_open_without_redis(limiter):
+    def unavailable(keys, args):
+        raise RedisError("connection refused")
+
+    limiter._script = unavailable
+
+    assert limiter.acquire(MODEL, 3000).api_key == "key-a"
+
+
+def test_settle_refunds_unused_reservation(limiter, fake_redis):
+    limiter.settle(lease(limiter, tokens=3000), actual_tokens=1200)
+
+    assert bucket_tokens(fake_redis, limiter) == 1800
+
+
+def test_settle_charges_usage_above_the_estimate(limiter, fake_redis):
+    limiter.settle(lease(limiter, tokens=3000), actual_tokens=5000)
+
+    assert bucket_tokens(fake_redis, limiter) == -2000
+
+
+def test_settle_without_usage_keeps_the_reservation(limiter, fake_redis):
+    limiter.settle(lease(limiter), actual_tokens=None)
+
+    assert fake_redis.data == {}
+
+
+def test_settle_is_a_no_op_when_disabled(limiter, fake_redis, monkeypatch):
+    monkeypatch.setattr(rate_limiter_module.settings, "GEMINI_RATE_LIMIT_ENABLED", False)
+
+    limiter.settle(lease(limiter), actual_tokens=0)
+
+    assert fake_redis.data == {}
+
+
+def test_penalize_cools_the_key_down(limiter, fake_redis):
+    limiter.penalize(lease(limiter), seconds=30)
+
+    cooldown = f"gemini:ratelimit:{MODEL}:{limiter.key_id('key-b')}:cooldown"
+    assert cooldown in fake_redis.data
+    assert fake_redis.expiry[cooldown] == 30
+
+
+async def test_async_settle_and_penalize_use_the_async_client(limiter, fake_redis, monkeypatch):
+    def sync_client():
+        raise AssertionError("the async path must not use the sync client")
+
+    monkeypatch.setattr(rate_limiter_module, "get_redis", sync_client)
+
+    await limiter.settle_async(lease(limiter, tokens=3000), actual_tokens=1000)
+    await limiter.penalize_async(lease(limiter))
+
+    assert bucket_tokens(fake_redis, limiter) == 2000
+    assert f"gemini:ratelimit:{MODEL}:{limiter.key_id('key-b')}:cooldown" in fake_redis.data
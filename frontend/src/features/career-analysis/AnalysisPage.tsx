@@ -40,7 +40,6 @@ const AnalysisPage: React.FC = () => {
   const [analysis, setAnalysis] = useState<Analysis | null>(null)
   const [careerPaths, setCareerPaths] = useState<CareerPath[]>([])
   const [loading, setLoading] = useState(true)
-  const [polling, setPolling] = useState(true)
 
   // Fetch analysis data
   const fetchAnalysis = async () => {
@@ -56,30 +55,84 @@ const AnalysisPage: React.FC = () => {
           headers: { Authorization: `Bearer ${token}` }
         })
         setCareerPaths(pathsResponse.data)
-        setPolling(false)
-      } else if (response.data.status === 'failed') {
-        setPolling(false)
       }
+      return response.data.status as Analysis['status']
     } catch (error) {
       console.error('Error fetching analysis:', error)
-      setPolling(false)
+      return null
     } finally {
       setLoading(false)
     }
   }
 
-  // Poll for updates while processing
+  // Follow status changes pushed by the server instead of polling
   useEffect(() => {
-    fetchAnalysis()
+    if (!token) return
+
+    let closed = false
+    let failures = 0
+    let source: EventSource | null = null
+    let retry: ReturnType<typeof setTimeout> | null = null
+
+    const poll = async () => {
+      const status = await fetchAnalysis()
+      if (!closed && status !== 'completed' && status !== 'failed') {
+        retry = setTimeout(poll, 10000)
+      }
+    }
+
+    // The stream takes a short-lived token for this analysis rather than the
+    // access token, which would end up in access logs from the query string
+    const connect = async () => {
+      let streamToken: string
+      try {
+        const response = await axios.post(`/api/v1/analysis/${id}/events/token`, null, {
+          headers: { Authorization: `Bearer ${token}` }
+        })
+        streamToken = response.data.token
+      } catch (error) {
+        console.error('Error opening analysis events:', error)
+        if (!closed) retry = setTimeout(poll, 10000)
+        return
+      }
+      if (closed) return
+
+      const current = new EventSource(
+        `/api/v1/analysis/${id}/events?token=${encodeURIComponent(streamToken)}`
+      )
+      source = current
+
+      current.addEventListener('status', (event) => {
+        failures = 0
+        const { status, error_message } = JSON.parse((event as MessageEvent).data)
+        if (status === 'completed' || status === 'failed') {
+          closed = true
+          current.close()
+          fetchAnalysis()
+        } else {
+          setAnalysis((analysis) => analysis ? { ...analysis, status, error_message } : analysis)
+        }
+      })
 
-    const interval = polling ? setInterval(() => {
-      fetchAnalysis()
-    }, 3000) : null
+      // The token expires before EventSource would reconnect by itself, so
+      // reconnect with a new one; fall back to slow polling if that keeps failing
+      current.onerror = () => {
+        current.close()
+        if (closed) return
+        failures += 1
+        retry = failures < 3 ? setTimeout(connect, 1000) : setTimeout(poll, 10000)
+      }
+    }
+
+    fetchAnalysis()
+    connect()
 
     return () => {
-      if (interval) clearInterval(interval)
+      closed = true
+      source?.close()
+      if (retry) clearTimeout(retry)
     }
-  }, [id, polling])
+  }, [id, token])
 
   // Render status icon
   const renderStatusIcon = (status: string) => {